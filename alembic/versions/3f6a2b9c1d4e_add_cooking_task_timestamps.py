@@ -0,0 +1,52 @@
+"""add cooking task status timestamps and latency buckets
+
+Revision ID: 3f6a2b9c1d4e
+Revises: add_sbp_paymentmethod
+Create Date: 2025-11-20 19:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6a2b9c1d4e'
+down_revision: Union[str, Sequence[str], None] = 'add_sbp_paymentmethod'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('cooking_tasks', sa.Column('queued_at', sa.DateTime(), nullable=True))
+    op.add_column('cooking_tasks', sa.Column('cooking_at', sa.DateTime(), nullable=True))
+    op.add_column('cooking_tasks', sa.Column('ready_at', sa.DateTime(), nullable=True))
+    op.add_column('cooking_tasks', sa.Column('delivering_at', sa.DateTime(), nullable=True))
+    op.add_column('cooking_tasks', sa.Column('delivered_at', sa.DateTime(), nullable=True))
+    # Для существующих задач известно только время создания
+    op.execute("UPDATE cooking_tasks SET queued_at = created_at")
+
+    op.create_table('cooking_latency_buckets',
+    sa.Column('menu_item_id', sa.Integer(), nullable=False),
+    sa.Column('hour', sa.DateTime(), nullable=False),
+    sa.Column('metric', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('bucket', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['menu_item_id'], ['menu.id'], ),
+    sa.PrimaryKeyConstraint('menu_item_id', 'hour', 'metric', 'bucket')
+    )
+    op.create_index('ix_cooking_latency_buckets_hour', 'cooking_latency_buckets', ['hour'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_cooking_latency_buckets_hour', table_name='cooking_latency_buckets')
+    op.drop_table('cooking_latency_buckets')
+    op.drop_column('cooking_tasks', 'delivered_at')
+    op.drop_column('cooking_tasks', 'delivering_at')
+    op.drop_column('cooking_tasks', 'ready_at')
+    op.drop_column('cooking_tasks', 'cooking_at')
+    op.drop_column('cooking_tasks', 'queued_at')
@@ -0,0 +1,74 @@
+"""add order progress counters
+
+Revision ID: 8b1e4d7a2c55
+Revises: 3f6a2b9c1d4e
+Create Date: 2025-11-24 20:41:07.902113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b1e4d7a2c55'
+down_revision: Union[str, Sequence[str], None] = '3f6a2b9c1d4e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COUNTER_COLUMNS = [
+    'item_count',
+    'tasks_total',
+    'tasks_queued',
+    'tasks_cooking',
+    'tasks_ready',
+    'tasks_delivering',
+    'tasks_delivered',
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for column in COUNTER_COLUMNS:
+        op.add_column('orders', sa.Column(column, sa.Integer(), nullable=False, server_default='0'))
+
+    # Заполняем счетчики для существующих заказов
+    op.execute("""
+        UPDATE orders SET item_count = sub.item_count
+        FROM (
+            SELECT order_id, count(*) AS item_count
+            FROM order_items
+            GROUP BY order_id
+        ) AS sub
+        WHERE sub.order_id = orders.id
+    """)
+    op.execute("""
+        UPDATE orders SET
+            tasks_total = sub.total,
+            tasks_queued = sub.queued,
+            tasks_cooking = sub.cooking,
+            tasks_ready = sub.ready,
+            tasks_delivering = sub.delivering,
+            tasks_delivered = sub.delivered
+        FROM (
+            SELECT
+                order_id,
+                count(*) AS total,
+                count(*) FILTER (WHERE status = 'QUEUED') AS queued,
+                count(*) FILTER (WHERE status = 'COOKING') AS cooking,
+                count(*) FILTER (WHERE status = 'READY') AS ready,
+                count(*) FILTER (WHERE status = 'DELIVERING') AS delivering,
+                count(*) FILTER (WHERE status = 'DELIVERED') AS delivered
+            FROM cooking_tasks
+            GROUP BY order_id
+        ) AS sub
+        WHERE sub.order_id = orders.id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column in reversed(COUNTER_COLUMNS):
+        op.drop_column('orders', column)
@@ -0,0 +1,61 @@
+"""add writer transaction ids for delta sync
+
+Revision ID: a3d9f0c6b217
+Revises: f5c1a7e3b402
+Create Date: 2025-12-05 11:24:09.517382
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d9f0c6b217'
+down_revision: Union[str, Sequence[str], None] = 'f5c1a7e3b402'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SYNC_TABLES = ['orders', 'order_items', 'cooking_tasks', 'menu', 'ingredients']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Существующие строки записаны давно зафиксированными транзакциями - им достаточно 0
+    for table in SYNC_TABLES:
+        op.add_column(table, sa.Column('change_xid', sa.BigInteger(), server_default=sa.text('0'), nullable=False))
+        op.create_index(op.f(f'ix_{table}_change_xid'), table, ['change_xid'], unique=False)
+    op.add_column('sync_tombstones', sa.Column(
+        'change_xid', sa.BigInteger(), server_default=sa.text('pg_current_xact_id()::text::bigint'), nullable=False
+    ))
+    op.execute("UPDATE sync_tombstones SET change_xid = 0")
+    op.create_index(op.f('ix_sync_tombstones_change_xid'), 'sync_tombstones', ['change_xid'], unique=False)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION set_change_version() RETURNS trigger AS $$
+        BEGIN
+            NEW.change_xid := pg_current_xact_id()::text::bigint;
+            NEW.change_version := nextval('change_seq');
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("""
+        CREATE OR REPLACE FUNCTION set_change_version() RETURNS trigger AS $$
+        BEGIN
+            NEW.change_version := nextval('change_seq');
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+    op.drop_index(op.f('ix_sync_tombstones_change_xid'), table_name='sync_tombstones')
+    op.drop_column('sync_tombstones', 'change_xid')
+    for table in reversed(SYNC_TABLES):
+        op.drop_index(op.f(f'ix_{table}_change_xid'), table_name=table)
+        op.drop_column(table, 'change_xid')
@@ -0,0 +1,45 @@
+"""add kitchen stations
+
+Revision ID: c4d9e2f7a813
+Revises: 8b1e4d7a2c55
+Create Date: 2025-11-26 18:03:52.417690
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d9e2f7a813'
+down_revision: Union[str, Sequence[str], None] = '8b1e4d7a2c55'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('kitchen_stations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('cooks', sa.Integer(), nullable=False),
+    sa.Column('ingredient_ids', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.add_column('cooking_tasks', sa.Column('station_id', sa.Integer(), nullable=True))
+    op.create_index(op.f('ix_cooking_tasks_station_id'), 'cooking_tasks', ['station_id'], unique=False)
+    op.create_foreign_key(
+        'cooking_tasks_station_id_fkey', 'cooking_tasks', 'kitchen_stations', ['station_id'], ['id']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('cooking_tasks_station_id_fkey', 'cooking_tasks', type_='foreignkey')
+    op.drop_index(op.f('ix_cooking_tasks_station_id'), table_name='cooking_tasks')
+    op.drop_column('cooking_tasks', 'station_id')
+    op.drop_table('kitchen_stations')
@@ -0,0 +1,38 @@
+"""add dish name and unit price snapshot to order items
+
+Revision ID: d7a3b5e9f120
+Revises: c4d9e2f7a813
+Create Date: 2025-11-28 12:26:14.550381
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a3b5e9f120'
+down_revision: Union[str, Sequence[str], None] = 'c4d9e2f7a813'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('order_items', sa.Column('name', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+    op.add_column('order_items', sa.Column('unit_price', sa.Float(), nullable=False, server_default='0'))
+    # Для старых заказов исторических цен нет - берем текущие из меню
+    op.execute("""
+        UPDATE order_items
+        SET name = menu.name, unit_price = menu.price
+        FROM menu
+        WHERE menu.id = order_items.menu_item_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('order_items', 'unit_price')
+    op.drop_column('order_items', 'name')
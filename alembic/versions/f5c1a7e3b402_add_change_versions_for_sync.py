@@ -0,0 +1,82 @@
+"""add change versions and tombstones for delta sync
+
+Revision ID: f5c1a7e3b402
+Revises: e2b8c6d4a901
+Create Date: 2025-12-03 16:58:21.604113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5c1a7e3b402'
+down_revision: Union[str, Sequence[str], None] = 'e2b8c6d4a901'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SYNC_TABLES = ['orders', 'order_items', 'cooking_tasks', 'menu', 'ingredients']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE SEQUENCE change_seq")
+
+    # Версия выставляется триггером при любой вставке и обновлении, даже если код ее не трогает
+    op.execute("""
+        CREATE FUNCTION set_change_version() RETURNS trigger AS $$
+        BEGIN
+            NEW.change_version := nextval('change_seq');
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE FUNCTION record_tombstone() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO sync_tombstones (table_name, row_id, deleted_at)
+            VALUES (TG_TABLE_NAME, OLD.id, now());
+            RETURN OLD;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+    op.create_table('sync_tombstones',
+    sa.Column('change_version', sa.BigInteger(), server_default=sa.text("nextval('change_seq')"), nullable=False),
+    sa.Column('table_name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('row_id', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('change_version')
+    )
+
+    for table in SYNC_TABLES:
+        # Существующие строки получают версии из последовательности при добавлении колонки
+        op.add_column(table, sa.Column(
+            'change_version', sa.BigInteger(), server_default=sa.text("nextval('change_seq')"), nullable=False
+        ))
+        op.create_index(op.f(f'ix_{table}_change_version'), table, ['change_version'], unique=False)
+        op.execute(f"""
+            CREATE TRIGGER {table}_change_version BEFORE INSERT OR UPDATE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION set_change_version()
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {table}_tombstone AFTER DELETE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION record_tombstone()
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in reversed(SYNC_TABLES):
+        op.execute(f"DROP TRIGGER {table}_tombstone ON {table}")
+        op.execute(f"DROP TRIGGER {table}_change_version ON {table}")
+        op.drop_index(op.f(f'ix_{table}_change_version'), table_name=table)
+        op.drop_column(table, 'change_version')
+
+    op.drop_table('sync_tombstones')
+    op.execute("DROP FUNCTION record_tombstone()")
+    op.execute("DROP FUNCTION set_change_version()")
+    op.execute("DROP SEQUENCE change_seq")
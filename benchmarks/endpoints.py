@@ -0,0 +1,230 @@
+"""
+Пропускная способность и задержки горячих endpoint-ов на заполненной БД.
+
+Запуск:
+    uv run python -m benchmarks.seed                 # один раз: очистить и заполнить локальную БД
+    uv run python main.py                            # в соседнем терминале
+    uv run python -m benchmarks.endpoints [--requests 500 --concurrency 16 --output report.json]
+    uv run python -m benchmarks.endpoints --compare old.json   # сравнить с отчетом другого коммита
+
+Каждый сценарий сначала прогревается, затем выполняет --requests запросов
+в --concurrency параллельных клиентов. Отчет в JSON содержит коммит, параметры
+и для каждого endpoint-а rps, ошибки и перцентили задержки в миллисекундах.
+
+Вебхуки оплаты берут заказы из пула WAITING_PAYMENT, созданного benchmarks.seed,
+поэтому каждый запрос проходит полный путь оплаты (задачи кухни, резерв ингредиентов).
+После прогона БД нужно заполнить заново, чтобы следующий прогон был сопоставим.
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+
+import httpx
+from sqlmodel import Session, select
+
+from benchmarks.seed import place_id
+from vsm_restaurant.db import create_db_engine
+from vsm_restaurant.db.menu import MenuItemModel
+from vsm_restaurant.db.orders import Order, OrderStatus, PaymentMethod
+from vsm_restaurant.settings import Settings
+
+
+@dataclass
+class ScenarioResult:
+    latencies: list[float] = field(default_factory=list)  # секунды
+    errors: int = 0
+    status_codes: dict[int, int] = field(default_factory=dict)
+    seconds: float = 0.0
+
+    def report(self) -> dict:
+        latencies = sorted(self.latencies)
+        requests = len(latencies)
+        return {
+            "requests": requests,
+            "errors": self.errors,
+            "error_rate": round(self.errors / requests, 4) if requests else 0.0,
+            "rps": round(requests / self.seconds, 1) if self.seconds else 0.0,
+            "mean_ms": round(sum(latencies) / requests * 1000, 2) if requests else None,
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 2) if requests else None,
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 2) if requests else None,
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2) if requests else None,
+            "max_ms": round(latencies[-1] * 1000, 2) if requests else None,
+            "status_codes": {str(code): count for code, count in sorted(self.status_codes.items())},
+        }
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    index = min(len(sorted_values) - 1, int(q * len(sorted_values)))
+    return sorted_values[index]
+
+
+# Запрос сценария: получает клиент и номер запроса, возвращает ответ
+RequestFactory = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    make_request: RequestFactory,
+    requests: int,
+    concurrency: int,
+    offset: int = 0,
+) -> ScenarioResult:
+    result = ScenarioResult()
+    counter = iter(range(offset, offset + requests))
+
+    async def worker():
+        for number in counter:
+            started = time.perf_counter()
+            try:
+                response = await make_request(client, number)
+                status_code = response.status_code
+            except httpx.HTTPError:
+                status_code = 0  # Сетевая ошибка или таймаут
+            result.latencies.append(time.perf_counter() - started)
+            result.status_codes[status_code] = result.status_codes.get(status_code, 0) + 1
+            if not 200 <= status_code < 300:
+                result.errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def build_scenarios(menu_item_ids: list[int], pending_order_ids: list[int], seed: int) -> dict[str, RequestFactory]:
+    rng = random.Random(seed)
+
+    async def create_order(client: httpx.AsyncClient, number: int) -> httpx.Response:
+        # Оплата официанту: не требует платежного сервиса
+        return await client.post("/orders", json={
+            "place_id": place_id(rng),
+            "payment_method": rng.choice([PaymentMethod.CASH, PaymentMethod.CARD_TERMINAL]).value,
+            "items": [
+                {"menu_item_id": menu_item_id, "quantity": rng.randint(1, 2)}
+                for menu_item_id in rng.sample(menu_item_ids, rng.randint(1, 3))
+            ],
+        })
+
+    async def payment_webhook(client: httpx.AsyncClient, number: int) -> httpx.Response:
+        return await client.post(
+            "/payments/webhook", json={"order_id": pending_order_ids[number], "status": "success"}
+        )
+
+    return {
+        "GET /menu": lambda client, number: client.get("/menu"),
+        "GET /passenger/menu/available": lambda client, number: client.get("/passenger/menu/available"),
+        "POST /orders": create_order,
+        "POST /payments/webhook": payment_webhook,
+        "GET /waiter/orders": lambda client, number: client.get("/waiter/orders"),
+        "GET /waiter/tasks": lambda client, number: client.get("/waiter/tasks"),
+    }
+
+
+def load_targets(settings: Settings) -> tuple[list[int], list[int]]:
+    """Блюда для заказов и пул заказов, ожидающих онлайн-оплаты, из заполненной БД"""
+    with Session(create_db_engine(settings)) as session:
+        menu_item_ids = list(session.exec(select(MenuItemModel.id)).all())
+        pending_order_ids = list(session.exec(
+            select(Order.id)
+            .where(Order.status == OrderStatus.WAITING_PAYMENT)
+            .where(Order.payment_method == PaymentMethod.CARD_ONLINE)
+            .order_by(Order.id)
+        ).all())
+    return menu_item_ids, pending_order_ids
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args) -> dict:
+    menu_item_ids, pending_order_ids = load_targets(Settings())
+    if not menu_item_ids:
+        raise SystemExit("Menu is empty: run `python -m benchmarks.seed` first")
+
+    scenarios = build_scenarios(menu_item_ids, pending_order_ids, args.seed)
+    if args.only:
+        scenarios = {name: scenarios[name] for name in scenarios if any(part in name for part in args.only)}
+
+    report = {
+        "commit": git_commit(),
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "base_url": args.base_url,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "warmup": args.warmup,
+        "endpoints": {},
+    }
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        for name, make_request in scenarios.items():
+            requests = args.requests
+            if name == "POST /payments/webhook":
+                # Каждый вебхук оплачивает свой заказ; пула должно хватить на прогрев и замер
+                requests = min(requests, max(len(pending_order_ids) - args.warmup, 0))
+                if requests < args.requests:
+                    print(f"{name}: only {requests} pending orders left, reseed to run a full pass")
+                if not requests:
+                    continue
+
+            await run_scenario(client, make_request, args.warmup, min(args.concurrency, args.warmup or 1))
+            result = await run_scenario(client, make_request, requests, args.concurrency, offset=args.warmup)
+            report["endpoints"][name] = result.report()
+    return report
+
+
+def print_report(report: dict, baseline: Optional[dict] = None):
+    columns = ["rps", "p50_ms", "p95_ms", "p99_ms", "max_ms", "errors"]
+    print(f"commit {report['commit']}, {report['requests']} requests x {report['concurrency']} concurrent")
+    print(f"{'endpoint':<32}" + "".join(f"{column:>10}" for column in columns))
+    for name, stats in report["endpoints"].items():
+        print(f"{name:<32}" + "".join(f"{stats[column] if stats[column] is not None else '-':>10}" for column in columns))
+        old = (baseline or {}).get("endpoints", {}).get(name)
+        if old:
+            deltas = []
+            for column in columns[:-1]:
+                if old[column] and stats[column] is not None:
+                    deltas.append(f"{(stats[column] / old[column] - 1) * 100:>+9.0f}%")
+                else:
+                    deltas.append(f"{'-':>10}")
+            print(f"{'  vs ' + str(baseline.get('commit')):<32}" + "".join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--requests", type=int, default=500, help="Запросов на endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=20, help="Запросов прогрева на endpoint (не попадают в отчет)")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", nargs="*", help="Прогнать только endpoint-ы, в названии которых есть подстрока")
+    parser.add_argument("--output", help="Куда записать JSON-отчет")
+    parser.add_argument("--compare", help="JSON-отчет другого прогона для сравнения")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+
+if __name__ == "__main__":
+    main()
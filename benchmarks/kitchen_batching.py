@@ -0,0 +1,137 @@
+"""
+Симуляция кухни: FIFO по одной порции против партий из build_cook_batches.
+
+Запуск: uv run python -m benchmarks.kitchen_batching [--orders 120 --minutes 60 --cooks 3]
+
+Время приготовления партии из n порций одного блюда моделируется как
+base + per_portion * (n - 1): подготовка, прогрев и выдача общие для партии.
+"""
+import argparse
+import heapq
+import json
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from vsm_restaurant.services.kitchen_scheduler import build_cook_batches
+
+# name, популярность, минут на первую порцию, минут на каждую следующую
+MENU = [
+    ("Борщ", 6, 8.0, 0.5),
+    ("Кофе", 10, 2.0, 0.5),
+    ("Салат", 5, 4.0, 1.5),
+    ("Паста", 4, 10.0, 1.0),
+    ("Блины", 4, 6.0, 1.0),
+    ("Чай", 8, 1.0, 0.3),
+    ("Сэндвич", 6, 3.0, 1.0),
+    ("Десерт", 3, 2.0, 0.5),
+]
+
+START = datetime(2025, 1, 1, 12, 0)
+
+
+@dataclass
+class SimTask:
+    id: int
+    menu_item_id: int
+    created_at: datetime
+    ready_at: Optional[datetime] = None
+
+
+def generate_tasks(orders: int, minutes: float, seed: int) -> list[SimTask]:
+    rng = random.Random(seed)
+    weights = [dish[1] for dish in MENU]
+    tasks = []
+    for _ in range(orders):
+        created_at = START + timedelta(minutes=rng.uniform(0, minutes))
+        for _ in range(rng.randint(1, 3)):
+            menu_item_id = rng.choices(range(len(MENU)), weights=weights)[0]
+            tasks.append(SimTask(len(tasks) + 1, menu_item_id, created_at))
+    tasks.sort(key=lambda t: t.created_at)
+    return tasks
+
+
+def cook_minutes(menu_item_id: int, portions: int) -> float:
+    _, _, base, per_portion = MENU[menu_item_id]
+    return base + per_portion * (portions - 1)
+
+
+def simulate(tasks: list[SimTask], cooks: int, max_batch_size: int, max_wait: timedelta) -> dict:
+    tasks = [SimTask(t.id, t.menu_item_id, t.created_at) for t in tasks]
+    arrivals = list(tasks)
+    queue: list[SimTask] = []
+    free_at = [START] * cooks
+    heapq.heapify(free_at)
+    batch_sizes = []
+
+    now = START
+    while arrivals or queue:
+        now = max(now, heapq.heappop(free_at))
+        # Все, что пришло к моменту освобождения повара, попадает в очередь
+        while arrivals and arrivals[0].created_at <= now:
+            queue.append(arrivals.pop(0))
+        if not queue:
+            now = arrivals[0].created_at
+            heapq.heappush(free_at, now)
+            continue
+
+        batch = build_cook_batches(queue, now, max_batch_size, max_wait)[0]
+        done_at = now + timedelta(minutes=cook_minutes(batch.menu_item_id, batch.size))
+        for task in batch.tasks:
+            task.ready_at = done_at
+            queue.remove(task)
+        batch_sizes.append(batch.size)
+        heapq.heappush(free_at, done_at)
+
+    latencies = sorted((t.ready_at - t.created_at).total_seconds() / 60 for t in tasks)
+    makespan_hours = (max(t.ready_at for t in tasks) - START).total_seconds() / 3600
+    return {
+        "tasks": len(tasks),
+        "throughput_per_hour": round(len(tasks) / makespan_hours, 1),
+        "makespan_minutes": round(makespan_hours * 60, 1),
+        "latency_mean_minutes": round(sum(latencies) / len(latencies), 1),
+        "latency_p50_minutes": round(percentile(latencies, 0.50), 1),
+        "latency_p95_minutes": round(percentile(latencies, 0.95), 1),
+        "avg_batch_size": round(sum(batch_sizes) / len(batch_sizes), 2),
+    }
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    index = min(len(sorted_values) - 1, int(q * len(sorted_values)))
+    return sorted_values[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=120)
+    parser.add_argument("--minutes", type=float, default=60, help="За сколько минут поступают заказы")
+    parser.add_argument("--cooks", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=6)
+    parser.add_argument("--max-wait", type=float, default=5, help="Минут ожидания набора партии")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="Вывести результат в JSON")
+    args = parser.parse_args()
+
+    tasks = generate_tasks(args.orders, args.minutes, args.seed)
+    results = {
+        "fifo": simulate(tasks, args.cooks, 1, timedelta(0)),
+        "batched": simulate(tasks, args.cooks, args.batch_size, timedelta(minutes=args.max_wait)),
+    }
+    results["throughput_gain"] = round(
+        results["batched"]["throughput_per_hour"] / results["fifo"]["throughput_per_hour"], 2
+    )
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+
+    metrics = list(results["fifo"].keys())
+    print(f"{'metric':<24}{'fifo':>12}{'batched':>12}")
+    for metric in metrics:
+        print(f"{metric:<24}{results['fifo'][metric]:>12}{results['batched'][metric]:>12}")
+    print(f"throughput gain: x{results['throughput_gain']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+Заполнение локальной БД реалистичными данными для бенчмарков.
+
+Запуск: uv run python -m benchmarks.seed [--orders 5000 --pending 2000 --seed 42]
+
+ВНИМАНИЕ: очищает все таблицы ресторана (TRUNCATE). Только для локальной БД из docker-compose.
+
+Создает:
+- ингредиенты с большим запасом, чтобы нагрузка не упиралась в остатки;
+- меню поезда со составами блюд;
+- историю заказов за последние часы во всех статусах, с позициями, задачами кухни
+  и согласованными счетчиками на заказах;
+- пул заказов с онлайн-оплатой в статусе WAITING_PAYMENT для прогона вебхуков.
+"""
+import argparse
+import json
+import random
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from sqlalchemy import Engine, insert, text
+from sqlmodel import Session
+
+from vsm_restaurant.db import create_db_engine, run_migrations
+from vsm_restaurant.db.cooking_task import CookingStatus, CookingTask
+from vsm_restaurant.db.menu import IngredientModel, MenuItemModel
+from vsm_restaurant.db.orders import Order, OrderItem, OrderStatus, PaymentMethod
+from vsm_restaurant.services.cooking import derive_order_status
+from vsm_restaurant.settings import Settings
+
+INGREDIENT_STOCK = 10_000_000
+
+INGREDIENTS = [
+    "Говядина", "Свекла", "Капуста", "Картофель", "Морковь", "Лук", "Мука", "Яйца",
+    "Молоко", "Сметана", "Сливочное масло", "Зелень", "Огурцы", "Помидоры", "Хлеб",
+    "Сыр", "Курица", "Рис", "Гречка", "Макароны", "Кофе", "Чай", "Сахар", "Лимон",
+]
+
+# name, цена, популярность, [(ингредиент, количество)]
+MENU = [
+    ("Борщ", 390, 6, [("Говядина", 1), ("Свекла", 1), ("Капуста", 1), ("Сметана", 1)]),
+    ("Солянка", 420, 3, [("Говядина", 1), ("Огурцы", 1), ("Лимон", 1)]),
+    ("Куриный суп", 320, 4, [("Курица", 1), ("Морковь", 1), ("Макароны", 1)]),
+    ("Гречка с говядиной", 450, 5, [("Гречка", 1), ("Говядина", 1), ("Лук", 1)]),
+    ("Курица с рисом", 430, 5, [("Курица", 1), ("Рис", 1), ("Сливочное масло", 1)]),
+    ("Макароны по-флотски", 380, 4, [("Макароны", 1), ("Говядина", 1), ("Лук", 1)]),
+    ("Пюре с котлетой", 410, 5, [("Картофель", 2), ("Говядина", 1), ("Молоко", 1)]),
+    ("Блины со сметаной", 250, 5, [("Мука", 1), ("Яйца", 1), ("Молоко", 1), ("Сметана", 1)]),
+    ("Сырники", 290, 4, [("Сыр", 1), ("Мука", 1), ("Яйца", 1), ("Сметана", 1)]),
+    ("Омлет", 260, 4, [("Яйца", 2), ("Молоко", 1), ("Зелень", 1)]),
+    ("Овощной салат", 230, 5, [("Огурцы", 1), ("Помидоры", 1), ("Зелень", 1)]),
+    ("Оливье", 280, 4, [("Картофель", 1), ("Морковь", 1), ("Яйца", 1), ("Огурцы", 1)]),
+    ("Бутерброд с сыром", 150, 6, [("Хлеб", 1), ("Сыр", 1), ("Сливочное масло", 1)]),
+    ("Сэндвич с курицей", 270, 5, [("Хлеб", 1), ("Курица", 1), ("Помидоры", 1)]),
+    ("Кофе", 180, 10, [("Кофе", 1), ("Сахар", 1)]),
+    ("Кофе с молоком", 210, 8, [("Кофе", 1), ("Молоко", 1), ("Сахар", 1)]),
+    ("Чай", 90, 10, [("Чай", 1), ("Сахар", 1)]),
+    ("Чай с лимоном", 110, 7, [("Чай", 1), ("Лимон", 1), ("Сахар", 1)]),
+]
+
+# Распределение истории заказов по статусам
+ORDER_STATUS_WEIGHTS = {
+    OrderStatus.COMPLETED: 55,
+    OrderStatus.PARTIALLY_DELIVERED: 5,
+    OrderStatus.COOKING: 15,
+    OrderStatus.PAID: 8,
+    OrderStatus.WAITING_PAYMENT: 10,
+    OrderStatus.CANCELLED: 7,
+}
+
+PAYMENT_METHOD_WEIGHTS = {
+    PaymentMethod.CARD_ONLINE: 45,
+    PaymentMethod.SBP: 20,
+    PaymentMethod.CARD_TERMINAL: 20,
+    PaymentMethod.CASH: 15,
+}
+
+# Этапы задачи после постановки в очередь и колонка с временем перехода в этап
+TASK_STAGES = [
+    (CookingStatus.COOKING, "cooking_at"),
+    (CookingStatus.READY, "ready_at"),
+    (CookingStatus.DELIVERING, "delivering_at"),
+    (CookingStatus.DELIVERED, "delivered_at"),
+]
+
+TASK_COUNTERS = {
+    CookingStatus.QUEUED: "tasks_queued",
+    CookingStatus.COOKING: "tasks_cooking",
+    CookingStatus.READY: "tasks_ready",
+    CookingStatus.DELIVERING: "tasks_delivering",
+    CookingStatus.DELIVERED: "tasks_delivered",
+}
+
+TRUNCATE_TABLES = [
+    "cooking_tasks", "cooking_latency_buckets", "order_items", "orders", "menu", "ingredients",
+    "kitchen_stations", "idempotency_keys", "sync_tombstones",
+]
+
+
+@dataclass
+class SeededData:
+    menu_item_ids: list[int] = field(default_factory=list)
+    menu_weights: list[int] = field(default_factory=list)
+    history_order_ids: list[int] = field(default_factory=list)
+    pending_online_order_ids: list[int] = field(default_factory=list)  # Для вебхуков оплаты
+    tasks: int = 0
+
+
+def place_id(rng: random.Random, cars: int = 12, seats: int = 54) -> str:
+    return f"{rng.randint(1, cars)}-{rng.randint(1, seats)}"
+
+
+def wipe(session: Session):
+    session.execute(text(f"TRUNCATE {', '.join(TRUNCATE_TABLES)} RESTART IDENTITY CASCADE"))
+
+
+def seed_menu(session: Session) -> tuple[list[int], list[int]]:
+    """Ингредиенты и меню; возвращает id блюд и их веса популярности"""
+    ingredient_ids = dict(zip(
+        INGREDIENTS,
+        session.execute(
+            insert(IngredientModel.__table__).returning(IngredientModel.__table__.c.id, sort_by_parameter_order=True),
+            [{"name": name, "stock": INGREDIENT_STOCK} for name in INGREDIENTS],
+        ).scalars().all(),
+    ))
+    menu_item_ids = session.execute(
+        insert(MenuItemModel.__table__).returning(MenuItemModel.__table__.c.id, sort_by_parameter_order=True),
+        [
+            {
+                "name": name,
+                "price": price,
+                "composition": [
+                    {"ingredient_id": ingredient_ids[ingredient], "quantity": quantity}
+                    for ingredient, quantity in composition
+                ],
+            }
+            for name, price, _, composition in MENU
+        ],
+    ).scalars().all()
+    return list(menu_item_ids), [weight for _, _, weight, _ in MENU]
+
+
+def _task_statuses(order_status: OrderStatus, portions: int, rng: random.Random) -> list[CookingStatus]:
+    if order_status == OrderStatus.COMPLETED:
+        return [CookingStatus.DELIVERED] * portions
+    if order_status == OrderStatus.PAID:
+        return [CookingStatus.QUEUED] * portions
+    if order_status == OrderStatus.PARTIALLY_DELIVERED:
+        delivered = rng.randint(1, portions - 1) if portions > 1 else 1
+        return [CookingStatus.DELIVERED] * delivered + [CookingStatus.READY] * (portions - delivered)
+    # COOKING: хотя бы одна задача в работе, остальные где угодно до доставки
+    statuses = [rng.choice([CookingStatus.QUEUED, CookingStatus.COOKING, CookingStatus.READY]) for _ in range(portions)]
+    statuses[0] = CookingStatus.COOKING
+    return statuses
+
+
+def _insert_orders(
+    session: Session,
+    rng: random.Random,
+    menu_item_ids: list[int],
+    menu_weights: list[int],
+    statuses: list[OrderStatus],
+    payment_methods: list[PaymentMethod],
+    now: datetime,
+    history_hours: float,
+) -> tuple[list[int], int]:
+    if not statuses:
+        return [], 0  # Пустой список параметров выполнил бы один INSERT без значений
+
+    names = {menu_item_id: dish[0] for menu_item_id, dish in zip(menu_item_ids, MENU)}
+    prices = {menu_item_id: float(dish[1]) for menu_item_id, dish in zip(menu_item_ids, MENU)}
+
+    carts = []
+    for _ in statuses:
+        dishes = rng.choices(menu_item_ids, weights=menu_weights, k=rng.randint(1, 4))
+        carts.append(Counter(dishes))
+
+    order_rows = []
+    for status, payment_method, cart in zip(statuses, payment_methods, carts):
+        created_at = now - timedelta(hours=rng.uniform(0, history_hours))
+        order_rows.append({
+            "place_id": place_id(rng),
+            "created_at": created_at,
+            "updated_at": created_at,
+            "payment_timeout_at": now + timedelta(hours=2) if status == OrderStatus.WAITING_PAYMENT else None,
+            "payment_method": payment_method,
+            "status": status,
+            "total_price": sum(prices[dish] * quantity for dish, quantity in cart.items()),
+            "item_count": len(cart),
+            **{counter: 0 for counter in ["tasks_total", *TASK_COUNTERS.values()]},
+        })
+
+    for row, cart in zip(order_rows, carts):
+        if row["status"] in (OrderStatus.WAITING_PAYMENT, OrderStatus.CANCELLED):
+            row["_tasks"] = []
+            continue
+        portions = [dish for dish, quantity in cart.items() for _ in range(quantity)]
+        row["_tasks"] = list(zip(portions, _task_statuses(row["status"], len(portions), rng)))
+        row["tasks_total"] = len(portions)
+        for _, task_status in row["_tasks"]:
+            row[TASK_COUNTERS[task_status]] += 1
+        # Статус приводится к счетчикам так же, как это делает кухня (заказ из одной порции не бывает частично доставлен)
+        row["status"] = derive_order_status(
+            row["tasks_total"], row["tasks_queued"], row["tasks_delivered"]
+        ) or row["status"]
+
+    orders_table = Order.__table__
+    order_ids = session.execute(
+        insert(orders_table).returning(orders_table.c.id, sort_by_parameter_order=True),
+        [{key: value for key, value in row.items() if not key.startswith("_")} for row in order_rows],
+    ).scalars().all()
+
+    item_rows = [
+        {
+            "order_id": order_id,
+            "menu_item_id": dish,
+            "quantity": quantity,
+            "name": names[dish],
+            "unit_price": prices[dish],
+        }
+        for order_id, cart in zip(order_ids, carts)
+        for dish, quantity in cart.items()
+    ]
+    session.execute(insert(OrderItem.__table__), item_rows)
+
+    task_rows = []
+    for order_id, row in zip(order_ids, order_rows):
+        for dish, task_status in row["_tasks"]:
+            queued_at = row["created_at"] + timedelta(minutes=rng.uniform(0.5, 3))
+            task = {
+                "order_id": order_id,
+                "menu_item_id": dish,
+                "status": task_status,
+                "created_at": queued_at,
+                "queued_at": queued_at,
+                "cooking_at": None,
+                "ready_at": None,
+                "delivering_at": None,
+                "delivered_at": None,
+            }
+            # Метки времени пройденных этапов по порядку, чтобы отчеты по задержкам кухни были правдоподобными
+            at = queued_at
+            reached = list(CookingStatus).index(task_status)
+            for stage, column in TASK_STAGES[:reached]:
+                at += timedelta(minutes=rng.uniform(1, 12))
+                task[column] = at
+            task_rows.append(task)
+    if task_rows:
+        session.execute(insert(CookingTask.__table__), task_rows)
+
+    return list(order_ids), len(task_rows)
+
+
+def seed_database(
+    engine: Engine,
+    orders: int,
+    pending: int,
+    seed: int = 42,
+    history_hours: float = 6,
+) -> SeededData:
+    """Очищает БД и заполняет ее заново; при одинаковом seed данные одинаковые"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    data = SeededData()
+
+    with Session(engine) as session:
+        wipe(session)
+        data.menu_item_ids, data.menu_weights = seed_menu(session)
+
+        statuses = rng.choices(list(ORDER_STATUS_WEIGHTS), weights=list(ORDER_STATUS_WEIGHTS.values()), k=orders)
+        payment_methods = rng.choices(
+            list(PAYMENT_METHOD_WEIGHTS), weights=list(PAYMENT_METHOD_WEIGHTS.values()), k=orders
+        )
+        data.history_order_ids, data.tasks = _insert_orders(
+            session, rng, data.menu_item_ids, data.menu_weights, statuses, payment_methods, now, history_hours
+        )
+
+        data.pending_online_order_ids, _ = _insert_orders(
+            session, rng, data.menu_item_ids, data.menu_weights,
+            [OrderStatus.WAITING_PAYMENT] * pending, [PaymentMethod.CARD_ONLINE] * pending, now, 0.1,
+        )
+        session.commit()
+
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=5000, help="Заказов в истории")
+    parser.add_argument("--pending", type=int, default=2000, help="Заказов, ожидающих онлайн-оплаты")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    settings = Settings()
+    run_migrations(settings)
+    data = seed_database(create_db_engine(settings), args.orders, args.pending, args.seed)
+    print(json.dumps({
+        "menu_items": len(data.menu_item_ids),
+        "orders": len(data.history_order_ids),
+        "pending_online_orders": len(data.pending_online_order_ids),
+        "cooking_tasks": data.tasks,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
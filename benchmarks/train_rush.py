@@ -0,0 +1,355 @@
+"""
+Нагрузка "полный поезд": сотни мест заказывают в первые минуты после отправления.
+
+Запуск (сервис и платежный сервис из docker-compose):
+    uv run python -m benchmarks.train_rush --reset [--seats 400 --window 5 --cooks 6 --waiters 4 --output rush.json]
+
+Повара забирают самые старые задачи, поэтому очередь кухни перед прогоном должна быть пустой:
+иначе отчет измеряет разбор чужого хвоста (например, истории из benchmarks.seed), а не наплыв.
+--reset очищает локальную БД и оставляет только меню и ингредиенты (seed_database без заказов);
+без него прогон не стартует, если /kitchen/queue не пуст.
+
+Участники:
+- пассажиры - каждое место в случайный момент окна --window (минуты) оформляет заказ;
+  онлайн-оплата (карта, СБП) подтверждается через фейковый платежный сервис
+  (/confirm/{payment_id}, он сам шлет вебхук), наличные и терминал - официантом;
+- повара - забирают задачи через /kitchen/claim, готовят --cook-seconds и отдают готовое;
+- официанты - у каждого своя часть заказов: подтверждают оплату на месте,
+  забирают готовые задачи и разносят их (DELIVERING, через --walk-seconds DELIVERED);
+- трекер - как телефоны пассажиров, раз в --poll-seconds спрашивает статусы
+  незавершенных заказов пачками через /passenger/orders/status.
+
+Отчет: перцентили времени от заказа до оплаты и до выдачи (точность - период опроса),
+число недоставленных заказов и для каждой операции число запросов, доля ошибок и задержки.
+Если платежный сервис не может достучаться до API (запуск вне docker-compose),
+используйте --payment-mode webhook: вебхук оплаты отправляется в API напрямую.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+import httpx
+
+from benchmarks.endpoints import git_commit, percentile
+from benchmarks.seed import place_id, seed_database
+from vsm_restaurant.db import create_db_engine
+from vsm_restaurant.db.orders import OrderStatus, PaymentMethod
+from vsm_restaurant.settings import Settings
+
+PAYMENT_MIX = {
+    PaymentMethod.CARD_ONLINE: 45,
+    PaymentMethod.SBP: 25,
+    PaymentMethod.CASH: 20,
+    PaymentMethod.CARD_TERMINAL: 10,
+}
+WAITER_PAYMENT_METHODS = {PaymentMethod.CASH.value, PaymentMethod.CARD_TERMINAL.value}
+PAID_STATUSES = {
+    OrderStatus.PAID.value,
+    OrderStatus.COOKING.value,
+    OrderStatus.PARTIALLY_DELIVERED.value,
+    OrderStatus.COMPLETED.value,
+}
+STATUS_BATCH_SIZE = 50  # Максимум заказов в одном /passenger/orders/status
+
+
+@dataclass
+class OrderTrace:
+    order_id: int
+    payment_method: str
+    created_at: float  # time.monotonic()
+    paid_at: Optional[float] = None
+    delivered_at: Optional[float] = None
+    cancelled: bool = False
+
+
+@dataclass
+class OperationStats:
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+
+    def report(self) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            "requests": len(latencies),
+            "errors": self.errors,
+            "error_rate": round(self.errors / len(latencies), 4) if latencies else 0.0,
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 1) if latencies else None,
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 1) if latencies else None,
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 1) if latencies else None,
+        }
+
+
+def latency_summary(values: list[float]) -> dict:
+    values = sorted(values)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "p50": round(percentile(values, 0.50), 1),
+        "p95": round(percentile(values, 0.95), 1),
+        "p99": round(percentile(values, 0.99), 1),
+        "max": round(values[-1], 1),
+    }
+
+
+class TrainRush:
+    def __init__(self, args, api: httpx.AsyncClient, payments: httpx.AsyncClient):
+        self.args = args
+        self.api = api
+        self.payments = payments
+        self.rng = random.Random(args.seed)
+        self.orders: dict[int, OrderTrace] = {}
+        self.failed_orders = 0
+        self.operations: dict[str, OperationStats] = {}
+        self.passengers_done = asyncio.Event()
+        self.menu_item_ids: list[int] = []
+
+    async def call(self, operation: str, request) -> Optional[httpx.Response]:
+        """Выполняет запрос и учитывает его; ошибка - сетевой сбой или код 4xx/5xx"""
+        stats = self.operations.setdefault(operation, OperationStats())
+        started = time.perf_counter()
+        try:
+            response = await request
+        except httpx.HTTPError:
+            response = None
+        stats.latencies.append(time.perf_counter() - started)
+        if response is None or response.status_code >= 400:
+            stats.errors += 1
+            return None
+        return response
+
+    def active_orders(self) -> list[OrderTrace]:
+        return [order for order in self.orders.values() if order.delivered_at is None and not order.cancelled]
+
+    async def passenger(self, seat: str, arrive_in: float):
+        await asyncio.sleep(arrive_in)
+        payment_method = self.rng.choices(list(PAYMENT_MIX), weights=list(PAYMENT_MIX.values()))[0]
+        items = [
+            {"menu_item_id": menu_item_id, "quantity": self.rng.choice([1, 1, 1, 2])}
+            for menu_item_id in self.rng.sample(self.menu_item_ids, self.rng.randint(1, min(3, len(self.menu_item_ids))))
+        ]
+        created_at = time.monotonic()
+        response = await self.call("create_order", self.api.post(
+            "/orders",
+            json={"place_id": seat, "payment_method": payment_method.value, "items": items},
+            headers={"Idempotency-Key": f"rush-{self.args.seed}-{seat}-{created_at}"},
+        ))
+        if response is None:
+            self.failed_orders += 1
+            return
+
+        result = response.json()
+        order = OrderTrace(result["order_id"], payment_method.value, created_at)
+        self.orders[order.order_id] = order
+        if payment_method.value in WAITER_PAYMENT_METHODS:
+            return
+
+        # Пассажир какое-то время вводит данные карты или подтверждает платеж в банке
+        await asyncio.sleep(self.rng.uniform(*self.args.pay_seconds))
+        if self.args.payment_mode == "webhook":
+            await self.call("payment_webhook", self.api.post(
+                "/payments/webhook", json={"order_id": order.order_id, "status": "success"}
+            ))
+        else:
+            payment_id = result["payment_link"].rstrip("/").rsplit("/", 1)[-1]
+            await self.call("payment_service_confirm", self.payments.post(f"/confirm/{payment_id}"))
+
+    async def cook(self):
+        while True:
+            response = await self.call("kitchen_claim", self.api.post("/kitchen/claim", json={"count": self.args.claim_batch}))
+            claimed = response.json()["claimed"] if response else []
+            if not claimed:
+                if self.passengers_done.is_set() and not self.active_orders():
+                    return
+                await asyncio.sleep(self.args.poll_seconds)
+                continue
+
+            await asyncio.sleep(self.args.cook_seconds)
+            await self.call("tasks_ready", self.api.patch("/tasks", json={
+                "updates": [{"task_id": task["task_id"], "status": "ready"} for task in claimed]
+            }))
+
+    async def waiter(self, number: int):
+        # Официант обслуживает только заказы этого прогона из своей части поезда
+        def mine(order_id: int) -> bool:
+            return order_id in self.orders and order_id % self.args.waiters == number
+
+        while True:
+            response = await self.call("waiter_orders", self.api.get("/waiter/orders", params={"status": "waiting_payment"}))
+            for summary in response.json() if response else []:
+                if mine(summary["id"]) and summary["payment_method"] in WAITER_PAYMENT_METHODS:
+                    await self.call("waiter_confirm_payment", self.api.post(
+                        f"/waiter/orders/{summary['id']}/payment",
+                        json={"payment_method": summary["payment_method"]},
+                        headers={"Idempotency-Key": f"rush-{self.args.seed}-pay-{summary['id']}"},
+                    ))
+
+            response = await self.call("waiter_ready_tasks", self.api.get("/waiter/tasks", params={"status": "ready"}))
+            ready = [task["task_id"] for task in (response.json() if response else []) if mine(task["order_id"])]
+            if ready:
+                await self.call("tasks_delivering", self.api.patch("/tasks", json={
+                    "updates": [{"task_id": task_id, "status": "delivering"} for task_id in ready]
+                }))
+                await asyncio.sleep(self.args.walk_seconds)
+                await self.call("tasks_delivered", self.api.patch("/tasks", json={
+                    "updates": [{"task_id": task_id, "status": "delivered"} for task_id in ready]
+                }))
+                continue
+
+            if self.passengers_done.is_set() and not self.active_orders():
+                return
+            await asyncio.sleep(self.args.poll_seconds)
+
+    async def tracker(self):
+        while not (self.passengers_done.is_set() and not self.active_orders()):
+            active = self.active_orders()
+            for start in range(0, len(active), STATUS_BATCH_SIZE):
+                batch = {order.order_id: order for order in active[start:start + STATUS_BATCH_SIZE]}
+                response = await self.call("passenger_status", self.api.post(
+                    "/passenger/orders/status", json={"order_ids": list(batch)}
+                ))
+                if response is None:
+                    continue
+                now = time.monotonic()
+                for status in response.json()["orders"]:
+                    order = batch[status["order_id"]]
+                    if status["status"] in PAID_STATUSES and order.paid_at is None:
+                        order.paid_at = now
+                    if status["status"] == OrderStatus.COMPLETED.value:
+                        order.delivered_at = now
+                    elif status["status"] == OrderStatus.CANCELLED.value:
+                        order.cancelled = True
+            await asyncio.sleep(self.args.poll_seconds)
+
+    async def run(self) -> float:
+        response = await self.call("kitchen_queue", self.api.get("/kitchen/queue"))
+        queued = sum(batch["size"] for batch in response.json()) if response else 0
+        if queued:
+            raise SystemExit(f"Kitchen queue has {queued} tasks: run with --reset to start from a menu-only DB")
+
+        response = await self.call("available_menu", self.api.get("/passenger/menu/available"))
+        self.menu_item_ids = [item["id"] for item in response.json()["available_items"]] if response else []
+        if not self.menu_item_ids:
+            raise SystemExit("No available menu items: seed the database first (python -m benchmarks.seed)")
+
+        started = time.monotonic()
+        seats = [place_id(self.rng, self.args.cars, self.args.seats_per_car) for _ in range(self.args.seats)]
+        passengers = [
+            self.passenger(seat, self.rng.uniform(0, self.args.window * 60)) for seat in seats
+        ]
+        staff = [
+            *(self.cook() for _ in range(self.args.cooks)),
+            *(self.waiter(number) for number in range(self.args.waiters)),
+            self.tracker(),
+        ]
+        staff_tasks = [asyncio.create_task(coroutine) for coroutine in staff]
+
+        await asyncio.gather(*passengers)
+        self.passengers_done.set()
+        try:
+            await asyncio.wait_for(asyncio.gather(*staff_tasks), timeout=self.args.timeout * 60)
+        except asyncio.TimeoutError:
+            pass  # Недоставленные заказы попадут в отчет
+        return time.monotonic() - started
+
+    def report(self, duration: float) -> dict:
+        orders = list(self.orders.values())
+        return {
+            "commit": git_commit(),
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "params": {
+                name: value for name, value in vars(self.args).items() if name not in ("output",)
+            },
+            "duration_seconds": round(duration, 1),
+            "orders": {
+                "placed": len(orders),
+                "failed_to_place": self.failed_orders,
+                "paid": sum(order.paid_at is not None for order in orders),
+                "delivered": sum(order.delivered_at is not None for order in orders),
+                "cancelled": sum(order.cancelled for order in orders),
+                "undelivered": len(self.active_orders()),
+            },
+            "latency_seconds": {
+                "order_to_paid": latency_summary(
+                    [order.paid_at - order.created_at for order in orders if order.paid_at is not None]
+                ),
+                "paid_to_delivery": latency_summary([
+                    order.delivered_at - order.paid_at
+                    for order in orders if order.delivered_at is not None and order.paid_at is not None
+                ]),
+                "order_to_delivery": latency_summary(
+                    [order.delivered_at - order.created_at for order in orders if order.delivered_at is not None]
+                ),
+            },
+            "operations": {name: stats.report() for name, stats in sorted(self.operations.items())},
+        }
+
+
+def print_report(report: dict):
+    print(f"commit {report['commit']}, {report['params']['seats']} seats, {report['duration_seconds']} s")
+    print("orders: " + ", ".join(f"{name}={count}" for name, count in report["orders"].items()))
+    print(f"{'latency, s':<22}" + "".join(f"{column:>8}" for column in ["count", "p50", "p95", "p99", "max"]))
+    for name, stats in report["latency_seconds"].items():
+        print(f"{name:<22}" + "".join(
+            f"{stats.get(column, '-'):>8}" for column in ["count", "p50", "p95", "p99", "max"]
+        ))
+    columns = ["requests", "errors", "error_rate", "p50_ms", "p95_ms", "p99_ms"]
+    print(f"{'operation':<26}" + "".join(f"{column:>11}" for column in columns))
+    for name, stats in report["operations"].items():
+        print(f"{name:<26}" + "".join(
+            f"{stats[column] if stats[column] is not None else '-':>11}" for column in columns
+        ))
+
+
+async def main_async(args) -> dict:
+    limits = httpx.Limits(max_connections=args.max_connections)
+    async with (
+        httpx.AsyncClient(base_url=args.base_url, timeout=args.http_timeout, limits=limits) as api,
+        httpx.AsyncClient(base_url=args.payment_url, timeout=args.http_timeout, limits=limits) as payments,
+    ):
+        rush = TrainRush(args, api, payments)
+        duration = await rush.run()
+        return rush.report(duration)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--payment-url", default="http://127.0.0.1:8001")
+    parser.add_argument("--payment-mode", choices=["service", "webhook"], default="service")
+    parser.add_argument("--seats", type=int, default=400, help="Сколько мест делают заказ")
+    parser.add_argument("--cars", type=int, default=12)
+    parser.add_argument("--seats-per-car", type=int, default=54)
+    parser.add_argument("--window", type=float, default=5, help="За сколько минут после отправления приходят заказы")
+    parser.add_argument("--pay-seconds", type=float, nargs=2, default=(5, 40), help="Сколько пассажир оплачивает онлайн")
+    parser.add_argument("--cooks", type=int, default=6)
+    parser.add_argument("--claim-batch", type=int, default=3, help="Сколько задач повар берет за раз")
+    parser.add_argument("--cook-seconds", type=float, default=20, help="Время готовки взятых задач (сжатое)")
+    parser.add_argument("--waiters", type=int, default=4)
+    parser.add_argument("--walk-seconds", type=float, default=15, help="Время прохода официанта с подносом (сжатое)")
+    parser.add_argument("--poll-seconds", type=float, default=1)
+    parser.add_argument("--timeout", type=float, default=20, help="Сколько минут ждать выдачи всех заказов")
+    parser.add_argument("--http-timeout", type=float, default=30)
+    parser.add_argument("--max-connections", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="Очистить локальную БД, оставив только меню (TRUNCATE)")
+    parser.add_argument("--output", help="Куда записать JSON-отчет")
+    args = parser.parse_args()
+
+    if args.reset:
+        seed_database(create_db_engine(Settings()), orders=0, pending=0, seed=args.seed)
+
+    report = asyncio.run(main_async(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
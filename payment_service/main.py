@@ -28,25 +28,30 @@ from fastapi import FastAPI, HTTPException
 from fastapi.responses import HTMLResponse
 from pydantic import BaseModel
 import httpx
-import random
+import uuid
 
 app = FastAPI(title="Fake Payment Service")
 
 # Временное хранилище для демо
 payments_db = {}
+# Индекс order_id -> payment_id последнего платежа по заказу
+payments_by_order = {}
 
 class PaymentCreateRequest(BaseModel):
     order_id: int
     amount: float
     type: str = "card"
 
+class BulkStatusRequest(BaseModel):
+    order_ids: list[int]
+
 @app.post("/create")
 def create_payment(request: PaymentCreateRequest):
     order_id = request.order_id
     amount = request.amount
     payment_type = request.type
-    # Генерируем ссылку на оплату
-    payment_id = f"pay_{random.randint(1000, 9999)}"
+    # Генерируем ссылку на оплату (id уникален: при сотнях заказов короткие случайные номера совпадали)
+    payment_id = f"pay_{uuid.uuid4().hex[:12]}"
     
     # Для СБП генерируем специальную ссылку
     if payment_type == "sbp":
@@ -60,6 +65,7 @@ def create_payment(request: PaymentCreateRequest):
         "status": "pending",
         "type": payment_type
     }
+    payments_by_order[order_id] = payment_id
     
     return {
         "payment_id": payment_id,
@@ -202,9 +208,29 @@ def cancel_payment(payment_id: str):
 @app.post("/refund")
 def refund_payment(order_id: int):
     """Возврат средств"""
+    payment_id = payments_by_order.get(order_id)
+    if payment_id:
+        payments_db[payment_id]["status"] = "refunded"
     print(f"Refund issued for order {order_id}")
     return {"status": "refunded", "order_id": order_id}
 
+@app.post("/status/bulk")
+def bulk_payment_status(request: BulkStatusRequest):
+    """Статусы платежей для пачки заказов (для сверки с рестораном)"""
+    payments = {}
+    for order_id in request.order_ids:
+        payment_id = payments_by_order.get(order_id)
+        if not payment_id:
+            continue
+        payment = payments_db[payment_id]
+        payments[order_id] = {
+            "payment_id": payment_id,
+            "status": payment["status"],
+            "amount": payment["amount"],
+            "type": payment["type"],
+        }
+    return {"payments": payments}
+
 @app.post("/webhook")
 def send_webhook(order_id: int):
     """Ручной вызов вебхука (для тестирования)"""
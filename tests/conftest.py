@@ -0,0 +1,68 @@
+import itertools
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, create_engine
+
+from vsm_restaurant.db.cooking_task import CookingLatencyBucket, CookingTask, KitchenStation
+from vsm_restaurant.db.menu import IngredientModel, MenuItemModel
+from vsm_restaurant.db.orders import Order, OrderItem
+from vsm_restaurant.dependencies import get_engine, get_session, get_settings
+from vsm_restaurant.settings import Settings
+
+# Таблицы ресторана без специфичных для Postgres частей (надгробия, ключи идемпотентности и т.п.)
+SQLITE_TABLES = [IngredientModel, MenuItemModel, KitchenStation, Order, OrderItem, CookingTask, CookingLatencyBucket]
+
+
+@compiles(JSONB, "sqlite")
+def _compile_jsonb_for_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+def create_sqlite_engine():
+    """
+    In-memory SQLite со схемой ресторана для тестов без Postgres.
+
+    Последовательность версий синхронизации заменена функцией nextval, триггеров нет:
+    change_version выставляется только при вставке.
+    """
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    versions = itertools.count(1)
+
+    @event.listens_for(engine, "connect")
+    def register_functions(dbapi_connection, connection_record):
+        dbapi_connection.create_function("nextval", 1, lambda sequence: next(versions))
+
+    for model in SQLITE_TABLES:
+        model.__table__.create(engine)
+    return engine
+
+
+@pytest.fixture
+def sqlite_engine():
+    engine = create_sqlite_engine()
+    yield engine
+    engine.dispose()
+
+
+def make_client(engine, *routers: APIRouter) -> TestClient:
+    """Приложение только с нужными роутерами поверх engine, без lifespan (миграций и фоновых задач)"""
+    app = FastAPI()
+    for router in routers:
+        app.include_router(router)
+
+    def session_override():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = session_override
+    app.dependency_overrides[get_engine] = lambda: engine
+    app.dependency_overrides[get_settings] = lambda: Settings()
+    return TestClient(app)
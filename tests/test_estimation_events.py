@@ -0,0 +1,48 @@
+from sqlmodel import Field, Session, SQLModel, create_engine
+
+from vsm_restaurant.services.estimation import notify_after_commit
+
+
+class Row(SQLModel, table=True):
+    __tablename__ = "estimation_events_test_rows"
+    id: int = Field(primary_key=True)
+
+
+def make_session() -> Session:
+    engine = create_engine("sqlite://")
+    Row.__table__.create(engine)
+    return Session(engine)
+
+
+def test_rolled_back_savepoint_keeps_callbacks_of_other_savepoints():
+    fired = []
+    with make_session() as session:
+        session.add(Row(id=1))
+        session.flush()
+        notify_after_commit(session, lambda: fired.append("outer"))
+        for number in range(3):
+            try:
+                with session.begin_nested():
+                    notify_after_commit(session, lambda number=number: fired.append(number))
+                    if number == 1:
+                        raise ValueError
+            except ValueError:
+                pass
+        assert fired == []  # Освобождение savepoint-а - еще не коммит
+        session.commit()
+
+    assert fired == ["outer", 0, 2]
+
+
+def test_outer_rollback_discards_released_savepoints():
+    fired = []
+    with make_session() as session:
+        session.add(Row(id=1))
+        session.flush()
+        with session.begin_nested():
+            notify_after_commit(session, lambda: fired.append("released"))
+        session.rollback()
+        session.add(Row(id=2))
+        session.commit()
+
+    assert fired == []
@@ -0,0 +1,32 @@
+from sqlmodel import Session
+
+from conftest import make_client
+from vsm_restaurant.db.cooking_task import CookingTask
+from vsm_restaurant.db.orders import Order, OrderStatus
+from vsm_restaurant.testing import count_queries
+from vsm_restaurant.web.kitchen import router
+
+
+def queue_tasks(engine, count: int):
+    with Session(engine) as session:
+        order = Order(place_id="1-1", status=OrderStatus.PAID, tasks_total=count, tasks_queued=count)
+        session.add(order)
+        session.flush()
+        session.add_all(CookingTask(order_id=order.id, menu_item_id=1) for _ in range(count))
+        session.commit()
+
+
+def test_claim_does_not_reload_tasks_after_commit(sqlite_engine):
+    client = make_client(sqlite_engine, router)
+    selects = {}
+    for count in (1, 10):
+        queue_tasks(sqlite_engine, count)
+        with count_queries(sqlite_engine) as log:
+            response = client.post("/kitchen/claim", json={"count": count})
+
+        assert response.status_code == 200, response.text
+        claimed = response.json()["claimed"]
+        assert len(claimed) == count and all(task["cooking_at"] for task in claimed)
+        selects[count] = sum(statement.lstrip().upper().startswith("SELECT") for statement in log.statements)
+
+    assert selects[10] == selects[1]
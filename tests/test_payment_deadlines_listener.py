@@ -0,0 +1,31 @@
+import asyncio
+
+from vsm_restaurant.services import payment_timeout
+from vsm_restaurant.services.payment_timeout import PaymentDeadlineScheduler, PaymentTimeoutService
+from vsm_restaurant.settings import Settings
+
+
+def test_listener_reconnects_and_rebuilds_schedule(monkeypatch):
+    monkeypatch.setattr(payment_timeout, "LISTEN_RETRY_MIN_SECONDS", 0.01)
+    service = PaymentTimeoutService(Settings(), PaymentDeadlineScheduler())
+    calls = []
+
+    def listen(engine, stop, listening, session_factory=None):
+        calls.append(session_factory)
+        if len(calls) < 3:
+            raise ConnectionError("connection lost")
+        listening.set()
+        stop.wait()
+
+    monkeypatch.setattr(service, "_listen_for_deadlines", listen)
+
+    async def run():
+        job = asyncio.create_task(service.listen_for_deadlines(engine=None, session_factory="factory"))
+        while len(calls) < 3:
+            await asyncio.sleep(0.01)
+        assert not job.done()
+        job.cancel()
+
+    asyncio.run(run())
+    # Первое подключение без досыпания (его делает первая проверка БД), переподключения - с ним
+    assert calls == [None, "factory", "factory"]
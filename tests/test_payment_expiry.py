@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+
+from sqlmodel import Session, select
+
+from vsm_restaurant.db.orders import Order, OrderStatus
+from vsm_restaurant.services import payment_timeout
+from vsm_restaurant.services.payment_timeout import EXPIRED_CHANNEL, expire_overdue_orders
+
+
+def test_expired_orders_are_published_per_chunk(sqlite_engine, monkeypatch):
+    monkeypatch.setattr(payment_timeout, "EXPIRED_NOTIFY_BATCH", 2)
+    notifications = []
+    with sqlite_engine.connect() as connection:
+        connection.connection.driver_connection.create_function(
+            "pg_notify", 2, lambda channel, payload: notifications.append((channel, payload))
+        )
+
+    now = datetime.now()
+    with Session(sqlite_engine) as session:
+        session.add_all(
+            Order(place_id=f"1-{seat}", payment_timeout_at=now - timedelta(minutes=1)) for seat in range(5)
+        )
+        session.add(Order(place_id="2-1", payment_timeout_at=now + timedelta(minutes=10)))
+        session.commit()
+
+        expired_ids = expire_overdue_orders(session, now, chunk_size=3)
+        cancelled = session.exec(select(Order.id).where(Order.status == OrderStatus.CANCELLED)).all()
+
+    assert sorted(expired_ids) == sorted(cancelled) == [1, 2, 3, 4, 5]
+    published = [int(order_id) for _, payload in notifications for order_id in payload.split(",")]
+    assert {channel for channel, _ in notifications} == {EXPIRED_CHANNEL}
+    assert sorted(published) == [1, 2, 3, 4, 5]
+    assert max(len(payload.split(",")) for _, payload in notifications) == 2
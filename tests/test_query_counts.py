@@ -0,0 +1,49 @@
+import pytest
+from sqlmodel import Session, func, select
+
+from conftest import make_client
+from vsm_restaurant.db.cooking_task import CookingTask
+from vsm_restaurant.db.menu import MenuItemModel
+from vsm_restaurant.db.orders import Order, OrderStatus
+from vsm_restaurant.testing import assert_query_count_stable
+from vsm_restaurant.web.waiter import router
+
+
+def make_tasks(engine):
+    """seed(n) для assert_query_count_stable: доводит число задач кухни до n, по заказу на задачу"""
+    def seed(size: int):
+        with Session(engine) as session:
+            menu_item = session.exec(select(MenuItemModel)).first()
+            if menu_item is None:
+                menu_item = MenuItemModel(name="Борщ", price=350, composition=[])
+                session.add(menu_item)
+                session.flush()
+            existing = session.exec(select(func.count(CookingTask.id))).one()
+            for seat in range(existing, size):
+                order = Order(place_id=f"1-{seat}", status=OrderStatus.COOKING)
+                session.add(order)
+                session.flush()
+                session.add(CookingTask(order_id=order.id, menu_item_id=menu_item.id))
+            session.commit()
+    return seed
+
+
+def test_waiter_tasks_query_count_does_not_grow(sqlite_engine):
+    client = make_client(sqlite_engine, router)
+
+    def request():
+        response = client.get("/waiter/tasks")
+        assert response.status_code == 200, response.text
+
+    assert_query_count_stable(sqlite_engine, seed=make_tasks(sqlite_engine), request=request, sizes=(1, 10))
+
+
+def test_query_count_check_catches_n_plus_one(sqlite_engine):
+    def request():
+        # Место заказа отдельным запросом на каждую задачу
+        with Session(sqlite_engine) as session:
+            for task in session.exec(select(CookingTask)).all():
+                session.get(Order, task.order_id)
+
+    with pytest.raises(AssertionError, match="Query count grows with data size"):
+        assert_query_count_stable(sqlite_engine, seed=make_tasks(sqlite_engine), request=request, sizes=(1, 10))
@@ -0,0 +1,58 @@
+from contextlib import nullcontext
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from vsm_restaurant.db.orders import Order, OrderStatus, PaymentMethod
+from vsm_restaurant.dependencies import get_engine, get_session, get_settings
+from vsm_restaurant.settings import Settings
+from vsm_restaurant.web.waiter import router
+
+
+class FakeSession:
+    """Сессия без БД: exec по очереди возвращает заданные результаты"""
+    def __init__(self, *results):
+        self.results = list(results)
+        self.committed = False
+
+    def exec(self, statement):
+        rows = self.results.pop(0) if self.results else []
+        return type("Result", (), {"all": lambda _: rows})()
+
+    def begin_nested(self):
+        return nullcontext()
+
+    def commit(self):
+        self.committed = True
+
+
+def make_client(session: FakeSession) -> TestClient:
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_session] = lambda: session
+    app.dependency_overrides[get_engine] = lambda: None
+    app.dependency_overrides[get_settings] = lambda: Settings()
+    return TestClient(app)
+
+
+def test_bulk_status_route_is_not_shadowed_by_order_id_route():
+    session = FakeSession([Order(id=1, place_id="1-1", status=OrderStatus.PAID)])
+    response = make_client(session).patch(
+        "/waiter/orders/bulk/status", json={"updates": [{"order_id": 1, "status": "cooking"}]}
+    )
+
+    assert response.status_code == 200, response.text
+    assert response.json()["succeeded"] == 1
+    assert session.committed
+
+
+def test_bulk_payment_route_is_not_shadowed_by_order_id_route():
+    order = Order(id=1, place_id="1-1", status=OrderStatus.WAITING_PAYMENT, payment_method=PaymentMethod.CASH)
+    session = FakeSession([order], [])  # Заказы, затем позиции заказов для задач кухни
+    response = make_client(session).post(
+        "/waiter/orders/bulk/payment", json={"confirmations": [{"order_id": 1, "payment_method": "cash"}]}
+    )
+
+    assert response.status_code == 200, response.text
+    assert response.json()["succeeded"] == 1
+    assert order.status == OrderStatus.PAID
@@ -0,0 +1,27 @@
+from vsm_restaurant.db.orders import OrderStatus, PaymentMethod
+from vsm_restaurant.web.waiter import get_waiter_summary
+
+
+class FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def exec(self, statement):
+        return type("Result", (), {"all": lambda _: self.rows})()
+
+
+def test_payment_method_revenue_excludes_unpaid_and_cancelled_orders():
+    session = FakeSession([
+        (OrderStatus.COMPLETED, PaymentMethod.CASH, 2, 300),
+        (OrderStatus.WAITING_PAYMENT, PaymentMethod.CASH, 1, 100),
+        (OrderStatus.CANCELLED, PaymentMethod.CASH, 1, 50),
+        (OrderStatus.PAID, PaymentMethod.SBP, 1, 70),
+    ])
+
+    summary = get_waiter_summary(session)
+
+    cash = summary.by_payment_method[PaymentMethod.CASH]
+    assert (cash.count, cash.amount, cash.revenue) == (4, 450, 300)
+    assert summary.by_payment_method[PaymentMethod.SBP].revenue == 70
+    assert summary.by_status[OrderStatus.CANCELLED].revenue == 0
+    assert summary.revenue == 370
@@ -8,7 +8,9 @@ from ..settings import Settings
 # ТОЛЬКО SQLModel модели для Alembic
 from .menu import IngredientModel, MenuItemModel
 from .orders import Order, OrderItem
-from .cooking_task import CookingTask
+from .cooking_task import CookingLatencyBucket, CookingTask, KitchenStation
+from .idempotency import IdempotencyKey
+from .sync import SyncTombstone
 
 def run_migrations(settings: Settings):
     alembic_cfg = alembic.config.Config("alembic.ini")
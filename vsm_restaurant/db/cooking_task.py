@@ -3,8 +3,11 @@ from enum import Enum
 from typing import Optional
 
 from sqlalchemy import Column, DateTime
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlmodel import Field, SQLModel, Relationship
 
+from .sync import change_version_column, change_xid_column
+
 class CookingStatus(str, Enum):
     QUEUED = "queued"
     COOKING = "cooking"
@@ -12,14 +15,49 @@ class CookingStatus(str, Enum):
     DELIVERING = "delivering"
     DELIVERED = "delivered"
 
+class KitchenStation(SQLModel, table=True):
+    """Отдельный камбуз/цех поезда со своей очередью задач"""
+    __tablename__ = "kitchen_stations"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    name: str = Field()
+    cooks: int = Field(default=1)
+    # Ингредиенты, которые есть на станции; None - станция готовит любое блюдо
+    ingredient_ids: Optional[list[int]] = Field(sa_column=Column(JSONB), default=None)
+    is_active: bool = Field(default=True)
+
 class CookingTask(SQLModel, table=True):
     __tablename__ = "cooking_tasks"
 
     id: Optional[int] = Field(default=None, primary_key=True)
     order_id: int = Field(foreign_key="orders.id")
     menu_item_id: int = Field(foreign_key="menu.id")
+    station_id: Optional[int] = Field(default=None, foreign_key="kitchen_stations.id", index=True)
     created_at: datetime = Field(default_factory=datetime.now, sa_column=Column(DateTime))
     status: CookingStatus = Field(default=CookingStatus.QUEUED)
+    # Время перехода в каждый статус (заполняется при смене статуса)
+    queued_at: Optional[datetime] = Field(default_factory=datetime.now, sa_column=Column(DateTime))
+    cooking_at: Optional[datetime] = Field(default=None, sa_column=Column(DateTime))
+    ready_at: Optional[datetime] = Field(default=None, sa_column=Column(DateTime))
+    delivering_at: Optional[datetime] = Field(default=None, sa_column=Column(DateTime))
+    delivered_at: Optional[datetime] = Field(default=None, sa_column=Column(DateTime))
+    change_version: Optional[int] = Field(default=None, sa_column=change_version_column())
+    change_xid: Optional[int] = Field(default=None, sa_column=change_xid_column())
     order: Optional["Order"] = Relationship(back_populates="cooking_tasks")
     menu_item: Optional["MenuItemModel"] = Relationship()
     # УБЕРИ отношения
+
+class CookingLatencyBucket(SQLModel, table=True):
+    """
+    Предагрегированная гистограмма задержек задач кухни.
+
+    Одна строка - счетчик попаданий в один бакет для блюда, часа и метрики
+    (queue_wait, cook, delivery). Перцентили считаются по бакетам, без обхода задач.
+    """
+    __tablename__ = "cooking_latency_buckets"
+
+    menu_item_id: int = Field(foreign_key="menu.id", primary_key=True)
+    hour: datetime = Field(sa_column=Column(DateTime, primary_key=True, index=True))
+    metric: str = Field(primary_key=True)
+    bucket: int = Field(primary_key=True)
+    count: int = Field(default=0)
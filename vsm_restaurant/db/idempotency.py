@@ -0,0 +1,23 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Column, DateTime
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlmodel import Field, SQLModel
+
+class IdempotencyKey(SQLModel, table=True):
+    """
+    Результат запроса с заголовком Idempotency-Key.
+
+    Пока запрос выполняется, status_code пустой; после выполнения хранится
+    ответ, который возвращается на повторы до expires_at.
+    """
+    __tablename__ = "idempotency_keys"
+
+    key: str = Field(primary_key=True, max_length=255)
+    scope: str = Field()  # Метод и путь запроса: ключ нельзя переиспользовать для другого endpoint
+    request_hash: str = Field()
+    status_code: Optional[int] = Field(default=None)
+    response: Optional[dict] = Field(sa_column=Column(JSONB), default=None)
+    created_at: datetime = Field(default_factory=datetime.now, sa_column=Column(DateTime))
+    expires_at: datetime = Field(sa_column=Column(DateTime, index=True))
@@ -5,10 +5,14 @@ from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.dialects.sqlite import INTEGER, VARCHAR
 from sqlmodel import Field, SQLModel, Relationship
 
+from .sync import change_version_column, change_xid_column
+
 class IngredientModel(SQLModel, table=True):
     id: int | None = Field(primary_key=True, default=None)
     name: str = Field(sa_column=Column(VARCHAR(255)))
     stock: int = Field(sa_column=Column(INTEGER))
+    change_version: int | None = Field(default=None, sa_column=change_version_column())
+    change_xid: int | None = Field(default=None, sa_column=change_xid_column())
 
     __tablename__ = "ingredients"
 
@@ -17,6 +21,8 @@ class MenuItemModel(SQLModel, table=True):
     name: str = Field(sa_column=Column(VARCHAR(255)))
     price: float = Field(sa_column=Column(Numeric(10, 2)))
     composition: list[dict] | None = Field(sa_column=Column(JSONB), default=None)
+    change_version: int | None = Field(default=None, sa_column=change_version_column())
+    change_xid: int | None = Field(default=None, sa_column=change_xid_column())
 
     __tablename__ = "menu"
 
@@ -4,6 +4,8 @@ from typing import List, Optional
 
 from sqlmodel import Field, SQLModel, Relationship
 
+from .sync import change_version_column, change_xid_column
+
 class PaymentMethod(str, Enum):
     CARD_ONLINE = "card_online"
     CARD_TERMINAL = "card_terminal"
@@ -25,6 +27,11 @@ class OrderItem(SQLModel, table=True):
     order_id: int = Field(foreign_key="orders.id")
     menu_item_id: int = Field(foreign_key="menu.id")
     quantity: int = Field(default=1)
+    change_version: Optional[int] = Field(default=None, sa_column=change_version_column())
+    change_xid: Optional[int] = Field(default=None, sa_column=change_xid_column())
+    # Снимок блюда на момент заказа: правки меню не меняют уже оформленные заказы
+    name: Optional[str] = Field(default=None)
+    unit_price: float = Field(default=0.0)
     order: Optional["Order"] = Relationship(back_populates="items")
     menu_item: Optional["MenuItemModel"] = Relationship(back_populates="order_items")
 
@@ -41,5 +48,15 @@ class Order(SQLModel, table=True):
     status: OrderStatus = Field(default=OrderStatus.WAITING_PAYMENT)
     total_price: float = Field(default=0.0)
     payment_link: Optional[str] = Field(default=None)
+    # Денормализованные счетчики прогресса: обновляются в одной транзакции с задачами кухни
+    item_count: int = Field(default=0)
+    tasks_total: int = Field(default=0)
+    tasks_queued: int = Field(default=0)
+    tasks_cooking: int = Field(default=0)
+    tasks_ready: int = Field(default=0)
+    tasks_delivering: int = Field(default=0)
+    tasks_delivered: int = Field(default=0)
+    change_version: Optional[int] = Field(default=None, sa_column=change_version_column())
+    change_xid: Optional[int] = Field(default=None, sa_column=change_xid_column())
     items: List[OrderItem] = Relationship(back_populates="order")
     cooking_tasks: List["CookingTask"] = Relationship(back_populates="order")
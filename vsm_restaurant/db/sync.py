@@ -0,0 +1,51 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import BigInteger, Column, DateTime, FetchedValue, text
+from sqlmodel import Field, SQLModel
+
+# Общая последовательность версий: триггер в БД присваивает строке следующее значение при каждой записи
+CHANGE_SEQUENCE = "change_seq"
+
+
+def change_version_column() -> Column:
+    """Колонка версии изменения; значение выставляет только триггер set_change_version"""
+    return Column(
+        BigInteger,
+        nullable=False,
+        index=True,
+        server_default=text(f"nextval('{CHANGE_SEQUENCE}')"),
+        server_onupdate=FetchedValue(),
+    )
+
+
+def change_xid_column() -> Column:
+    """
+    Транзакция, записавшая строку (pg_current_xact_id), ее выставляет тот же триггер.
+    Версии выдаются при записи, а не при коммите, поэтому синхронизация упорядочивает
+    изменения по транзакции и отдает только транзакции, завершившиеся раньше всех текущих.
+    """
+    return Column(
+        BigInteger,
+        nullable=False,
+        index=True,
+        server_default=text("0"),  # Строки, записанные до появления колонки, давно зафиксированы
+        server_onupdate=FetchedValue(),
+    )
+
+
+class SyncTombstone(SQLModel, table=True):
+    """Удаленная строка синхронизируемой таблицы (пишется триггером record_tombstone)"""
+    __tablename__ = "sync_tombstones"
+
+    change_version: Optional[int] = Field(
+        default=None,
+        sa_column=Column(BigInteger, primary_key=True, server_default=text(f"nextval('{CHANGE_SEQUENCE}')")),
+    )
+    change_xid: Optional[int] = Field(
+        default=None,
+        sa_column=Column(BigInteger, nullable=False, index=True, server_default=text("pg_current_xact_id()::text::bigint")),
+    )
+    table_name: str = Field()
+    row_id: int = Field()
+    deleted_at: datetime = Field(default_factory=datetime.now, sa_column=Column(DateTime))
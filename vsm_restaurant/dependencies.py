@@ -1,12 +1,25 @@
 import logging
+from datetime import datetime, timedelta
 from contextlib import asynccontextmanager
-from typing import Annotated
+from typing import Annotated, Any, Optional
 
-from fastapi import FastAPI, Depends, Request
+from fastapi import FastAPI, Depends, Header, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlalchemy.engine.base import Engine
 from sqlmodel import Session
 
 from vsm_restaurant.db import run_migrations, create_db_engine
+from vsm_restaurant.services.cooking_metrics import load_cook_durations
+from vsm_restaurant.services.estimation import eta_engine
+from vsm_restaurant.services.idempotency import (
+    ClaimStatus,
+    claim_key,
+    complete_key,
+    release_key,
+    request_fingerprint,
+)
+from vsm_restaurant.services.request_metrics import instrument_engine
 from vsm_restaurant.settings import Settings
 
 logger = logging.getLogger(__name__)
@@ -17,6 +30,8 @@ settings = Settings()
 def get_settings(request: Request):
     return request.app.state.settings
 
+SettingsDep = Annotated[Settings, Depends(get_settings)]
+
 
 def get_engine(request: Request):
     return request.app.state.engine
@@ -28,6 +43,67 @@ def get_session(engine: Engine = Depends(get_engine)):
 
 SessionDep = Annotated[Session, Depends(get_session)]
 
+
+class IdempotentRequest:
+    """
+    Состояние запроса с заголовком Idempotency-Key.
+
+    Если replay не пустой, запрос уже выполнялся и endpoint должен вернуть его
+    сразу. Иначе endpoint оборачивает свой ответ в remember(), чтобы сохранить его для повторов.
+    """
+    def __init__(self, engine: Engine, key: Optional[str]):
+        self.engine = engine
+        self.key = key
+        self.replay: Optional[JSONResponse] = None
+        self.completed = False
+
+    def remember(self, result: Any, status_code: int = 200) -> Any:
+        if self.key is not None and self.replay is None:
+            complete_key(self.engine, self.key, status_code, jsonable_encoder(result))
+            self.completed = True
+        return result
+
+
+async def get_idempotent_request(
+    request: Request,
+    engine: Engine = Depends(get_engine),
+    settings: Settings = Depends(get_settings),
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
+):
+    if not idempotency_key:
+        yield IdempotentRequest(engine, None)
+        return
+    if len(idempotency_key) > 255:
+        raise HTTPException(status_code=400, detail="Idempotency-Key is too long")
+
+    scope = f"{request.method} {request.url.path}"
+    claim = claim_key(engine, idempotency_key, scope, request_fingerprint(await request.body()), settings)
+    if claim.status == ClaimStatus.MISMATCH:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+    if claim.status == ClaimStatus.IN_PROGRESS:
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still being processed")
+
+    idempotent_request = IdempotentRequest(engine, idempotency_key)
+    if claim.status == ClaimStatus.REPLAY:
+        idempotent_request.replay = JSONResponse(
+            status_code=claim.status_code,
+            content=claim.response,
+            headers={"Idempotent-Replayed": "true"},
+        )
+        yield idempotent_request
+        return
+
+    try:
+        yield idempotent_request
+    except Exception:
+        # Запрос не выполнен - повтор с тем же ключом должен выполнить его заново
+        release_key(engine, idempotency_key)
+        raise
+    if not idempotent_request.completed:
+        release_key(engine, idempotency_key)
+
+IdempotencyDep = Annotated[IdempotentRequest, Depends(get_idempotent_request)]
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     app.state.settings = settings
@@ -36,6 +112,14 @@ async def lifespan(app: FastAPI):
 
     engine = create_db_engine(settings)
     app.state.engine = engine
+    if settings.tracks_queries:
+        instrument_engine(engine)
+
+    # Модель ETA живет в памяти каждого воркера, поэтому поднимаем ее здесь, а не на лидере
+    eta_engine.configure(settings)
+    with Session(engine) as session:
+        eta_engine.seed_durations(load_cook_durations(session, datetime.now() - timedelta(days=7)))
+        eta_engine.rebuild(session)
 
     yield # Wait until the app shuts down
 
@@ -0,0 +1,49 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+
+class CookBatchOut(BaseModel):
+    """Партия одинаковых блюд в расписании кухни"""
+    position: int
+    menu_item_id: int
+    menu_item_name: str
+    size: int
+    task_ids: List[int]
+    order_ids: List[int]
+    oldest_created_at: datetime
+    waiting_seconds: int
+    is_due: bool
+
+
+class LatencyStats(BaseModel):
+    count: int
+    p50: Optional[float] = None  # секунды
+    p95: Optional[float] = None
+    p99: Optional[float] = None
+
+class LatencyReportRow(BaseModel):
+    """Перцентили задержек этапов кухни по блюду или по часу"""
+    menu_item_id: Optional[int] = None
+    menu_item_name: Optional[str] = None
+    hour: Optional[datetime] = None
+    queue_wait: LatencyStats
+    cook: LatencyStats
+    delivery: LatencyStats
+
+
+class KitchenStationCreate(BaseModel):
+    name: str
+    cooks: int = 1
+    ingredient_ids: Optional[List[int]] = None  # None - станция готовит любое блюдо
+    is_active: bool = True
+
+class KitchenStationOut(KitchenStationCreate):
+    id: int
+    queued: int = 0
+    cooking: int = 0
+    load_minutes: float = 0.0  # Оценка, через сколько станция разберет текущую очередь
+
+
+class ClaimRequest(BaseModel):
+    count: int = Field(default=1, ge=1, le=50)
+    station_id: Optional[int] = None  # None - брать из любой очереди
@@ -17,8 +17,23 @@ class OrderItemOut(BaseModel):
     id: int
     menu_item_id: int
     quantity: int
+    name: Optional[str] = None
+    unit_price: Optional[float] = None
     menu_item: Optional[MenuItemOut] = None
 
+    @classmethod
+    def from_snapshot(cls, item) -> "OrderItemOut":
+        """Позиция заказа по снимку блюда, без обращения к меню"""
+        return cls(
+            id=item.id,
+            menu_item_id=item.menu_item_id,
+            quantity=item.quantity,
+            name=item.name,
+            unit_price=item.unit_price,
+            menu_item=MenuItemOut(id=item.menu_item_id, name=item.name, price=item.unit_price)
+            if item.name is not None else None,
+        )
+
 class OrderOut(BaseModel):
     id: int
     place_id: str
@@ -27,4 +42,28 @@ class OrderOut(BaseModel):
     status: OrderStatus
     total_price: float
     payment_link: Optional[str] = None
-    items: List[OrderItemOut]
\ No newline at end of file
+    items: List[OrderItemOut]
+
+class CartQuoteRequest(BaseModel):
+    items: List[OrderItemCreate]
+
+class QuoteLineOut(BaseModel):
+    menu_item_id: int
+    name: Optional[str] = None
+    quantity: int
+    unit_price: float
+    line_total: float
+    found: bool
+    available: bool
+
+class IngredientShortageOut(BaseModel):
+    ingredient_id: int
+    name: Optional[str] = None
+    required: int  # Суммарная потребность корзины
+    stock: int
+
+class CartQuoteOut(BaseModel):
+    available: bool
+    total_price: float
+    lines: List[QuoteLineOut]
+    shortages: List[IngredientShortageOut]
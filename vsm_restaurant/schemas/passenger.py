@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 from ..db.orders import OrderStatus, PaymentMethod
@@ -12,6 +12,7 @@ class PassengerOrderStatus(BaseModel):
     total_price: float
     created_at: datetime
     estimated_time: Optional[str] = None  # Примерное время готовности
+    estimated_minutes: Optional[float] = None  # То же числом: минут до готовности
     items: List[OrderItemOut]
 
 class OrderStatusResponse(BaseModel):
@@ -25,4 +26,11 @@ class PassengerOrderHistory(BaseModel):
     status: OrderStatus
     total_price: float
     created_at: datetime
-    item_count: int
\ No newline at end of file
+    item_count: int
+
+class BatchOrderStatusRequest(BaseModel):
+    order_ids: List[int] = Field(min_length=1, max_length=50)
+
+class BatchOrderStatusResponse(BaseModel):
+    orders: List[PassengerOrderStatus]
+    not_found: List[int]
@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+
+class FunctionSamples(BaseModel):
+    function: str
+    samples: int
+
+class RequestProfileOut(BaseModel):
+    """Профиль запроса без стеков; сами стеки - GET /admin/profiles/{id}"""
+    id: int
+    method: str
+    path: str
+    route: Optional[str] = None
+    trigger: str
+    started_at: datetime
+    status_code: Optional[int] = None
+    duration_ms: float
+    interval_ms: float
+    samples: int
+    top_functions: List[FunctionSamples]
@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+
+class ChangeOut(BaseModel):
+    table: str
+    version: int
+    row_id: int
+    deleted: bool = False
+    row: Optional[Dict[str, Any]] = None  # Текущее состояние строки, у удаленной - None
+
+class ChangesResponse(BaseModel):
+    """Изменения после курсора since; следующий запрос делать с since=cursor"""
+    changes: List[ChangeOut]
+    cursor: str
+    has_more: bool
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 from ..db.orders import OrderStatus, PaymentMethod
 from .orders import OrderOut
@@ -19,3 +19,56 @@ class DeliveryUpdate(BaseModel):
 class PaymentReceived(BaseModel):
     payment_method: PaymentMethod  # Для подтверждения способа оплаты
 
+
+class DeliveryStopOut(BaseModel):
+    order_id: int
+    place_id: str
+    car: Optional[int] = None
+    seat: Optional[int] = None
+    portions: int
+    ready_since: Optional[datetime] = None
+
+class DeliveryRunOut(BaseModel):
+    """Проход официанта: заказы в порядке обхода"""
+    run: int
+    direction: int  # 1 - к вагонам с большими номерами, -1 - к меньшим, 0 - свой вагон или вагон не указан
+    cars: List[int]
+    portions: int
+    oldest_ready_since: Optional[datetime] = None
+    stops: List[DeliveryStopOut]
+
+class StatusAggregate(BaseModel):
+    count: int = 0
+    amount: float = 0.0  # Сумма заказов группы, включая неоплаченные и отмененные
+    revenue: float = 0.0  # Сумма оплаченных заказов группы (REVENUE_STATUSES)
+
+class WaiterDashboardSummary(BaseModel):
+    total_orders: int
+    revenue: float  # Сумма оплаченных заказов
+    by_status: Dict[OrderStatus, StatusAggregate]
+    by_payment_method: Dict[PaymentMethod, StatusAggregate]
+
+class OrderStatusChange(BaseModel):
+    order_id: int
+    status: OrderStatus
+
+class BulkStatusUpdate(BaseModel):
+    updates: List[OrderStatusChange]
+
+class OrderPaymentConfirmation(BaseModel):
+    order_id: int
+    payment_method: PaymentMethod
+
+class BulkPaymentConfirmation(BaseModel):
+    confirmations: List[OrderPaymentConfirmation]
+
+class BulkOrderResult(BaseModel):
+    order_id: int
+    success: bool
+    new_status: Optional[OrderStatus] = None
+    error: Optional[str] = None
+
+class BulkOrderResponse(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BulkOrderResult]
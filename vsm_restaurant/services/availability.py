@@ -1,4 +1,6 @@
-from sqlmodel import Session
+from typing import Iterable
+
+from sqlmodel import Session, select
 
 from ..db.menu import IngredientModel, MenuItemModel
 
@@ -14,7 +16,27 @@ def check_menu_item_availability(session: Session, menu_item_id: int) -> bool:
     
     return True
 
-def reserve_ingredients(session: Session, menu_item_id: int):
+def check_menu_items_availability(session: Session, menu_items: Iterable[MenuItemModel]) -> dict[int, bool]:
+    """То же, что check_menu_item_availability, для списка блюд: остатки читаются одним запросом"""
+    menu_items = list(menu_items)
+    ingredient_ids = {
+        ingredient_req["ingredient_id"]
+        for menu_item in menu_items
+        for ingredient_req in menu_item.composition or []
+    }
+    stocks = dict(session.exec(
+        select(IngredientModel.id, IngredientModel.stock).where(IngredientModel.id.in_(ingredient_ids))
+    ).all()) if ingredient_ids else {}
+
+    return {
+        menu_item.id: bool(menu_item.composition) and all(
+            stocks.get(ingredient_req["ingredient_id"], -1) >= ingredient_req["quantity"]
+            for ingredient_req in menu_item.composition
+        )
+        for menu_item in menu_items
+    }
+
+def reserve_ingredients(session: Session, menu_item_id: int, quantity: int = 1):
     menu_item = session.get(MenuItemModel, menu_item_id)
     if not menu_item or not menu_item.composition:
         return
@@ -22,5 +44,5 @@ def reserve_ingredients(session: Session, menu_item_id: int):
     for ingredient_req in menu_item.composition:
         ingredient = session.get(IngredientModel, ingredient_req["ingredient_id"])
         if ingredient:
-            ingredient.stock -= ingredient_req["quantity"]
+            ingredient.stock -= ingredient_req["quantity"] * quantity
             session.add(ingredient)
@@ -0,0 +1,103 @@
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+from sqlmodel import Session, select
+
+from ..db.menu import IngredientModel, MenuItemModel
+
+
+@dataclass
+class QuoteLine:
+    menu_item_id: int
+    quantity: int
+    name: Optional[str] = None
+    unit_price: float = 0.0
+    found: bool = True  # Блюдо есть в меню
+    available: bool = True  # Ингредиентов хватает на всю корзину
+
+    @property
+    def line_total(self) -> float:
+        return self.unit_price * self.quantity
+
+
+@dataclass
+class IngredientShortage:
+    ingredient_id: int
+    name: Optional[str]
+    required: int  # Суммарная потребность корзины
+    stock: int
+
+
+@dataclass
+class CartQuote:
+    lines: list[QuoteLine] = field(default_factory=list)
+    shortages: list[IngredientShortage] = field(default_factory=list)
+
+    @property
+    def total_price(self) -> float:
+        return sum(line.line_total for line in self.lines if line.found)
+
+    @property
+    def is_available(self) -> bool:
+        return all(line.found and line.available for line in self.lines)
+
+
+def quote_cart(session: Session, items: Iterable[tuple[int, int]]) -> CartQuote:
+    """
+    Проверяет доступность и считает стоимость корзины [(menu_item_id, quantity), ...].
+
+    Блюда и ингредиенты читаются двумя запросами на всю корзину. Потребность
+    в ингредиентах суммируется по всем позициям, поэтому общий ингредиент
+    проверяется против суммарного количества, а не каждой позиции по отдельности.
+    """
+    items = list(items)
+    menu_item_ids = {menu_item_id for menu_item_id, _ in items}
+    menu_items = {
+        menu_item.id: menu_item
+        for menu_item in session.exec(select(MenuItemModel).where(MenuItemModel.id.in_(menu_item_ids))).all()
+    } if menu_item_ids else {}
+
+    demand: Counter = Counter()
+    for menu_item_id, quantity in items:
+        menu_item = menu_items.get(menu_item_id)
+        for ingredient in (menu_item.composition if menu_item else None) or []:
+            demand[ingredient["ingredient_id"]] += ingredient["quantity"] * quantity
+
+    ingredients = {
+        ingredient.id: ingredient
+        for ingredient in session.exec(select(IngredientModel).where(IngredientModel.id.in_(list(demand)))).all()
+    } if demand else {}
+
+    shortages = []
+    short_ids = set()
+    for ingredient_id in sorted(demand):
+        ingredient = ingredients.get(ingredient_id)
+        stock = ingredient.stock if ingredient else 0
+        if stock < demand[ingredient_id]:
+            short_ids.add(ingredient_id)
+            shortages.append(IngredientShortage(
+                ingredient_id=ingredient_id,
+                name=ingredient.name if ingredient else None,
+                required=demand[ingredient_id],
+                stock=stock,
+            ))
+
+    quote = CartQuote(shortages=shortages)
+    for menu_item_id, quantity in items:
+        menu_item = menu_items.get(menu_item_id)
+        if menu_item is None:
+            quote.lines.append(QuoteLine(menu_item_id, quantity, found=False, available=False))
+            continue
+
+        # Блюдо без состава считается недоступным, как и в check_menu_item_availability
+        composition = menu_item.composition or []
+        quote.lines.append(QuoteLine(
+            menu_item_id=menu_item_id,
+            quantity=quantity,
+            name=menu_item.name,
+            unit_price=float(menu_item.price) if menu_item.price is not None else 0.0,
+            available=bool(composition)
+            and not any(ingredient["ingredient_id"] in short_ids for ingredient in composition),
+        ))
+    return quote
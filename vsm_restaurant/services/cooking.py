@@ -0,0 +1,221 @@
+from collections import Counter
+from datetime import datetime
+from functools import partial
+from typing import Iterable, Optional
+
+from sqlalchemy import insert, update
+from sqlmodel import Session, select
+
+from ..db.cooking_task import CookingStatus, CookingTask
+from ..db.orders import Order, OrderItem, OrderStatus
+from .availability import reserve_ingredients
+from .cooking_metrics import record_task_latencies
+from .estimation import eta_engine, notify_after_commit
+from .stations import assign_stations
+
+# Поле с временем перехода в каждый статус
+STATUS_TIMESTAMPS = {
+    CookingStatus.QUEUED: "queued_at",
+    CookingStatus.COOKING: "cooking_at",
+    CookingStatus.READY: "ready_at",
+    CookingStatus.DELIVERING: "delivering_at",
+    CookingStatus.DELIVERED: "delivered_at",
+}
+
+# Счетчик на строке заказа для каждого статуса задачи
+STATUS_COUNTERS = {
+    CookingStatus.QUEUED: "tasks_queued",
+    CookingStatus.COOKING: "tasks_cooking",
+    CookingStatus.READY: "tasks_ready",
+    CookingStatus.DELIVERING: "tasks_delivering",
+    CookingStatus.DELIVERED: "tasks_delivered",
+}
+
+# Допустимые переходы статусов задачи кухни
+TASK_TRANSITIONS = {
+    CookingStatus.QUEUED: [CookingStatus.COOKING],
+    CookingStatus.COOKING: [CookingStatus.READY],
+    CookingStatus.READY: [CookingStatus.DELIVERING, CookingStatus.DELIVERED],
+    CookingStatus.DELIVERING: [CookingStatus.DELIVERED],
+    CookingStatus.DELIVERED: [],
+}
+
+# Статусы заказа, которые выводятся из задач, в порядке продвижения
+ORDER_PROGRESS = [
+    OrderStatus.PAID,
+    OrderStatus.COOKING,
+    OrderStatus.PARTIALLY_DELIVERED,
+    OrderStatus.COMPLETED,
+]
+
+
+def create_cooking_tasks(session: Session, order_id: int) -> int:
+    """
+    Резервирует ингредиенты и ставит заказ в очередь кухни.
+    Коммит остается за вызывающим кодом. Возвращает количество созданных задач.
+    """
+    return create_cooking_tasks_for_orders(session, [order_id]).get(order_id, 0)
+
+
+def create_cooking_tasks_for_orders(session: Session, order_ids: list[int]) -> dict[int, int]:
+    """
+    Резервирует ингредиенты и ставит в очередь кухни сразу несколько заказов.
+
+    На каждую порцию создается отдельная задача (позиция "3 × кофе" дает три задачи).
+    Позиции всех заказов читаются одним запросом, ингредиенты списываются один раз
+    на блюдо, задачи распределяются по станциям кухни и вставляются одним bulk INSERT.
+    Коммит остается за вызывающим кодом. Возвращает количество задач по заказам.
+    """
+    if not order_ids:
+        return {}
+
+    order_items = session.exec(
+        select(OrderItem)
+        .where(OrderItem.order_id.in_(order_ids))
+        .order_by(OrderItem.order_id, OrderItem.id)
+    ).all()
+
+    now = datetime.now()
+    task_rows = []
+    portions: Counter = Counter()
+    for item in order_items:
+        portions[item.menu_item_id] += item.quantity
+        task_rows.extend(
+            {
+                "order_id": item.order_id,
+                "menu_item_id": item.menu_item_id,
+                "status": CookingStatus.QUEUED,
+                "created_at": now,
+                "queued_at": now,
+            }
+            for _ in range(item.quantity)
+        )
+
+    for menu_item_id in sorted(portions):
+        reserve_ingredients(session, menu_item_id, portions[menu_item_id])
+
+    if not task_rows:
+        return {}
+
+    station_ids = assign_stations(session, [row["menu_item_id"] for row in task_rows])
+    for row, station_id in zip(task_rows, station_ids):
+        row["station_id"] = station_id
+
+    created = session.execute(
+        insert(CookingTask).returning(CookingTask.id, CookingTask.order_id, CookingTask.menu_item_id),
+        task_rows,
+    ).all()
+
+    def track_created_tasks():
+        for task_id, task_order_id, menu_item_id in created:
+            eta_engine.on_task_queued(task_id, task_order_id, menu_item_id)
+
+    notify_after_commit(session, track_created_tasks)
+
+    counts = Counter(row["order_id"] for row in task_rows)
+    for order_id in sorted(counts):
+        adjust_order_counters(session, order_id, {"tasks_total": counts[order_id], "tasks_queued": counts[order_id]})
+    return dict(counts)
+
+
+def set_task_statuses(
+    session: Session,
+    changes: Iterable[tuple[CookingTask, CookingStatus]],
+    at: Optional[datetime] = None,
+) -> list[dict]:
+    """
+    Меняет статусы задач: проставляет время перехода, пишет задержку этапа
+    в гистограмму, сдвигает счетчики заказов и (после коммита) обновляет модель ETA.
+    Коммит за вызывающим кодом. Возвращает вызванные смены статусов заказов.
+    """
+    at = at or datetime.now()
+    deltas: dict[int, Counter] = {}
+    for task, status in changes:
+        if task.status == status:
+            continue
+        record_task_latencies(session, task, status, at)
+
+        delta = deltas.setdefault(task.order_id, Counter())
+        delta[STATUS_COUNTERS[task.status]] -= 1
+        delta[STATUS_COUNTERS[status]] += 1
+
+        task.status = status
+        setattr(task, STATUS_TIMESTAMPS[status], at)
+        session.add(task)
+        notify_after_commit(session, partial(eta_engine.on_status_change, task.id, status, at))
+
+    # Строки заказов блокируются в порядке id, чтобы параллельные транзакции не взаимоблокировались
+    order_changes = []
+    for order_id in sorted(deltas):
+        order_change = adjust_order_counters(session, order_id, deltas[order_id], at)
+        if order_change:
+            order_changes.append(order_change)
+    return order_changes
+
+
+def set_task_status(
+    session: Session,
+    task: CookingTask,
+    status: CookingStatus,
+    at: Optional[datetime] = None,
+) -> Optional[dict]:
+    order_changes = set_task_statuses(session, [(task, status)], at)
+    return order_changes[0] if order_changes else None
+
+
+def can_transition(current: CookingStatus, new: CookingStatus) -> bool:
+    return new in TASK_TRANSITIONS[current]
+
+
+def derive_order_status(tasks_total: int, tasks_queued: int, tasks_delivered: int) -> Optional[OrderStatus]:
+    """Статус заказа по счетчикам его задач"""
+    if tasks_total <= 0:
+        return None
+    if tasks_delivered >= tasks_total:
+        return OrderStatus.COMPLETED
+    if tasks_delivered:
+        return OrderStatus.PARTIALLY_DELIVERED
+    if tasks_queued < tasks_total:
+        return OrderStatus.COOKING
+    return None
+
+
+def adjust_order_counters(
+    session: Session,
+    order_id: int,
+    deltas: dict[str, int],
+    at: Optional[datetime] = None,
+) -> Optional[dict]:
+    """
+    Атомарно сдвигает счетчики заказа (col = col + delta в одном UPDATE) и по их
+    новым значениям продвигает статус заказа, только вперед.
+    Возвращает смену статуса (order_id, old_status, new_status) или None.
+    """
+    values = {name: getattr(Order, name) + delta for name, delta in deltas.items() if delta}
+    if not values:
+        return None
+
+    row = session.execute(
+        update(Order)
+        .where(Order.id == order_id)
+        .values(values)
+        .returning(Order.status, Order.tasks_total, Order.tasks_queued, Order.tasks_delivered)
+    ).one_or_none()
+    if row is None:
+        return None
+
+    old_status, tasks_total, tasks_queued, tasks_delivered = row
+    new_status = derive_order_status(tasks_total, tasks_queued, tasks_delivered)
+    if (
+        new_status is None
+        or old_status not in ORDER_PROGRESS
+        or ORDER_PROGRESS.index(new_status) <= ORDER_PROGRESS.index(old_status)
+    ):
+        return None
+
+    session.execute(
+        update(Order)
+        .where(Order.id == order_id)
+        .values(status=new_status, updated_at=at or datetime.now())
+    )
+    return {"order_id": order_id, "old_status": old_status, "new_status": new_status}
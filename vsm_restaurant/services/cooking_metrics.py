@@ -0,0 +1,125 @@
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, func, select
+
+from ..db.cooking_task import CookingLatencyBucket, CookingStatus, CookingTask
+
+# Верхние границы бакетов в секундах; последний бакет - все, что дольше 2 часов
+LATENCY_BUCKET_BOUNDS = [15, 30, 60, 120, 180, 300, 450, 600, 900, 1200, 1800, 2700, 3600, 5400, 7200]
+PERCENTILES = {"p50": 0.50, "p95": 0.95, "p99": 0.99}
+
+
+class LatencyMetric(str, Enum):
+    QUEUE_WAIT = "queue_wait"  # queued -> cooking
+    COOK = "cook"  # cooking -> ready
+    DELIVERY = "delivery"  # ready -> delivered
+
+
+def bucket_index(seconds: float) -> int:
+    return bisect_left(LATENCY_BUCKET_BOUNDS, seconds)
+
+
+def record_latency(session: Session, menu_item_id: int, metric: LatencyMetric, seconds: float, at: datetime):
+    """Увеличивает счетчик бакета в той же транзакции, что и смена статуса задачи"""
+    table = CookingLatencyBucket.__table__
+    statement = insert(table).values(
+        menu_item_id=menu_item_id,
+        hour=at.replace(minute=0, second=0, microsecond=0),
+        metric=metric.value,
+        bucket=bucket_index(seconds),
+        count=1,
+    )
+    session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[table.c.menu_item_id, table.c.hour, table.c.metric, table.c.bucket],
+            set_={"count": table.c.count + 1},
+        )
+    )
+
+
+def record_task_latencies(session: Session, task: CookingTask, status: CookingStatus, at: datetime):
+    """Записывает задержку этапа, который завершился переходом задачи в status"""
+    if status == CookingStatus.COOKING:
+        metric, started_at = LatencyMetric.QUEUE_WAIT, task.queued_at or task.created_at
+    elif status == CookingStatus.READY:
+        metric, started_at = LatencyMetric.COOK, task.cooking_at
+    elif status == CookingStatus.DELIVERED:
+        metric, started_at = LatencyMetric.DELIVERY, task.ready_at
+    else:
+        return
+
+    # Если этап пропустили (например, официант сразу закрыл заказ), замерять нечего
+    if started_at is None:
+        return
+    record_latency(session, task.menu_item_id, metric, (at - started_at).total_seconds(), at)
+
+
+def percentile_from_buckets(counts: list[int], q: float) -> Optional[float]:
+    """Оценка перцентиля по гистограмме с линейной интерполяцией внутри бакета"""
+    total = sum(counts)
+    if total == 0:
+        return None
+
+    rank = q * total
+    cumulative = 0
+    for index, count in enumerate(counts):
+        if count and cumulative + count >= rank:
+            if index >= len(LATENCY_BUCKET_BOUNDS):
+                return float(LATENCY_BUCKET_BOUNDS[-1])
+            lower = LATENCY_BUCKET_BOUNDS[index - 1] if index else 0
+            upper = LATENCY_BUCKET_BOUNDS[index]
+            return lower + (upper - lower) * (rank - cumulative) / count
+        cumulative += count
+    return float(LATENCY_BUCKET_BOUNDS[-1])
+
+
+def summarize(counts: list[int]) -> dict:
+    summary = {"count": sum(counts)}
+    for name, q in PERCENTILES.items():
+        value = percentile_from_buckets(counts, q)
+        summary[name] = round(value, 1) if value is not None else None
+    return summary
+
+
+def latency_report(session: Session, group_by: str, since: datetime) -> list[dict]:
+    """
+    Перцентили задержек по блюдам (group_by="menu_item") или по часам (group_by="hour").
+    Читаются только строки гистограммы за период, задачи не сканируются.
+    """
+    group_column = CookingLatencyBucket.menu_item_id if group_by == "menu_item" else CookingLatencyBucket.hour
+    rows = session.exec(
+        select(
+            group_column,
+            CookingLatencyBucket.metric,
+            CookingLatencyBucket.bucket,
+            func.sum(CookingLatencyBucket.count),
+        )
+        .where(CookingLatencyBucket.hour >= since)
+        .group_by(group_column, CookingLatencyBucket.metric, CookingLatencyBucket.bucket)
+    ).all()
+
+    histograms: dict = defaultdict(lambda: {metric: [0] * (len(LATENCY_BUCKET_BOUNDS) + 1) for metric in LatencyMetric})
+    for group, metric, bucket, count in rows:
+        histograms[group][LatencyMetric(metric)][bucket] += count
+
+    return [
+        {
+            "group": group,
+            "metrics": {metric.value: summarize(counts) for metric, counts in metrics.items()},
+        }
+        for group, metrics in sorted(histograms.items())
+    ]
+
+
+def load_cook_durations(session: Session, since: datetime) -> dict[int, float]:
+    """Медиана времени готовки по блюдам - начальные значения для модели ETA"""
+    return {
+        row["group"]: row["metrics"][LatencyMetric.COOK.value]["p50"]
+        for row in latency_report(session, "menu_item", since)
+        if row["metrics"][LatencyMetric.COOK.value]["p50"] is not None
+    }
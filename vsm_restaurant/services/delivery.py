@@ -0,0 +1,98 @@
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Iterable, Optional
+
+_NUMBER = re.compile(r"\d+")
+
+
+@dataclass(frozen=True)
+class Place:
+    car: Optional[int]
+    seat: Optional[int]
+
+
+def parse_place(place_id: str) -> Place:
+    """
+    Разбирает place_id в вагон и место.
+
+    Первые два числа - вагон и место ("5-12", "5/12А", "вагон 5 место 12"),
+    одно число - только место ("12А"). Буквы и прочие символы игнорируются.
+    """
+    numbers = [int(number) for number in _NUMBER.findall(place_id or "")]
+    if len(numbers) >= 2:
+        return Place(car=numbers[0], seat=numbers[1])
+    if numbers:
+        return Place(car=None, seat=numbers[0])
+    return Place(car=None, seat=None)
+
+
+@dataclass
+class DeliveryStop:
+    order_id: int
+    place_id: str
+    place: Place
+    portions: int  # Сколько готовых порций нести
+    ready_since: Optional[datetime] = None
+
+
+@dataclass
+class DeliveryRun:
+    """Один проход официанта от кухни вдоль поезда"""
+    direction: int  # 1 - к вагонам с большими номерами, -1 - к меньшим, 0 - свой вагон или вагон не указан
+    stops: list[DeliveryStop] = field(default_factory=list)
+
+    @property
+    def portions(self) -> int:
+        return sum(stop.portions for stop in self.stops)
+
+    @property
+    def cars(self) -> list[int]:
+        return sorted({stop.place.car for stop in self.stops if stop.place.car is not None})
+
+    @property
+    def oldest_ready_since(self) -> Optional[datetime]:
+        times = [stop.ready_since for stop in self.stops if stop.ready_since]
+        return min(times) if times else None
+
+
+def _route_key(stop: DeliveryStop, kitchen_car: int) -> tuple:
+    # Вагон без номера - в конец, место без номера - в конец вагона
+    if stop.place.car is None:
+        distance = float("inf")
+    else:
+        distance = abs(stop.place.car - kitchen_car)
+    seat = stop.place.seat if stop.place.seat is not None else float("inf")
+    return (distance, seat, stop.order_id)
+
+
+def plan_delivery_runs(stops: Iterable[DeliveryStop], kitchen_car: int, capacity: int) -> list[DeliveryRun]:
+    """
+    Группирует готовые заказы в проходы официанта.
+
+    Заказы делятся по направлению от вагона-кухни (проход не идет в обе стороны),
+    внутри направления сортируются по удаленности вагона и номеру места и режутся
+    на проходы не больше capacity порций. Заказ крупнее capacity идет отдельным проходом.
+    Проходы упорядочены по времени самого давно готового заказа.
+    """
+    by_direction: dict[int, list[DeliveryStop]] = {}
+    for stop in stops:
+        if stop.place.car is None:
+            direction = 0
+        else:
+            direction = (stop.place.car > kitchen_car) - (stop.place.car < kitchen_car)
+        by_direction.setdefault(direction, []).append(stop)
+
+    runs = []
+    for direction, direction_stops in by_direction.items():
+        run = DeliveryRun(direction)
+        for stop in sorted(direction_stops, key=lambda s: _route_key(s, kitchen_car)):
+            if run.stops and run.portions + stop.portions > capacity:
+                runs.append(run)
+                run = DeliveryRun(direction)
+            run.stops.append(stop)
+        if run.stops:
+            runs.append(run)
+
+    runs.sort(key=lambda run: (run.oldest_ready_since or datetime.max, run.direction))
+    return runs
@@ -1,35 +1,210 @@
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session as SASession
 from sqlmodel import Session, select
 
 from ..db.cooking_task import CookingStatus, CookingTask
-from ..db.orders import Order
+from ..settings import Settings
+
+logger = logging.getLogger(__name__)
+
+# Статусы, в которых задача еще занимает кухню
+ACTIVE_STATUSES = [CookingStatus.QUEUED, CookingStatus.COOKING]
+
+_PENDING_KEY = "eta_pending_events"
+
+
+@dataclass
+class _TrackedTask:
+    order_id: int
+    menu_item_id: int
+    estimate: float  # Оценка длительности на момент постановки в очередь, сек
+    cooking_started_at: Optional[datetime] = None
+
+
+@dataclass
+class _OrderProgress:
+    work_mark: float  # Вся работа кухни до последней задачи заказа включительно, сек
+    remaining_tasks: int
+
+
+class EtaEngine:
+    """
+    In-memory модель времени готовности заказов.
+
+    Длительность готовки каждого блюда - экспоненциальное скользящее среднее
+    по наблюдаемым переходам COOKING -> READY. Кухня моделируется как FIFO:
+    ведутся накопительные суммы поставленной в очередь и выполненной работы.
+    Заказ при постановке запоминает отметку накопленной работы, поэтому ETA
+    любого заказа считается за O(1): (отметка - выполнено) / число поваров.
+    """
+    def __init__(self, default_cook_seconds: float = 600.0, parallelism: int = 2, alpha: float = 0.2):
+        self.default_cook_seconds = default_cook_seconds
+        self.parallelism = parallelism
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._dish_seconds: dict[int, float] = {}
+        self._tasks: dict[int, _TrackedTask] = {}
+        self._orders: dict[int, _OrderProgress] = {}
+        self._enqueued_work = 0.0
+        self._completed_work = 0.0
+
+    def configure(self, settings: Settings):
+        self.default_cook_seconds = settings.default_cook_minutes * 60
+        self.parallelism = max(settings.kitchen_cooks, 1)
+
+    def seed_durations(self, durations: dict[int, float]):
+        """Начальные длительности блюд (например, медианы из гистограммы задержек)"""
+        with self._lock:
+            self._dish_seconds.update(durations)
+
+    def dish_seconds(self, menu_item_id: int) -> float:
+        return self._dish_seconds.get(menu_item_id, self.default_cook_seconds)
+
+    def on_task_queued(self, task_id: int, order_id: int, menu_item_id: int):
+        with self._lock:
+            self._track(task_id, order_id, menu_item_id)
+
+    def on_status_change(self, task_id: int, status: CookingStatus, at: datetime):
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None:
+                return
+
+            if status == CookingStatus.COOKING:
+                task.cooking_started_at = at
+                return
+            if status == CookingStatus.QUEUED:
+                return
+
+            # Задача покинула кухню (READY и дальше)
+            del self._tasks[task_id]
+            self._completed_work += task.estimate
+            if task.cooking_started_at:
+                self._learn(task.menu_item_id, (at - task.cooking_started_at).total_seconds())
+
+            order = self._orders.get(task.order_id)
+            if order:
+                order.remaining_tasks -= 1
+                if order.remaining_tasks <= 0:
+                    del self._orders[task.order_id]
 
-def estimate_completion_time(session: Session, order_id: int) -> str:
+    def eta_seconds(self, order_id: int) -> Optional[float]:
+        """Сколько секунд осталось до готовности заказа; None - у заказа нет задач на кухне"""
+        order = self._orders.get(order_id)
+        if order is None:
+            return None
+        return max(order.work_mark - self._completed_work, 0.0) / self.parallelism
+
+    def rebuild(self, session: Session):
+        """Пересобирает очередь по активным задачам из БД (выученные длительности сохраняются)"""
+        tasks = session.exec(
+            select(CookingTask)
+            .where(CookingTask.status.in_(ACTIVE_STATUSES))
+            .order_by(CookingTask.created_at, CookingTask.id)
+        ).all()
+
+        with self._lock:
+            self._tasks.clear()
+            self._orders.clear()
+            self._enqueued_work = 0.0
+            self._completed_work = 0.0
+            for task in tasks:
+                self._track(task.id, task.order_id, task.menu_item_id)
+                self._tasks[task.id].cooking_started_at = task.cooking_at
+
+    async def start_refresh_task(self, session_factory, interval_seconds: float):
+        """
+        Периодически сверяет модель с БД.
+
+        Модель живет в памяти каждого воркера и обновляется инкрементально только
+        изменениями, прошедшими через этот воркер; пересборка ограничивает расхождение.
+        """
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                with session_factory() as session:
+                    self.rebuild(session)
+            except Exception as e:
+                logger.error(f"Error refreshing ETA model: {e}")
+
+    def _track(self, task_id: int, order_id: int, menu_item_id: int):
+        estimate = self.dish_seconds(menu_item_id)
+        self._tasks[task_id] = _TrackedTask(order_id, menu_item_id, estimate)
+        self._enqueued_work += estimate
+
+        order = self._orders.setdefault(order_id, _OrderProgress(0.0, 0))
+        order.work_mark = self._enqueued_work
+        order.remaining_tasks += 1
+
+    def _learn(self, menu_item_id: int, seconds: float):
+        if seconds <= 0:
+            return
+        previous = self._dish_seconds.get(menu_item_id)
+        if previous is None:
+            self._dish_seconds[menu_item_id] = seconds
+        else:
+            self._dish_seconds[menu_item_id] = previous + self.alpha * (seconds - previous)
+
+
+eta_engine = EtaEngine()
+
+
+def notify_after_commit(session: Session, callback: Callable[[], None]):
     """
-    Простая оценка времени готовности заказа
-    В реальной системе здесь была бы сложная логика
+    Откладывает обновление модели до коммита внешней транзакции: откаченные изменения в нее не попадают.
+    Колбэк привязан к текущему savepoint-у и отбрасывается только вместе с ним.
     """
-    order = session.get(Order, order_id)
-    if not order:
-        return "Unknown"
-    
-    # Получаем задачи готовки для заказа
-    tasks = session.exec(
-        select(CookingTask).where(CookingTask.order_id == order_id)
-    ).all()
-    
-    if not tasks:
-        return "Not started"
-    
-    # Анализируем статусы задач
-    statuses = [task.status for task in tasks]
-    
-    if all(status == CookingStatus.DELIVERED for status in statuses):
-        return "Delivered"
-    elif all(status == CookingStatus.READY for status in statuses):
-        return "Ready for delivery"
-    elif any(status == CookingStatus.COOKING for status in statuses):
-        return "Cooking - ~15-20 min"
-    elif all(status == CookingStatus.QUEUED for status in statuses):
-        return "In queue - ~20-25 min"
-    else:
-        return "Preparing - ~10-15 min"
+    transaction = session.get_nested_transaction() or session.get_transaction()
+    session.info.setdefault(_PENDING_KEY, []).append((transaction, callback))
+
+
+def _is_within(transaction, ancestor) -> bool:
+    while transaction is not None:
+        if transaction is ancestor:
+            return True
+        transaction = transaction.parent
+    return False
+
+
+@event.listens_for(SASession, "after_commit")
+def _apply_pending_events(session):
+    if session.in_nested_transaction():
+        return  # Освобожден savepoint - ждем коммита внешней транзакции
+    for _, callback in session.info.pop(_PENDING_KEY, []):
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"Error updating ETA model: {e}")
+
+
+@event.listens_for(SASession, "after_soft_rollback")
+def _discard_rolled_back_events(session, previous_transaction):
+    # Откат savepoint-а отбрасывает только колбэки, зарегистрированные внутри него
+    pending = session.info.get(_PENDING_KEY)
+    if pending:
+        session.info[_PENDING_KEY] = [
+            (transaction, callback)
+            for transaction, callback in pending
+            if not _is_within(transaction, previous_transaction)
+        ]
+
+
+@event.listens_for(SASession, "after_transaction_end")
+def _discard_pending_events(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
+
+
+def estimate_completion_time(order_id: int) -> Optional[float]:
+    """Оценка времени до готовности заказа в минутах по in-memory модели"""
+    eta = eta_engine.eta_seconds(order_id)
+    if eta is None:
+        return None
+    return round(eta / 60, 1)
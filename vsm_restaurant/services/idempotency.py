@@ -0,0 +1,152 @@
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Optional
+
+from sqlalchemy import Engine, delete, null, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session
+
+from ..db.idempotency import IdempotencyKey
+from ..settings import Settings
+
+logger = logging.getLogger(__name__)
+
+CLEANUP_CHUNK_SIZE = 1000
+
+
+class ClaimStatus(str, Enum):
+    NEW = "new"  # Ключ наш, запрос нужно выполнить
+    REPLAY = "replay"  # Запрос уже выполнен, есть сохраненный ответ
+    IN_PROGRESS = "in_progress"  # Тот же запрос выполняется прямо сейчас
+    MISMATCH = "mismatch"  # Ключ уже использован для другого запроса
+
+
+@dataclass
+class ClaimResult:
+    status: ClaimStatus
+    status_code: Optional[int] = None
+    response: Optional[dict] = None
+
+
+def request_fingerprint(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+def claim_key(engine: Engine, key: str, scope: str, request_hash: str, settings: Settings) -> ClaimResult:
+    """
+    Атомарно занимает ключ одним INSERT ... ON CONFLICT.
+
+    Существующую запись можно перезанять, только если она просрочена или это
+    брошенный (дольше idempotency_lock_seconds) запуск того же запроса.
+    Запись коммитится сразу в отдельной сессии, чтобы параллельный повтор ее увидел.
+    """
+    now = datetime.now()
+    table = IdempotencyKey.__table__
+    values = {
+        "key": key,
+        "scope": scope,
+        "request_hash": request_hash,
+        "status_code": None,
+        "response": null(),
+        "created_at": now,
+        "expires_at": now + timedelta(hours=settings.idempotency_ttl_hours),
+    }
+    statement = insert(table).values(**values).on_conflict_do_update(
+        index_elements=[table.c.key],
+        set_=values,
+        where=(table.c.expires_at < now) | (
+            table.c.status_code.is_(None)
+            & (table.c.created_at < now - timedelta(seconds=settings.idempotency_lock_seconds))
+            & (table.c.scope == scope)
+            & (table.c.request_hash == request_hash)
+        ),
+    ).returning(table.c.key)
+
+    with Session(engine) as session:
+        claimed = session.execute(statement).first()
+        session.commit()
+        if claimed:
+            return ClaimResult(ClaimStatus.NEW)
+
+        existing = session.execute(
+            select(table.c.scope, table.c.request_hash, table.c.status_code, table.c.response)
+            .where(table.c.key == key)
+        ).first()
+
+    # Запись могли удалить между запросами - безопаснее попросить повторить
+    if existing is None:
+        return ClaimResult(ClaimStatus.IN_PROGRESS)
+    if existing.scope != scope or existing.request_hash != request_hash:
+        return ClaimResult(ClaimStatus.MISMATCH)
+    if existing.status_code is None:
+        return ClaimResult(ClaimStatus.IN_PROGRESS)
+    return ClaimResult(ClaimStatus.REPLAY, existing.status_code, existing.response)
+
+
+def complete_key(engine: Engine, key: str, status_code: int, response: dict):
+    """Сохраняет ответ выполненного запроса"""
+    with Session(engine) as session:
+        session.execute(
+            update(IdempotencyKey.__table__)
+            .where(IdempotencyKey.__table__.c.key == key)
+            .values(status_code=status_code, response=response)
+        )
+        session.commit()
+
+
+def release_key(engine: Engine, key: str):
+    """Освобождает ключ после ошибки: повтор выполнит запрос заново"""
+    table = IdempotencyKey.__table__
+    with Session(engine) as session:
+        session.execute(delete(table).where(table.c.key == key).where(table.c.status_code.is_(None)))
+        session.commit()
+
+
+def delete_expired_keys(session: Session, now: datetime, chunk_size: int = CLEANUP_CHUNK_SIZE) -> int:
+    """Удаляет просроченные ключи пачками, чтобы не держать долгую транзакцию"""
+    table = IdempotencyKey.__table__
+    deleted = 0
+    while True:
+        candidates = (
+            select(table.c.key)
+            .where(table.c.expires_at < now)
+            .limit(chunk_size)
+            .with_for_update(skip_locked=True)
+        )
+        chunk = session.execute(
+            delete(table).where(table.c.key.in_(candidates.scalar_subquery()))
+        ).rowcount
+        session.commit()
+
+        deleted += chunk
+        if chunk < chunk_size:
+            return deleted
+
+
+class IdempotencyCleanupService:
+    """Периодическая очистка просроченных ключей идемпотентности (выполняется на лидере)"""
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.is_running = False
+
+    async def start_cleanup_task(self, session_factory):
+        self.is_running = True
+        logger.info("Idempotency key cleanup started")
+
+        while self.is_running:
+            try:
+                with session_factory() as session:
+                    deleted = delete_expired_keys(session, datetime.now())
+                if deleted:
+                    logger.info(f"Deleted {deleted} expired idempotency keys")
+            except Exception as e:
+                logger.error(f"Error cleaning up idempotency keys: {e}")
+            await asyncio.sleep(self.settings.idempotency_cleanup_interval_minutes * 60)
+
+    def stop(self):
+        self.is_running = False
+        logger.info("Idempotency key cleanup stopped")
@@ -0,0 +1,57 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Iterable, Protocol
+
+
+class QueuedTask(Protocol):
+    id: int
+    menu_item_id: int
+    created_at: datetime
+
+
+@dataclass
+class CookBatch:
+    """Партия одинаковых блюд, которую повар готовит за один заход"""
+    menu_item_id: int
+    tasks: list = field(default_factory=list)
+    is_due: bool = False  # Партия заполнена или ее самая старая задача ждет дольше max_wait
+
+    @property
+    def oldest_created_at(self) -> datetime:
+        return self.tasks[0].created_at
+
+    @property
+    def size(self) -> int:
+        return len(self.tasks)
+
+
+def build_cook_batches(
+    tasks: Iterable[QueuedTask],
+    now: datetime,
+    max_batch_size: int,
+    max_wait: timedelta,
+) -> list[CookBatch]:
+    """
+    Группирует задачи из очереди по блюду в партии и упорядочивает их.
+
+    Задачи одного блюда режутся на партии не больше max_batch_size в порядке
+    поступления. Первыми идут "созревшие" партии (заполненные или с задачей,
+    ждущей дольше max_wait), внутри группы - по времени самой старой задачи.
+    Незрелые партии остаются в расписании, чтобы свободный повар не простаивал.
+    """
+    by_menu_item: dict[int, list] = {}
+    for task in sorted(tasks, key=lambda t: (t.created_at, t.id)):
+        by_menu_item.setdefault(task.menu_item_id, []).append(task)
+
+    batches = []
+    for menu_item_id, menu_item_tasks in by_menu_item.items():
+        for start in range(0, len(menu_item_tasks), max_batch_size):
+            batch = CookBatch(menu_item_id, menu_item_tasks[start:start + max_batch_size])
+            batch.is_due = (
+                batch.size >= max_batch_size
+                or now - batch.oldest_created_at >= max_wait
+            )
+            batches.append(batch)
+
+    batches.sort(key=lambda b: (not b.is_due, b.oldest_created_at))
+    return batches
@@ -0,0 +1,101 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import Connection, Engine, text
+
+from ..settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderElection:
+    """
+    Выбор единственного лидера среди воркеров через advisory lock Postgres.
+
+    Каждый воркер периодически пытается взять session-level lock на отдельном
+    соединении. Получивший его запускает фоновые задачи и держит соединение,
+    пока жив. Если процесс лидера умирает или теряет связь с БД, Postgres
+    снимает блокировку вместе с сессией, и ее подхватывает другой воркер.
+    """
+    def __init__(self, engine: Engine, settings: Settings):
+        self.engine = engine
+        self.lock_id = settings.leader_lock_id
+        self.check_interval = settings.leader_check_interval_seconds
+        self.is_running = False
+        self.is_leader = False
+        self._jobs: list[tuple[str, Callable[[], Awaitable]]] = []
+        self._tasks: list[asyncio.Task] = []
+        self._connection: Optional[Connection] = None
+
+    def add_job(self, name: str, job_factory: Callable[[], Awaitable]):
+        """Регистрирует фоновую задачу, которая должна выполняться только на лидере"""
+        self._jobs.append((name, job_factory))
+
+    async def run(self):
+        """Цикл выборов: кандидат пытается стать лидером, лидер проверяет, что блокировка за ним"""
+        self.is_running = True
+        logger.info(f"Leader election started (lock id {self.lock_id})")
+
+        while self.is_running:
+            try:
+                if self.is_leader:
+                    self._check_connection()
+                else:
+                    self._try_acquire()
+            except Exception as e:
+                logger.error(f"Leader election error, stepping down: {e}")
+                self._step_down()
+            await asyncio.sleep(self.check_interval)
+
+    def _try_acquire(self):
+        connection = self.engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        try:
+            acquired = connection.execute(
+                text("SELECT pg_try_advisory_lock(:lock_id)"), {"lock_id": self.lock_id}
+            ).scalar()
+        except Exception:
+            connection.close()
+            raise
+
+        if not acquired:
+            connection.close()
+            return
+
+        self._connection = connection
+        self.is_leader = True
+        logger.info("This worker became the leader, starting background jobs")
+        for name, job_factory in self._jobs:
+            self._tasks.append(asyncio.create_task(job_factory(), name=name))
+
+    def _check_connection(self):
+        # Блокировка живет ровно столько, сколько сессия, поэтому достаточно проверить соединение
+        self._connection.execute(text("SELECT 1"))
+
+    def _step_down(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+
+        if self._connection is not None:
+            try:
+                if self.is_leader:
+                    self._connection.execute(
+                        text("SELECT pg_advisory_unlock(:lock_id)"), {"lock_id": self.lock_id}
+                    )
+            except Exception as e:
+                logger.warning(f"Failed to release leader lock: {e}")
+                self._connection.invalidate()
+            finally:
+                self._connection.close()
+                self._connection = None
+
+        if self.is_leader:
+            logger.info("This worker is no longer the leader, background jobs stopped")
+        self.is_leader = False
+
+    def stop(self):
+        """Остановка: снимаем блокировку, чтобы другой воркер подхватил задачи без ожидания"""
+        self.is_running = False
+        self._step_down()
+        logger.info("Leader election stopped")
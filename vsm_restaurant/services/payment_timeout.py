@@ -1,5 +1,10 @@
 import asyncio
+import heapq
+import threading
+import time
 from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import Engine, text, update
 from sqlmodel import select, Session
 from ..db.orders import Order, OrderStatus
 from ..settings import Settings
@@ -7,68 +12,293 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Канал NOTIFY, через который воркеры сообщают лидеру о новых дедлайнах оплаты
+DEADLINE_CHANNEL = "payment_deadlines"
+# Канал NOTIFY с id заказов, отмененных по таймауту оплаты (через запятую), для внешних подписчиков
+EXPIRED_CHANNEL = "orders_expired"
+# Сколько id в одном уведомлении: payload NOTIFY ограничен 8000 байт
+EXPIRED_NOTIFY_BATCH = 500
+# Пауза перед переподключением слушателя дедлайнов, растет вдвое после каждой неудачи
+LISTEN_RETRY_MIN_SECONDS = 1
+LISTEN_RETRY_MAX_SECONDS = 60
+
+class PaymentDeadlineScheduler:
+    """
+    Min-heap дедлайнов оплаты заказов.
+
+    Продление таймаута просто кладет в кучу новую запись, а устаревшая
+    отбрасывается лениво при извлечении (сверяется с актуальным дедлайном заказа).
+    """
+    def __init__(self):
+        self._heap: list[tuple[datetime, int]] = []
+        self._deadlines: dict[int, datetime] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        """Привязывает планировщик к event loop, в котором работает цикл истечения"""
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+
+    def unbind(self):
+        """Отвязывает планировщик: дедлайны перестают накапливаться, пока цикл истечения не запущен"""
+        with self._lock:
+            self._loop = None
+            self._wakeup = None
+            self._heap.clear()
+            self._deadlines.clear()
+
+    def schedule(self, order_id: int, deadline: datetime):
+        """Взводит (или переносит) дедлайн оплаты заказа"""
+        with self._lock:
+            if self._loop is None:
+                # Цикл истечения работает в другом воркере (лидере), он узнает о дедлайне через NOTIFY
+                return
+            if self._deadlines.get(order_id) == deadline:
+                return
+            self._drop_stale()
+            earliest = self._heap[0][0] if self._heap else None
+            self._deadlines[order_id] = deadline
+            heapq.heappush(self._heap, (deadline, order_id))
+        # Будим цикл, только если новый дедлайн наступит раньше текущего ближайшего
+        if earliest is None or deadline < earliest:
+            self.wake()
+
+    def cancel(self, order_id: int):
+        with self._lock:
+            self._deadlines.pop(order_id, None)
+
+    def next_deadline(self) -> Optional[datetime]:
+        with self._lock:
+            self._drop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: datetime) -> list[int]:
+        """Извлекает заказы, дедлайн которых уже наступил"""
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                deadline, order_id = heapq.heappop(self._heap)
+                if self._deadlines.get(order_id) == deadline:
+                    del self._deadlines[order_id]
+                    due.append(order_id)
+        return due
+
+    def wake(self):
+        if self._loop and self._wakeup:
+            # schedule() может вызываться из потоков пула синхронных эндпойнтов
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def wait(self, timeout: float):
+        """Спит до истечения timeout или до появления более раннего дедлайна"""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=max(timeout, 0))
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    def _drop_stale(self):
+        while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def __len__(self):
+        return len(self._deadlines)
+
+
+# Общий для процесса планировщик: его взводит set_payment_timeout, а исполняет PaymentTimeoutService
+deadline_scheduler = PaymentDeadlineScheduler()
+
 class PaymentTimeoutService:
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings, scheduler: PaymentDeadlineScheduler = deadline_scheduler):
         self.settings = settings
+        self.scheduler = scheduler
         self.is_running = False
     
     async def start_cleanup_task(self, session_factory):
-        """Запускает фоновую задачу очистки просроченных платежей"""
+        """
+        Запускает фоновую задачу истечения оплаты.
+
+        Каждый заказ отменяется точно в свой дедлайн по планировщику, а редкая
+        проверка БД (cleanup_interval_minutes) остается страховкой на случай
+        потерянных уведомлений о дедлайнах.
+        """
         self.is_running = True
+        self.scheduler.bind(asyncio.get_running_loop())
         logger.info("Payment timeout service started")
-        
-        while self.is_running:
+
+        sweep_interval = self.settings.cleanup_interval_minutes * 60
+        next_sweep = time.monotonic()
+
+        try:
+            while self.is_running:
+                try:
+                    if time.monotonic() >= next_sweep:
+                        # Первая проверка заодно отменяет заказы, истекшие пока сервис был остановлен
+                        await self.cleanup_expired_payments(session_factory)
+                        self.rebuild_schedule(session_factory)
+                        next_sweep = time.monotonic() + sweep_interval
+
+                    due = self.scheduler.pop_due(datetime.now())
+                    if due:
+                        await self.expire_orders(session_factory, due)
+
+                    timeout = next_sweep - time.monotonic()
+                    next_deadline = self.scheduler.next_deadline()
+                    if next_deadline:
+                        timeout = min(timeout, (next_deadline - datetime.now()).total_seconds())
+                    await self.scheduler.wait(timeout)
+                except Exception as e:
+                    logger.error(f"Error in payment cleanup: {e}")
+                    await asyncio.sleep(60)  # Ждем минуту при ошибке
+        finally:
+            self.scheduler.unbind()
+
+    async def listen_for_deadlines(self, engine: Engine, session_factory):
+        """
+        Принимает дедлайны, взведенные в других воркерах (NOTIFY из set_payment_timeout).
+
+        При обрыве соединения переподключается с растущей паузой; после переподключения
+        досыпает из БД дедлайны, уведомления о которых пришли, пока слушателя не было.
+        """
+        retry_seconds = LISTEN_RETRY_MIN_SECONDS
+        reconnect = False
+        while True:
+            stop = threading.Event()
+            listening = threading.Event()
+            error = None
             try:
-                await self.cleanup_expired_payments(session_factory)
-                await asyncio.sleep(self.settings.cleanup_interval_minutes * 60)
+                await asyncio.to_thread(
+                    self._listen_for_deadlines, engine, stop, listening, session_factory if reconnect else None
+                )
             except Exception as e:
-                logger.error(f"Error in payment cleanup: {e}")
-                await asyncio.sleep(60)  # Ждем минуту при ошибке
-    
+                error = e
+            finally:
+                # Поток не прерывается отменой задачи, поэтому останавливаем его флагом
+                stop.set()
+
+            if listening.is_set():
+                retry_seconds = LISTEN_RETRY_MIN_SECONDS  # Соединение работало - это новый обрыв, а не серия
+            logger.error(f"Payment deadline listener failed, reconnecting in {retry_seconds} s: {error}")
+            await asyncio.sleep(retry_seconds)
+            retry_seconds = min(retry_seconds * 2, LISTEN_RETRY_MAX_SECONDS)
+            reconnect = True
+
+    def _listen_for_deadlines(
+        self,
+        engine: Engine,
+        stop: threading.Event,
+        listening: threading.Event,
+        session_factory=None,
+    ):
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            driver_connection = connection.connection.driver_connection
+            driver_connection.execute(f"LISTEN {DEADLINE_CHANNEL}")
+            listening.set()
+            if session_factory is not None:
+                self.rebuild_schedule(session_factory)
+            try:
+                while not stop.is_set():
+                    for notify in driver_connection.notifies(timeout=1.0):
+                        order_id, deadline = notify.payload.split(" ", 1)
+                        self.scheduler.schedule(int(order_id), datetime.fromisoformat(deadline))
+            finally:
+                driver_connection.execute(f"UNLISTEN {DEADLINE_CHANNEL}")
+
+    def rebuild_schedule(self, session_factory):
+        """Досыпает в кучу дедлайны заказов, ожидающих оплаты (в т.ч. взведенные другими процессами)"""
+        with session_factory() as session:
+            rows = session.exec(
+                select(Order.id, Order.payment_timeout_at).where(
+                    Order.status == OrderStatus.WAITING_PAYMENT,
+                    Order.payment_timeout_at.is_not(None)
+                )
+            ).all()
+
+        for order_id, deadline in rows:
+            self.scheduler.schedule(order_id, deadline)
+        logger.info(f"Payment deadline schedule rebuilt: {len(self.scheduler)} orders pending")
+
+    async def expire_orders(self, session_factory, order_ids: list[int]):
+        """Отменяет заказы, дедлайн которых наступил по планировщику"""
+        # expire_overdue_orders перепроверяет статус и дедлайн в БД:
+        # заказ могли оплатить или продлить из другого процесса
+        with session_factory() as session:
+            expired_ids = expire_overdue_orders(
+                session, datetime.now(), self.settings.expiry_chunk_size, order_ids
+            )
+        self._log_expired(expired_ids)
+
     async def cleanup_expired_payments(self, session_factory):
         """Очистка просроченных платежей"""
         try:
             with session_factory() as session:
-                expired_orders = session.exec(
-                    select(Order).where(
-                        Order.status == OrderStatus.WAITING_PAYMENT,
-                        Order.payment_timeout_at <= datetime.now()
-                    )
-                ).all()
-                
-                for order in expired_orders:
-                    await self.handle_expired_payment(session, order)
-                
-                if expired_orders:
-                    logger.info(f"Cleaned up {len(expired_orders)} expired payments")
-                    
+                expired_ids = expire_overdue_orders(
+                    session, datetime.now(), self.settings.expiry_chunk_size
+                )
+
+            if expired_ids:
+                logger.info(f"Cleaned up {len(expired_ids)} expired payments")
+            self._log_expired(expired_ids)
+
         except Exception as e:
             logger.error(f"Error cleaning expired payments: {e}")
-    
-    async def handle_expired_payment(self, session: Session, order: Order):
-        """Обработка просроченного платежа"""
-        try:
-            logger.info(f"Handling expired payment for order {order.id}")
-            
-            # Помечаем заказ как просроченный
-            order.status = OrderStatus.CANCELLED
-            order.updated_at = datetime.now()
-            
-            # Если прилетит вебхук позже - обработаем конфликт
-            session.add(order)
-            session.commit()
-            
-            logger.info(f"Order {order.id} cancelled due to payment timeout")
-            
-        except Exception as e:
-            logger.error(f"Error handling expired payment for order {order.id}: {e}")
-            session.rollback()
+
+    def _log_expired(self, order_ids: list[int]):
+        for order_id in order_ids:
+            logger.info(f"Order {order_id} cancelled due to payment timeout")
     
     def stop(self):
         """Остановка сервиса"""
         self.is_running = False
+        self.scheduler.wake()
         logger.info("Payment timeout service stopped")
 
+def expire_overdue_orders(
+    session: Session,
+    now: datetime,
+    chunk_size: int,
+    order_ids: Optional[list[int]] = None,
+) -> list[int]:
+    """
+    Отменяет просроченные заказы одним UPDATE ... RETURNING id на пачку
+    и публикует id отмененных заказов в канал orders_expired.
+
+    Пачка выбирается подзапросом с FOR UPDATE SKIP LOCKED, поэтому большой
+    хвост после долгого обрыва связи не держит блокировку на всей таблице,
+    а строки, заблокированные другими транзакциями, пропускаются до следующего прохода.
+    """
+    expired_ids = []
+    while True:
+        candidates = select(Order.id).where(
+            Order.status == OrderStatus.WAITING_PAYMENT,
+            Order.payment_timeout_at <= now
+        )
+        if order_ids is not None:
+            candidates = candidates.where(Order.id.in_(order_ids))
+        candidates = candidates.limit(chunk_size).with_for_update(skip_locked=True)
+
+        chunk = session.execute(
+            update(Order)
+            .where(Order.id.in_(candidates.scalar_subquery()))
+            .where(Order.status == OrderStatus.WAITING_PAYMENT)
+            .values(status=OrderStatus.CANCELLED, updated_at=now)
+            .returning(Order.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        # Событие уходит в той же транзакции, что и UPDATE: подписчики узнают только о зафиксированных отменах
+        for start in range(0, len(chunk), EXPIRED_NOTIFY_BATCH):
+            session.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": EXPIRED_CHANNEL, "payload": ",".join(map(str, chunk[start:start + EXPIRED_NOTIFY_BATCH]))}
+            )
+        # Если прилетит вебхук позже - обработаем конфликт
+        session.commit()
+
+        expired_ids.extend(chunk)
+        if len(chunk) < chunk_size:
+            return expired_ids
+
 async def check_payment_timeout(session: Session, order_id: int) -> bool:
     """Проверяет, не истекло ли время оплаты"""
     order = session.get(Order, order_id)
@@ -84,7 +314,16 @@ async def check_payment_timeout(session: Session, order_id: int) -> bool:
 
 def set_payment_timeout(session: Session, order: Order, timeout_minutes: int):
     """Устанавливает таймаут оплаты для заказа"""
-    order.payment_timeout_at = datetime.now() + timedelta(minutes=timeout_minutes)
+    order_id = order.id
+    deadline = datetime.now() + timedelta(minutes=timeout_minutes)
+    order.payment_timeout_at = deadline
     order.updated_at = datetime.now()
     session.add(order)
+    # NOTIFY доставляется только при коммите, так что лидер не увидит незафиксированный дедлайн
+    session.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": DEADLINE_CHANNEL, "payload": f"{order_id} {deadline.isoformat()}"}
+    )
     session.commit()
+    # Взводим дедлайн только после коммита, чтобы не отменить незафиксированный заказ
+    deadline_scheduler.schedule(order_id, deadline)
@@ -0,0 +1,120 @@
+import itertools
+import sys
+import threading
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import FrameType
+from typing import Callable, Optional
+
+MAX_STACK_DEPTH = 128
+
+
+@dataclass
+class RequestProfile:
+    """Профиль одного запроса: счетчики сэмплов стеков в формате collapsed stacks"""
+    id: int
+    method: str
+    path: str
+    trigger: str  # header или sample
+    started_at: datetime = field(default_factory=datetime.now)
+    route: Optional[str] = None
+    status_code: Optional[int] = None
+    duration_ms: float = 0.0
+    interval_ms: float = 0.0
+    stacks: Counter = field(default_factory=Counter)  # "outer;...;inner" -> число сэмплов
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def top_functions(self, limit: int = 10) -> list[tuple[str, int]]:
+        """Функции, в которых запрос проводил больше всего времени (по собственным сэмплам)"""
+        own: Counter = Counter()
+        for stack, count in self.stacks.items():
+            own[stack.rsplit(";", 1)[-1]] += count
+        return own.most_common(limit)
+
+    def collapsed(self) -> str:
+        """Текст для flamegraph.pl / speedscope: строка на стек, в конце число сэмплов"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({code.co_filename}:{frame.f_lineno})"
+
+
+class StackSampler:
+    """
+    Сэмплирующий профилировщик одного запроса.
+
+    Фоновый поток раз в interval снимает стеки всех потоков и оставляет те, что
+    относятся к запросу: стек потока event loop, в котором есть кадр middleware
+    этого запроса, или стек потока пула, где выполняется endpoint запроса
+    (синхронные endpoint-ы FastAPI запускаются в пуле потоков). cProfile здесь не подходит:
+    он видит только поток, в котором включен.
+
+    Если тот же синхронный endpoint параллельно выполняют другие запросы, их сэмплы
+    тоже попадут в профиль: потоки пула не связаны с запросом ничем, кроме кода.
+    """
+    def __init__(self, profile: RequestProfile, interval_seconds: float, request_frame: FrameType, scope: dict):
+        self.profile = profile
+        self.interval_seconds = interval_seconds
+        self.request_frame = request_frame
+        self.loop_thread = threading.get_ident()  # Создается из middleware, то есть в потоке event loop
+        self.scope = scope  # endpoint появляется в scope только после маршрутизации
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{profile.id}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_thread = threading.get_ident()
+        while not self._stop.wait(self.interval_seconds):
+            endpoint_code = getattr(self.scope.get("endpoint"), "__code__", None)
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == self.loop_thread:
+                    # В event loop тот же endpoint могут выполнять и другие запросы - ищем именно наш кадр
+                    self._sample(frame, lambda f: f is self.request_frame)
+                elif thread_id != own_thread and endpoint_code is not None:
+                    self._sample(frame, lambda f: f.f_code is endpoint_code)
+
+    def _sample(self, frame: FrameType, is_request_root: Callable[[FrameType], bool]):
+        stack = []
+        belongs = False
+        depth = 0
+        while frame is not None and depth < MAX_STACK_DEPTH:
+            stack.append(frame)
+            if is_request_root(frame):
+                belongs = True
+                break  # Кадры выше (event loop, пул потоков) в профиль не нужны
+            frame = frame.f_back
+            depth += 1
+        if belongs:
+            self.profile.stacks[";".join(_frame_name(frame) for frame in reversed(stack))] += 1
+
+
+class ProfileStore:
+    """Последние профили в памяти воркера (кольцевой буфер)"""
+    def __init__(self, keep: int = 20):
+        self._ids = itertools.count(1)
+        self._profiles: deque[RequestProfile] = deque(maxlen=keep)
+        self.busy = False  # Одновременно профилируется не больше одного запроса
+
+    def new_profile(self, method: str, path: str, trigger: str) -> RequestProfile:
+        return RequestProfile(id=next(self._ids), method=method, path=path, trigger=trigger)
+
+    def add(self, profile: RequestProfile):
+        self._profiles.append(profile)
+
+    def list(self) -> list[RequestProfile]:
+        return list(reversed(self._profiles))
+
+    def get(self, profile_id: int) -> Optional[RequestProfile]:
+        return next((profile for profile in self._profiles if profile.id == profile_id), None)
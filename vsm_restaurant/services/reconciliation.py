@@ -0,0 +1,170 @@
+import asyncio
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from enum import Enum
+from typing import AsyncIterator, Iterator, Optional
+
+import httpx
+from sqlmodel import select
+
+from ..db.orders import Order, OrderStatus, PaymentMethod
+from ..settings import Settings
+
+logger = logging.getLogger(__name__)
+
+# Статусы заказов, в которых состояние оплаты может разойтись с платежным сервисом
+RECONCILED_STATUSES = [OrderStatus.WAITING_PAYMENT, OrderStatus.CANCELLED, OrderStatus.PAID]
+ONLINE_PAYMENT_METHODS = [PaymentMethod.CARD_ONLINE, PaymentMethod.SBP]
+
+
+class ReconciliationActionType(str, Enum):
+    REDELIVER_WEBHOOK = "redeliver_webhook"  # Платеж прошел, а заказ все еще ждет оплаты
+    REFUND = "refund"  # Платеж прошел, а заказ отменен или оплачен иначе
+    MANUAL_REVIEW = "manual_review"  # Заказ оплачен у нас, но платеж не подтвержден
+
+
+@dataclass
+class ReconciliationAction:
+    order_id: int
+    action: ReconciliationActionType
+    order_status: OrderStatus
+    payment_status: Optional[str]
+    reason: str
+
+
+def iter_order_chunks(session_factory, chunk_size: int) -> Iterator[list]:
+    """
+    Постранично (keyset по id) читает заказы для сверки.
+    На каждую пачку открывается короткая сессия, поэтому память и длина
+    транзакции не зависят от размера таблицы.
+    """
+    last_id = 0
+    while True:
+        with session_factory() as session:
+            rows = session.exec(
+                select(Order.id, Order.status, Order.payment_method)
+                .where(Order.status.in_(RECONCILED_STATUSES), Order.id > last_id)
+                .order_by(Order.id)
+                .limit(chunk_size)
+            ).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def diff_payment_state(
+    order_id: int,
+    order_status: OrderStatus,
+    payment_method: PaymentMethod,
+    payment: Optional[dict],
+) -> Optional[ReconciliationAction]:
+    """Сравнивает состояние заказа с состоянием платежа и подбирает корректирующее действие"""
+    payment_status = payment["status"] if payment else None
+    is_online = payment_method in ONLINE_PAYMENT_METHODS
+
+    if payment_status == "success":
+        if order_status == OrderStatus.CANCELLED:
+            return ReconciliationAction(
+                order_id, ReconciliationActionType.REFUND, order_status, payment_status,
+                "Payment succeeded but order is cancelled",
+            )
+        if not is_online:
+            # Пассажир переключился на постоплату, а онлайн-платеж все же прошел
+            return ReconciliationAction(
+                order_id, ReconciliationActionType.REFUND, order_status, payment_status,
+                f"Payment succeeded but order was switched to {payment_method.value}",
+            )
+        if order_status == OrderStatus.WAITING_PAYMENT:
+            return ReconciliationAction(
+                order_id, ReconciliationActionType.REDELIVER_WEBHOOK, order_status, payment_status,
+                "Payment succeeded but webhook was not processed",
+            )
+        return None
+
+    if order_status == OrderStatus.PAID and is_online:
+        return ReconciliationAction(
+            order_id, ReconciliationActionType.MANUAL_REVIEW, order_status, payment_status,
+            f"Order is paid but payment status is {payment_status or 'unknown'}",
+        )
+
+    return None
+
+
+class PaymentReconciliationService:
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.is_running = False
+
+    async def start_reconciliation_task(self, session_factory):
+        """Запускает периодическую сверку заказов с платежным сервисом"""
+        self.is_running = True
+        logger.info("Payment reconciliation service started")
+
+        while self.is_running:
+            try:
+                await self.run_once(session_factory)
+                await asyncio.sleep(self.settings.reconciliation_interval_minutes * 60)
+            except Exception as e:
+                logger.error(f"Error in payment reconciliation: {e}")
+                await asyncio.sleep(60)
+
+    async def reconcile(self, session_factory, client: httpx.AsyncClient) -> AsyncIterator[ReconciliationAction]:
+        """Потоково сверяет заказы пачками и отдает найденные расхождения"""
+        payment_url = self.settings.payment_service_url
+
+        for rows in iter_order_chunks(session_factory, self.settings.reconciliation_chunk_size):
+            r = await client.post(
+                f"{payment_url}/status/bulk",
+                json={"order_ids": [order_id for order_id, _, _ in rows]},
+                timeout=10.0,
+            )
+            r.raise_for_status()
+            # JSON превращает ключи в строки
+            payments = {int(order_id): payment for order_id, payment in r.json()["payments"].items()}
+
+            for order_id, order_status, payment_method in rows:
+                action = diff_payment_state(order_id, order_status, payment_method, payments.get(order_id))
+                if action:
+                    yield action
+
+    async def apply_action(self, client: httpx.AsyncClient, action: ReconciliationAction):
+        """Выполняет корректирующее действие через платежный сервис"""
+        payment_url = self.settings.payment_service_url
+
+        if action.action == ReconciliationActionType.REDELIVER_WEBHOOK:
+            # Повторная доставка вебхука проходит обычный путь обработки с проверкой конфликтов
+            r = await client.post(f"{payment_url}/webhook", params={"order_id": action.order_id}, timeout=10.0)
+            r.raise_for_status()
+        elif action.action == ReconciliationActionType.REFUND:
+            r = await client.post(f"{payment_url}/refund", params={"order_id": action.order_id}, timeout=10.0)
+            r.raise_for_status()
+        else:
+            logger.warning(f"Order {action.order_id} requires manual payment review: {action.reason}")
+
+    async def run_once(self, session_factory) -> dict:
+        """Один проход сверки. Возвращает количество действий по типам"""
+        counts = Counter()
+
+        async with httpx.AsyncClient() as client:
+            async for action in self.reconcile(session_factory, client):
+                logger.info(f"Reconciliation: order {action.order_id} -> {action.action.value} ({action.reason})")
+                counts[action.action.value] += 1
+
+                if not self.settings.reconciliation_auto_fix:
+                    continue
+                try:
+                    await self.apply_action(client, action)
+                except httpx.HTTPError as e:
+                    logger.error(f"Failed to apply {action.action.value} for order {action.order_id}: {e}")
+                    counts["failed"] += 1
+
+        if counts:
+            logger.info(f"Payment reconciliation finished: {dict(counts)}")
+        return dict(counts)
+
+    def stop(self):
+        """Остановка сервиса"""
+        self.is_running = False
+        logger.info("Payment reconciliation service stopped")
@@ -0,0 +1,155 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import Engine, event
+
+# Границы корзин гистограмм, секунды
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Границы корзин гистограммы числа SQL-запросов на HTTP-запрос
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class Histogram:
+    """Гистограмма с заранее заданными корзинами: observe - бинарный поиск и пара сложений"""
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Последняя корзина - +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        total = 0
+        result = []
+        for bound, count in zip((*map(_format_float, self.buckets), "+Inf"), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class RequestStats:
+    """Статистика одного запроса, которую копят обработчики событий SQLAlchemy"""
+    __slots__ = ("db_seconds", "queries", "statements")
+
+    def __init__(self):
+        self.db_seconds = 0.0
+        self.queries = 0
+        self.statements: dict[str, int] = {}  # Текст запроса -> сколько раз выполнен
+
+    def most_repeated(self) -> tuple[Optional[str], int]:
+        """Самый часто повторенный запрос: признак N+1, если повторов столько же, сколько строк"""
+        if not self.statements:
+            return None, 0
+        statement = max(self.statements, key=self.statements.__getitem__)
+        return statement, self.statements[statement]
+
+
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def track_request() -> RequestStats:
+    """Начинает учет запросов к БД для текущего контекста (HTTP-запроса)"""
+    stats = RequestStats()
+    _current_request.set(stats)
+    return stats
+
+
+class RequestMetrics:
+    """
+    Метрики HTTP-запросов воркера.
+
+    Блокировок нет: observe вызывается только из middleware в потоке event loop,
+    а запросы к БД копят время в RequestStats своего запроса.
+    """
+    def __init__(self):
+        self.in_flight = 0
+        self.latency: dict[tuple[str, str], Histogram] = {}
+        self.db_time: dict[tuple[str, str], Histogram] = {}
+        self.db_queries: dict[tuple[str, str], Histogram] = {}
+        self.responses: dict[tuple[str, str, int], int] = {}
+
+    def start_request(self):
+        self.in_flight += 1
+
+    def finish_request(self, method: str, route: str, status_code: int, seconds: float, stats: RequestStats):
+        self.in_flight -= 1
+        key = (method, route)
+        latency = self.latency.get(key)
+        if latency is None:
+            latency = self.latency[key] = Histogram()
+            self.db_time[key] = Histogram()
+            self.db_queries[key] = Histogram(QUERY_COUNT_BUCKETS)
+        latency.observe(seconds)
+        self.db_time[key].observe(stats.db_seconds)
+        self.db_queries[key].observe(stats.queries)
+
+        response_key = (method, route, status_code)
+        self.responses[response_key] = self.responses.get(response_key, 0) + 1
+
+    def render(self) -> str:
+        """Текстовый формат Prometheus"""
+        lines = [
+            "# HELP http_requests_in_flight Requests being processed right now",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+            "# HELP http_responses_total Responses by route and status code",
+            "# TYPE http_responses_total counter",
+        ]
+        for (method, route, status_code), count in sorted(self.responses.items()):
+            lines.append(f"http_responses_total{_labels(method=method, route=route, status=status_code)} {count}")
+
+        for name, help_text, histograms in (
+            ("http_request_duration_seconds", "Request latency by route", self.latency),
+            ("http_request_db_seconds", "Time spent in database queries per request by route", self.db_time),
+            ("http_request_db_queries", "Database queries per request by route", self.db_queries),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for (method, route), histogram in sorted(histograms.items()):
+                for bound, count in histogram.cumulative():
+                    lines.append(f"{name}_bucket{_labels(method=method, route=route, le=bound)} {count}")
+                labels = _labels(method=method, route=route)
+                lines.append(f"{name}_sum{labels} {_format_float(histogram.sum)}")
+                lines.append(f"{name}_count{labels} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_float(value: float) -> str:
+    return repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Время начала храним в контексте выполнения: при ошибке запроса он просто отбрасывается
+    context.metrics_started_at = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_request.get()
+    if stats is not None:
+        stats.db_seconds += time.perf_counter() - context.metrics_started_at
+        stats.queries += 1
+        stats.statements[statement] = stats.statements.get(statement, 0) + 1
+
+
+def instrument_engine(engine: Engine):
+    """Подключает учет запросов к БД и их времени в статистику текущего HTTP-запроса"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+request_metrics = RequestMetrics()
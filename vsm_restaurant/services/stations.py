@@ -0,0 +1,92 @@
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from sqlmodel import Session, func, select
+
+from ..db.cooking_task import CookingTask, KitchenStation
+from ..db.menu import MenuItemModel
+from .estimation import ACTIVE_STATUSES, eta_engine
+
+
+@dataclass
+class StationLoad:
+    """Станция кухни и оценка работы, которая на ней уже стоит в очереди"""
+    station_id: int
+    cooks: int
+    ingredient_ids: Optional[frozenset[int]] = None  # None - станция готовит любое блюдо
+    work_seconds: float = 0.0
+
+    def stocks(self, required: Iterable[int]) -> bool:
+        return self.ingredient_ids is None or self.ingredient_ids.issuperset(required)
+
+    def finish_seconds(self, extra_seconds: float = 0.0) -> float:
+        """Через сколько секунд станция разберет свою очередь (плюс extra_seconds работы)"""
+        return (self.work_seconds + extra_seconds) / max(self.cooks, 1)
+
+
+def pick_station(stations: list[StationLoad], required: Iterable[int], seconds: float) -> Optional[StationLoad]:
+    """
+    Выбирает станцию, где задача будет готова раньше всего, среди станций,
+    на которых есть все нужные ингредиенты, и учитывает задачу в ее нагрузке.
+    None - подходящей станции нет.
+    """
+    required = set(required)
+    candidates = [station for station in stations if station.stocks(required)]
+    if not candidates:
+        return None
+
+    station = min(candidates, key=lambda s: (s.finish_seconds(seconds), s.station_id))
+    station.work_seconds += seconds
+    return station
+
+
+def load_station_loads(session: Session) -> list[StationLoad]:
+    """Активные станции и их текущая нагрузка: оценка длительности незавершенных задач"""
+    stations = {
+        station.id: StationLoad(
+            station_id=station.id,
+            cooks=station.cooks,
+            ingredient_ids=frozenset(station.ingredient_ids) if station.ingredient_ids is not None else None,
+        )
+        for station in session.exec(select(KitchenStation).where(KitchenStation.is_active)).all()
+    }
+    if not stations:
+        return []
+
+    rows = session.exec(
+        select(CookingTask.station_id, CookingTask.menu_item_id, func.count(CookingTask.id))
+        .where(CookingTask.station_id.in_(list(stations)))
+        .where(CookingTask.status.in_(ACTIVE_STATUSES))
+        .group_by(CookingTask.station_id, CookingTask.menu_item_id)
+    ).all()
+    for station_id, menu_item_id, count in rows:
+        stations[station_id].work_seconds += eta_engine.dish_seconds(menu_item_id) * count
+
+    return list(stations.values())
+
+
+def assign_stations(session: Session, menu_item_ids: list[int]) -> list[Optional[int]]:
+    """
+    Назначает станции новым задачам (по одной на каждое блюдо из menu_item_ids).
+
+    Нагрузка станций читается одним сгруппированным запросом и дальше ведется
+    в памяти, так что задачи одного заказа тоже распределяются по станциям.
+    Если станций нет или ни на одной нет ингредиентов, задача остается в общей очереди (None).
+    """
+    stations = load_station_loads(session)
+    if not stations:
+        return [None] * len(menu_item_ids)
+
+    compositions = dict(session.exec(
+        select(MenuItemModel.id, MenuItemModel.composition).where(MenuItemModel.id.in_(set(menu_item_ids)))
+    ).all())
+    required = {
+        menu_item_id: {ingredient["ingredient_id"] for ingredient in compositions.get(menu_item_id) or []}
+        for menu_item_id in set(menu_item_ids)
+    }
+
+    assigned = []
+    for menu_item_id in menu_item_ids:
+        station = pick_station(stations, required[menu_item_id], eta_engine.dish_seconds(menu_item_id))
+        assigned.append(station.station_id if station else None)
+    return assigned
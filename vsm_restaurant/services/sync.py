@@ -0,0 +1,105 @@
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+from sqlalchemy import text, tuple_
+from sqlmodel import Session, SQLModel, select
+
+from ..db.cooking_task import CookingTask
+from ..db.menu import IngredientModel, MenuItemModel
+from ..db.orders import Order, OrderItem
+from ..db.sync import SyncTombstone
+
+# Таблицы, доступные для синхронизации, по имени таблицы в БД
+SYNC_TABLES: dict[str, type[SQLModel]] = {
+    model.__tablename__: model
+    for model in (Order, OrderItem, CookingTask, MenuItemModel, IngredientModel)
+}
+
+INITIAL_CURSOR = "0"
+
+
+@dataclass
+class Change:
+    table: str
+    version: int
+    row_id: int
+    xid: int  # Транзакция, записавшая изменение
+    deleted: bool = False
+    row: Optional[dict] = None  # Текущее состояние строки, у удаленной - None
+
+
+@dataclass
+class ChangeSet:
+    changes: list[Change] = field(default_factory=list)
+    cursor: str = INITIAL_CURSOR  # С этого курсора продолжать следующий запрос
+    has_more: bool = False
+
+
+def format_cursor(xid: int, version: int) -> str:
+    return f"{xid}-{version}"
+
+
+def parse_cursor(cursor: str) -> tuple[int, int]:
+    """Курсор - "транзакция-версия" последнего отданного изменения; "0" - с начала"""
+    xid, _, version = cursor.partition("-")
+    xid, version = int(xid), int(version or 0)
+    if xid < 0 or version < 0:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return xid, version
+
+
+def collect_changes(session: Session, since: tuple[int, int], tables: Iterable[str], limit: int) -> ChangeSet:
+    """
+    Изменения выбранных таблиц после курсора since, по возрастанию (транзакция, версия).
+
+    Версия выдается при записи, а не при коммите: долгая транзакция может зафиксировать
+    изменение с версией меньше уже отданной. Поэтому изменения упорядочены по транзакции,
+    которая их записала, и отдаются только транзакции старше xmin текущего снимка -
+    все они уже завершены, а любая еще идущая или будущая транзакция получит id не меньше xmin.
+    Курсор не обгоняет незавершенные транзакции, и ни одно изменение не теряется;
+    цена - долгая пишущая транзакция задерживает синхронизацию до своего завершения.
+
+    Из каждой таблицы и из надгробий читается не больше limit + 1 строк по индексу
+    change_xid, затем они сливаются и обрезаются до limit, так что курсор
+    не перескакивает через изменения других таблиц. Строка, измененная несколько раз,
+    приходит один раз в последнем состоянии.
+    """
+    # Все транзакции с id меньше xmin завершены; для чтения изменений свой id не нужен
+    xmin = session.execute(text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")).scalar_one()
+
+    tables = list(dict.fromkeys(tables))
+    changes = []
+    for table in tables:
+        model = SYNC_TABLES[table]
+        rows = session.exec(
+            select(model)
+            .where(tuple_(model.change_xid, model.change_version) > since)
+            .where(model.change_xid < xmin)
+            .order_by(model.change_xid, model.change_version)
+            .limit(limit + 1)
+        ).all()
+        changes.extend(
+            Change(table, row.change_version, row.id, row.change_xid, row=row.model_dump(exclude={"change_xid"}))
+            for row in rows
+        )
+
+    tombstones = session.exec(
+        select(SyncTombstone)
+        .where(tuple_(SyncTombstone.change_xid, SyncTombstone.change_version) > since)
+        .where(SyncTombstone.change_xid < xmin)
+        .where(SyncTombstone.table_name.in_(tables))
+        .order_by(SyncTombstone.change_xid, SyncTombstone.change_version)
+        .limit(limit + 1)
+    ).all()
+    changes.extend(
+        Change(tombstone.table_name, tombstone.change_version, tombstone.row_id, tombstone.change_xid, deleted=True)
+        for tombstone in tombstones
+    )
+
+    changes.sort(key=lambda change: (change.xid, change.version))
+    page = changes[:limit]
+    return ChangeSet(
+        changes=page,
+        cursor=format_cursor(page[-1].xid, page[-1].version) if page else format_cursor(*since),
+        has_more=len(changes) > limit,
+    )
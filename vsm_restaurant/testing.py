@@ -0,0 +1,80 @@
+"""
+Помощники для тестов: подсчет SQL-запросов и проверка endpoint-ов на N+1.
+
+Пример (фикстура sqlite_engine и make_client - из tests/conftest.py,
+make_tasks - из tests/test_query_counts.py):
+
+    def test_waiter_tasks_query_count_does_not_grow(sqlite_engine):
+        client = make_client(sqlite_engine, waiter.router)
+        assert_query_count_stable(
+            sqlite_engine,
+            seed=make_tasks(sqlite_engine),
+            request=lambda: client.get("/waiter/tasks"),
+            sizes=(1, 10),
+        )
+"""
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator, Sequence
+
+from sqlalchemy import Engine, event
+
+
+@dataclass
+class QueryLog:
+    statements: list[str] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+@contextmanager
+def count_queries(engine: Engine) -> Iterator[QueryLog]:
+    """
+    Считает все SQL-запросы через engine внутри блока.
+
+    Считаются запросы из любого потока, поэтому работает и с TestClient,
+    который выполняет приложение в своем event loop.
+    """
+    log = QueryLog()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        log.statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield log
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def assert_query_count_stable(
+    engine: Engine,
+    seed: Callable[[int], Any],
+    request: Callable[[], Any],
+    sizes: Sequence[int] = (1, 10),
+    slack: int = 0,
+):
+    """
+    Проверяет, что число запросов endpoint-а не растет с объемом данных.
+
+    seed(n) доводит данные до размера n (например, создает n заказов), request()
+    выполняет проверяемый запрос. Если на большем размере запросов больше,
+    чем на меньшем, более чем на slack, тест падает со списком запросов.
+    """
+    counts = []
+    for size in sizes:
+        seed(size)
+        with count_queries(engine) as log:
+            request()
+        counts.append((size, log))
+
+    base_size, base_log = counts[0]
+    for size, log in counts[1:]:
+        if log.count > base_log.count + slack:
+            statements = "\n".join(f"  {statement}" for statement in log.statements)
+            raise AssertionError(
+                f"Query count grows with data size: {base_log.count} queries for {base_size} rows, "
+                f"{log.count} for {size} rows\n{statements}"
+            )
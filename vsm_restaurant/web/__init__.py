@@ -7,7 +7,7 @@ import logging
 
 from fastapi import FastAPI
 
-from vsm_restaurant.dependencies import lifespan
+from vsm_restaurant.dependencies import lifespan, settings
 
 # API роутеры
 from .menu import router as menu_router
@@ -17,13 +17,21 @@ from .cooking import router as cooking_router
 from .payments import router as payment_router
 from .waiter import router as waiter_router
 from .passenger import router as passenger_router
+from .sync import router as sync_router
+from .metrics import MetricsMiddleware, router as metrics_router
+from .profiling import ProfilingMiddleware, router as profiling_router
 
 # UI роутеры
 from .warehouse import router as warehouse_router
 from .kitchen import router as kitchen_router
 import asyncio
 from sqlmodel import Session
+from vsm_restaurant.services.estimation import eta_engine
+from vsm_restaurant.services.idempotency import IdempotencyCleanupService
+from vsm_restaurant.services.leader import LeaderElection
 from vsm_restaurant.services.payment_timeout import PaymentTimeoutService
+from vsm_restaurant.services.profiling import ProfileStore
+from vsm_restaurant.services.reconciliation import PaymentReconciliationService
 
 
 
@@ -32,6 +40,26 @@ logger = logging.getLogger(__name__)
 
 app = FastAPI(lifespan=lifespan)
 
+if settings.tracks_queries:
+    app.add_middleware(
+        MetricsMiddleware,
+        record_metrics=settings.metrics_enabled,
+        debug_headers=settings.debug_query_headers,
+        n_plus_one_threshold=settings.n_plus_one_threshold,
+    )
+if settings.metrics_enabled:
+    app.include_router(metrics_router)
+if settings.profiling_enabled:
+    app.state.profile_store = ProfileStore(settings.profiling_keep)
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=app.state.profile_store,
+        token=settings.profiling_token,
+        sample_rate=settings.profiling_sample_rate,
+        interval_ms=settings.profiling_interval_ms,
+    )
+    app.include_router(profiling_router)
+
 # Регистрация API роутеров
 app.include_router(menu_router)
 app.include_router(ingredients_router)
@@ -40,6 +68,7 @@ app.include_router(cooking_router)
 app.include_router(payment_router)
 app.include_router(waiter_router)
 app.include_router(passenger_router)
+app.include_router(sync_router)
 
 # Регистрация UI роутеров
 app.include_router(warehouse_router)
@@ -53,17 +82,35 @@ async def root():
 @app.on_event("startup")
 async def startup_event():
     """Инициализация при запуске приложения"""
-    # Запускаем сервис таймаутов для автоматической отмены просроченных заказов
-    timeout_service = PaymentTimeoutService(app.state.settings)
-    
     def session_factory():
         return Session(app.state.engine)
-    
-    asyncio.create_task(timeout_service.start_cleanup_task(session_factory))
-    
-    # Сохраняем сервис в состоянии приложения
+
+    # Сервис таймаутов для автоматической отмены просроченных заказов
+    timeout_service = PaymentTimeoutService(app.state.settings)
+    # Периодическая сверка оплат с платежным сервисом (пропущенные вебхуки, потерянные возвраты)
+    reconciliation_service = PaymentReconciliationService(app.state.settings)
+    # Удаление просроченных ключей Idempotency-Key
+    idempotency_cleanup_service = IdempotencyCleanupService(app.state.settings)
+
+    # Фоновые задачи выполняются только в одном воркере - лидере
+    leader_election = LeaderElection(app.state.engine, app.state.settings)
+    leader_election.add_job("payment-timeouts", lambda: timeout_service.start_cleanup_task(session_factory))
+    leader_election.add_job("payment-deadlines-listener", lambda: timeout_service.listen_for_deadlines(app.state.engine, session_factory))
+    leader_election.add_job("payment-reconciliation", lambda: reconciliation_service.start_reconciliation_task(session_factory))
+    leader_election.add_job("idempotency-cleanup", lambda: idempotency_cleanup_service.start_cleanup_task(session_factory))
+    asyncio.create_task(leader_election.run())
+
+    # Модель ETA есть в каждом воркере, сверка с БД тоже
+    app.state.eta_refresh_task = asyncio.create_task(
+        eta_engine.start_refresh_task(session_factory, app.state.settings.eta_refresh_interval_seconds)
+    )
+
+    # Сохраняем сервисы в состоянии приложения
     app.state.timeout_service = timeout_service
-    logger.info("Payment timeout service started")
+    app.state.reconciliation_service = reconciliation_service
+    app.state.idempotency_cleanup_service = idempotency_cleanup_service
+    app.state.leader_election = leader_election
+    logger.info("Background jobs registered for leader election")
 
 @app.on_event("shutdown")
 async def shutdown_event():
@@ -71,3 +118,11 @@ async def shutdown_event():
     if hasattr(app.state, 'timeout_service'):
         app.state.timeout_service.stop()
         logger.info("Payment timeout service stopped")
+    if hasattr(app.state, 'reconciliation_service'):
+        app.state.reconciliation_service.stop()
+    if hasattr(app.state, 'idempotency_cleanup_service'):
+        app.state.idempotency_cleanup_service.stop()
+    if hasattr(app.state, 'leader_election'):
+        app.state.leader_election.stop()
+    if hasattr(app.state, 'eta_refresh_task'):
+        app.state.eta_refresh_task.cancel()
@@ -1,9 +1,19 @@
+from typing import List
+
 from pydantic import BaseModel
 from fastapi import APIRouter, HTTPException
 from sqlmodel import select
 
 from vsm_restaurant.db.cooking_task import CookingStatus, CookingTask
 from vsm_restaurant.dependencies import SessionDep
+from vsm_restaurant.services.cooking import (
+    adjust_order_counters,
+    can_transition,
+    set_task_status,
+    set_task_statuses,
+)
+from vsm_restaurant.services.estimation import eta_engine
+from vsm_restaurant.services.stations import assign_stations
 
 router = APIRouter()
 
@@ -17,6 +27,15 @@ class CookingTaskUpdate(BaseModel):
     status: CookingStatus
 
 
+class CookingTaskStatusChange(BaseModel):
+    task_id: int
+    status: CookingStatus
+
+
+class CookingTaskBulkUpdate(BaseModel):
+    updates: List[CookingTaskStatusChange]
+
+
 @router.get("/tasks")
 def list_tasks(session: SessionDep):
     return session.exec(select(CookingTask)).all()
@@ -27,20 +46,82 @@ def create_task(task_data: CookingTaskCreate, session: SessionDep):
     task = CookingTask(
         order_id=task_data.order_id,
         menu_item_id=task_data.menu_item_id,
+        station_id=assign_stations(session, [task_data.menu_item_id])[0],
     )
     session.add(task)
+    adjust_order_counters(session, task.order_id, {"tasks_total": 1, "tasks_queued": 1})
     session.commit()
     session.refresh(task)
+    eta_engine.on_task_queued(task.id, task.order_id, task.menu_item_id)
     return task
 
 
 @router.patch("/tasks/{task_id}")
 def update_task_status(task_id: int, update: CookingTaskUpdate, session: SessionDep):
-    task = session.get(CookingTask, task_id)
+    # Блокировка строки: параллельная смена статуса увидит уже обновленную задачу
+    task = session.get(CookingTask, task_id, with_for_update=True)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    task.status = update.status
+    if task.status != update.status:
+        if not can_transition(task.status, update.status):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Cannot transition task from {task.status.value} to {update.status.value}",
+            )
+        set_task_status(session, task, update.status)
+
     session.commit()
     session.refresh(task)
     return task
+
+
+@router.patch("/tasks")
+def bulk_update_task_status(payload: CookingTaskBulkUpdate, session: SessionDep):
+    """
+    Смена статуса сразу у многих задач (например, повар выдал целый поднос) в одной транзакции.
+
+    Сначала проверяются все переходы; если хоть один недопустим, ничего не меняется.
+    В ответе - измененные задачи и вызванные ими смены статусов заказов.
+    """
+    task_ids = [change.task_id for change in payload.updates]
+    if len(set(task_ids)) != len(task_ids):
+        raise HTTPException(status_code=400, detail="Duplicate task ids in request")
+
+    # Блокируем строки в порядке id, чтобы параллельные пачки не взаимоблокировались
+    tasks = {
+        task.id: task
+        for task in session.exec(
+            select(CookingTask)
+            .where(CookingTask.id.in_(task_ids))
+            .order_by(CookingTask.id)
+            .with_for_update()
+        ).all()
+    }
+
+    missing = [task_id for task_id in task_ids if task_id not in tasks]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Tasks not found: {missing}")
+
+    errors = [
+        f"Task {change.task_id}: cannot transition from {tasks[change.task_id].status.value} to {change.status.value}"
+        for change in payload.updates
+        if tasks[change.task_id].status != change.status
+        and not can_transition(tasks[change.task_id].status, change.status)
+    ]
+    if errors:
+        raise HTTPException(status_code=400, detail=errors)
+
+    changes = [
+        (tasks[change.task_id], change.status)
+        for change in payload.updates
+        if tasks[change.task_id].status != change.status
+    ]
+    updated = [task.id for task, _ in changes]
+    order_status_changes = set_task_statuses(session, changes)
+    session.commit()
+
+    return {
+        "updated": updated,
+        "order_status_changes": order_status_changes,
+    }
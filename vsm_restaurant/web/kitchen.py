@@ -1,11 +1,27 @@
+from datetime import datetime, timedelta
+from typing import Literal, Optional
+
 from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
-from sqlmodel import select
+from sqlmodel import func, select
 
+from vsm_restaurant.db.cooking_task import CookingStatus, CookingTask, KitchenStation
 from vsm_restaurant.db.menu import IngredientModel, MenuItemModel
-from vsm_restaurant.dependencies import SessionDep
+from vsm_restaurant.dependencies import SessionDep, SettingsDep
+from vsm_restaurant.schemas.kitchen import (
+    ClaimRequest,
+    CookBatchOut,
+    KitchenStationCreate,
+    KitchenStationOut,
+    LatencyReportRow,
+)
 from vsm_restaurant.schemas.menu import IngredientOut, MenuItemCreate, MenuItemOut
+from vsm_restaurant.services.cooking import set_task_statuses
+from vsm_restaurant.services.cooking_metrics import latency_report
+from vsm_restaurant.services.estimation import ACTIVE_STATUSES
+from vsm_restaurant.services.kitchen_scheduler import build_cook_batches
+from vsm_restaurant.services.stations import load_station_loads
 
 router = APIRouter()
 templates = Jinja2Templates(directory="vsm_restaurant/web/templates")
@@ -16,6 +32,156 @@ async def kitchen_page(request: Request):
     return templates.TemplateResponse("kitchen.html", {"request": request})
 
 
+def _queue_batches(session, settings, station_id: Optional[int] = None) -> list[CookBatchOut]:
+    query = (
+        select(CookingTask, MenuItemModel.name)
+        .join(MenuItemModel, MenuItemModel.id == CookingTask.menu_item_id)
+        .where(CookingTask.status == CookingStatus.QUEUED)
+    )
+    if station_id is not None:
+        query = query.where(CookingTask.station_id == station_id)
+    rows = session.exec(query).all()
+    menu_item_names = {task.menu_item_id: name for task, name in rows}
+
+    now = datetime.now()
+    batches = build_cook_batches(
+        [task for task, _ in rows],
+        now,
+        max_batch_size=settings.kitchen_batch_max_size,
+        max_wait=timedelta(minutes=settings.kitchen_batch_max_wait_minutes),
+    )
+
+    return [
+        CookBatchOut(
+            position=position,
+            menu_item_id=batch.menu_item_id,
+            menu_item_name=menu_item_names[batch.menu_item_id],
+            size=batch.size,
+            task_ids=[task.id for task in batch.tasks],
+            order_ids=sorted({task.order_id for task in batch.tasks}),
+            oldest_created_at=batch.oldest_created_at,
+            waiting_seconds=int((now - batch.oldest_created_at).total_seconds()),
+            is_due=batch.is_due,
+        )
+        for position, batch in enumerate(batches, start=1)
+    ]
+
+
+@router.get("/kitchen/queue", response_model=list[CookBatchOut])
+def kitchen_queue(session: SessionDep, settings: SettingsDep, station_id: Optional[int] = None):
+    """Очередь кухни (или одной станции), сгруппированная в партии одинаковых блюд в порядке готовки"""
+    return _queue_batches(session, settings, station_id)
+
+
+@router.get("/kitchen/stations", response_model=list[KitchenStationOut])
+def list_stations(session: SessionDep):
+    """Станции кухни с размером очереди и оценкой нагрузки"""
+    stations = session.exec(select(KitchenStation).order_by(KitchenStation.id)).all()
+    counts = session.exec(
+        select(CookingTask.station_id, CookingTask.status, func.count(CookingTask.id))
+        .where(CookingTask.station_id.is_not(None))
+        .where(CookingTask.status.in_(ACTIVE_STATUSES))
+        .group_by(CookingTask.station_id, CookingTask.status)
+    ).all()
+    by_station: dict[int, dict[CookingStatus, int]] = {}
+    for station_id, status, count in counts:
+        by_station.setdefault(station_id, {})[status] = count
+    loads = {load.station_id: load for load in load_station_loads(session)}
+
+    return [
+        KitchenStationOut(
+            id=station.id,
+            name=station.name,
+            cooks=station.cooks,
+            ingredient_ids=station.ingredient_ids,
+            is_active=station.is_active,
+            queued=by_station.get(station.id, {}).get(CookingStatus.QUEUED, 0),
+            cooking=by_station.get(station.id, {}).get(CookingStatus.COOKING, 0),
+            load_minutes=round(loads[station.id].finish_seconds() / 60, 1) if station.id in loads else 0.0,
+        )
+        for station in stations
+    ]
+
+
+@router.post("/kitchen/stations", response_model=KitchenStationOut)
+def create_station(payload: KitchenStationCreate, session: SessionDep):
+    station = KitchenStation(**payload.dict())
+    session.add(station)
+    session.commit()
+    session.refresh(station)
+    return KitchenStationOut(id=station.id, **payload.dict())
+
+
+@router.get("/kitchen/stations/{station_id}/queue", response_model=list[CookBatchOut])
+def station_queue(station_id: int, session: SessionDep, settings: SettingsDep):
+    if not session.get(KitchenStation, station_id):
+        raise HTTPException(status_code=404, detail="Station not found")
+    return _queue_batches(session, settings, station_id)
+
+
+@router.post("/kitchen/claim")
+def claim_tasks(payload: ClaimRequest, session: SessionDep):
+    """
+    Повар забирает следующие count задач из очереди и переводит их в COOKING.
+
+    FOR UPDATE SKIP LOCKED пропускает задачи, которые в этот момент забирает другой
+    повар, поэтому параллельные запросы не ждут друг друга и не получают одну задачу дважды.
+    """
+    query = (
+        select(CookingTask)
+        .where(CookingTask.status == CookingStatus.QUEUED)
+        .order_by(CookingTask.created_at, CookingTask.id)
+        .limit(payload.count)
+        .with_for_update(skip_locked=True)
+    )
+    if payload.station_id is not None:
+        query = query.where(CookingTask.station_id == payload.station_id)
+    tasks = session.exec(query).all()
+
+    order_status_changes = set_task_statuses(session, [(task, CookingStatus.COOKING) for task in tasks])
+    # Ответ собирается до коммита: после него каждое обращение к задаче перечитывало бы строку
+    claimed = [
+        {
+            "task_id": task.id,
+            "order_id": task.order_id,
+            "menu_item_id": task.menu_item_id,
+            "station_id": task.station_id,
+            "cooking_at": task.cooking_at,
+        }
+        for task in tasks
+    ]
+    session.commit()
+
+    return {"claimed": claimed, "order_status_changes": order_status_changes}
+
+
+@router.get("/kitchen/latency", response_model=list[LatencyReportRow])
+def kitchen_latency(
+    session: SessionDep,
+    group_by: Literal["menu_item", "hour"] = "menu_item",
+    hours: int = 24,
+):
+    """p50/p95/p99 ожидания в очереди, готовки и доставки (в секундах) по блюдам или по часам"""
+    report = latency_report(session, group_by, datetime.now() - timedelta(hours=hours))
+
+    menu_item_names = {}
+    if group_by == "menu_item" and report:
+        menu_item_names = dict(session.exec(
+            select(MenuItemModel.id, MenuItemModel.name)
+            .where(MenuItemModel.id.in_([row["group"] for row in report]))
+        ).all())
+
+    result = []
+    for row in report:
+        key = (
+            {"menu_item_id": row["group"], "menu_item_name": menu_item_names.get(row["group"])}
+            if group_by == "menu_item"
+            else {"hour": row["group"]}
+        )
+        result.append(LatencyReportRow(**key, **row["metrics"]))
+    return result
+
+
 @router.get("/kitchen/api/menu", response_model=list[MenuItemOut])
 async def kitchen_list_menu(session: SessionDep):
     result = session.exec(select(MenuItemModel))
@@ -0,0 +1,82 @@
+import logging
+import time
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from vsm_restaurant.services.request_metrics import request_metrics, track_request
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware, снимающее метрики с каждого HTTP-запроса.
+
+    Маршрут берется из шаблона пути (/orders/{order_id}), а не из фактического URL,
+    чтобы число рядов метрик не росло с числом заказов. Запросы мимо маршрутов
+    учитываются под route="unmatched".
+
+    debug_headers добавляет в ответ X-DB-Query-Count и X-DB-Time-Ms. Если один и тот же
+    SQL выполнен за запрос n_plus_one_threshold раз и больше, в лог пишется предупреждение.
+    """
+    def __init__(
+        self,
+        app: ASGIApp,
+        record_metrics: bool = True,
+        debug_headers: bool = False,
+        n_plus_one_threshold: int = 0,
+    ):
+        self.app = app
+        self.record_metrics = record_metrics
+        self.debug_headers = debug_headers
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = track_request()
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.debug_headers:
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"x-db-query-count", str(stats.queries).encode()),
+                        (b"x-db-time-ms", f"{stats.db_seconds * 1000:.1f}".encode()),
+                    ]
+            await send(message)
+
+        if self.record_metrics:
+            request_metrics.start_request()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            route_path = route.path if route is not None else "unmatched"
+            if self.record_metrics:
+                request_metrics.finish_request(
+                    scope["method"], route_path, status_code, time.perf_counter() - started, stats
+                )
+            if self.n_plus_one_threshold:
+                statement, repeats = stats.most_repeated()
+                if repeats >= self.n_plus_one_threshold:
+                    logger.warning(
+                        f"Possible N+1 in {scope['method']} {route_path}: "
+                        f"query executed {repeats} times ({stats.queries} total): {statement[:200]}"
+                    )
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Метрики запросов воркера в формате Prometheus"""
+    return PlainTextResponse(request_metrics.render(), media_type="text/plain; version=0.0.4")
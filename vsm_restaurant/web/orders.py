@@ -12,11 +12,18 @@ import httpx
 from fastapi import APIRouter, HTTPException
 from sqlmodel import select
 
-from vsm_restaurant.dependencies import SessionDep
-from vsm_restaurant.db.menu import MenuItemModel
+from vsm_restaurant.dependencies import IdempotencyDep, SessionDep
 from vsm_restaurant.db.orders import Order, OrderItem, OrderStatus, PaymentMethod
-from vsm_restaurant.schemas.orders import OrderCreate, OrderOut
-from vsm_restaurant.services.availability import check_menu_item_availability
+from vsm_restaurant.schemas.orders import (
+    CartQuoteOut,
+    CartQuoteRequest,
+    IngredientShortageOut,
+    OrderCreate,
+    OrderItemOut,
+    OrderOut,
+    QuoteLineOut,
+)
+from vsm_restaurant.services.cart import quote_cart
 from vsm_restaurant.services.payment_timeout import set_payment_timeout
 from vsm_restaurant.settings import Settings
 
@@ -32,16 +39,13 @@ def get_payment_service_url() -> str:
 @router.get("/orders", response_model=list[OrderOut])
 def list_orders(session: SessionDep):
     orders = session.exec(select(Order)).all()
+    # Позиции всех заказов одним запросом; названия и цены - из снимка в позиции
+    items_by_order: dict[int, list[OrderItemOut]] = {}
+    for item in session.exec(select(OrderItem).order_by(OrderItem.order_id, OrderItem.id)).all():
+        items_by_order.setdefault(item.order_id, []).append(OrderItemOut.from_snapshot(item))
+
     result = []
     for order in orders:
-        items_with_details = []
-        for item in order.items:
-            items_with_details.append({
-                "id": item.id,
-                "menu_item_id":item.menu_item_id,
-                "quantity": item.quantity,
-                "menu_item": item.menu_item
-            })
         result.append(OrderOut(
             id=order.id,
             place_id=order.place_id,
@@ -50,34 +54,54 @@ def list_orders(session: SessionDep):
             status=order.status,
             total_price=order.total_price,
             payment_link=order.payment_link,
-            items=items_with_details
+            items=items_by_order.get(order.id, [])
         ))
     return result
 
+@router.post("/orders/quote", response_model=CartQuoteOut)
+def quote_order(cart: CartQuoteRequest, session: SessionDep):
+    """Стоимость и доступность корзины без создания заказа (та же проверка, что и в create_order)"""
+    quote = quote_cart(session, [(item.menu_item_id, item.quantity) for item in cart.items])
+    return CartQuoteOut(
+        available=quote.is_available,
+        total_price=quote.total_price,
+        lines=[
+            QuoteLineOut(
+                menu_item_id=line.menu_item_id,
+                name=line.name,
+                quantity=line.quantity,
+                unit_price=line.unit_price,
+                line_total=line.line_total,
+                found=line.found,
+                available=line.available,
+            )
+            for line in quote.lines
+        ],
+        shortages=[IngredientShortageOut(**vars(shortage)) for shortage in quote.shortages],
+    )
+
 @router.post("/orders", response_model=dict)
-async def create_order(order_data: OrderCreate, session: SessionDep):
+async def create_order(order_data: OrderCreate, session: SessionDep, idempotency: IdempotencyDep):
+    # Повтор с тем же Idempotency-Key (например, после обрыва связи) получает исходный ответ
+    if idempotency.replay:
+        return idempotency.replay
+
     try:
         logger.info(f"Creating order: place_id={order_data.place_id}, payment_method={order_data.payment_method}, items={order_data.items}")
         
-        # Проверяем доступность блюд и рассчитываем стоимость
-        total_price = 0.0
-        
-        for item in order_data.items:
-            menu_item = session.get(MenuItemModel, item.menu_item_id)
-            if not menu_item:
-                logger.error(f"Menu item {item.menu_item_id} not found")
-                raise HTTPException(status_code=404, detail=f"Menu item {item.menu_item_id} not found")
-            if not check_menu_item_availability(session, item.menu_item_id):
-                logger.error(f"Menu item {menu_item.name} is not available")
+        # Проверяем доступность блюд и рассчитываем стоимость всей корзины разом
+        quote = quote_cart(session, [(item.menu_item_id, item.quantity) for item in order_data.items])
+        for line in quote.lines:
+            if not line.found:
+                logger.error(f"Menu item {line.menu_item_id} not found")
+                raise HTTPException(status_code=404, detail=f"Menu item {line.menu_item_id} not found")
+            if not line.available:
+                logger.error(f"Menu item {line.name} is not available")
                 raise HTTPException(
                     status_code=400, 
-                    detail=f"Menu item {menu_item.name} is not available"
+                    detail=f"Menu item {line.name} is not available"
                 )
-            
-            # Проверить доступность ингредиентов
-            # Конвертируем price в float, так как Numeric возвращает Decimal
-            price = float(menu_item.price) if menu_item.price is not None else 0.0
-            total_price += price * item.quantity
+        total_price = quote.total_price
         
         logger.info(f"Total price calculated: {total_price}")
         
@@ -89,7 +113,8 @@ async def create_order(order_data: OrderCreate, session: SessionDep):
             place_id=order_data.place_id,
             payment_method=order_data.payment_method,
             total_price=total_price,
-            status=OrderStatus.WAITING_PAYMENT
+            status=OrderStatus.WAITING_PAYMENT,
+            item_count=len(order_data.items)
         )
         
         session.add(order)
@@ -98,11 +123,13 @@ async def create_order(order_data: OrderCreate, session: SessionDep):
         logger.info(f"Order created with id: {order.id}")
         
         # Создаем элементы заказа
-        for item_data in order_data.items:
+        for line in quote.lines:
             order_item = OrderItem(
                 order_id=order.id,
-                menu_item_id=item_data.menu_item_id,
-                quantity=item_data.quantity
+                menu_item_id=line.menu_item_id,
+                quantity=line.quantity,
+                name=line.name,
+                unit_price=line.unit_price
             )
             session.add(order_item)
         
@@ -134,7 +161,7 @@ async def create_order(order_data: OrderCreate, session: SessionDep):
                 # set_payment_timeout уже делает commit, но мы можем сделать еще один для надежности
                 # session.commit()
                 logger.info(f"Payment link created for order {order.id}: {order.payment_link}")
-                return {
+                result = {
                     "order_id": order.id,
                     "payment_link": order.payment_link,
                     "status": "waiting_payment",
@@ -171,17 +198,18 @@ async def create_order(order_data: OrderCreate, session: SessionDep):
                     logger.error(f"Error during cleanup: {cleanup_error}", exc_info=True)
                     session.rollback()
                 raise HTTPException(status_code=500, detail=f"Payment service error: {str(e)}")
+            return idempotency.remember(result)
         
         # Для постоплаты (наличные, карта терминал) заказ создается со статусом WAITING_PAYMENT
         # Задачи на готовку будут созданы после подтверждения оплаты официантом
         else:
             logger.info(f"Order {order.id} created with offline payment method, waiting for waiter confirmation")
-            return {
+            return idempotency.remember({
                 "order_id": order.id,
                 "status": "waiting_payment",
                 "payment_method": order.payment_method.value,
                 "message": "Ожидает подтверждения оплаты официантом"
-            }
+            })
                 
     except HTTPException:
         # Пробрасываем HTTP исключения как есть
@@ -197,20 +225,11 @@ def get_order(order_id: int, session: SessionDep):
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
-    # Получаем элементы заказа с информацией о блюдах
+    # Названия и цены блюд берутся из снимка в позициях заказа
     order_items = session.exec(
-        select(OrderItem).where(OrderItem.order_id == order_id)
+        select(OrderItem).where(OrderItem.order_id == order_id).order_by(OrderItem.id)
     ).all()
-    
-    items_with_details = []
-    for item in order_items:
-        menu_item = session.get(MenuItemModel, item.menu_item_id)
-        items_with_details.append({
-            "id": item.id,
-            "menu_item_id": item.menu_item_id,
-            "quantity": item.quantity,
-            "menu_item": menu_item
-        })
+    items_with_details = [OrderItemOut.from_snapshot(item) for item in order_items]
     
     return OrderOut(
         id=order.id,
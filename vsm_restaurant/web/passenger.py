@@ -1,21 +1,23 @@
+import math
 from typing import List
 
 from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
-from sqlmodel import func, select
+from sqlmodel import select
 
-from vsm_restaurant.db.cooking_task import CookingStatus, CookingTask
 from vsm_restaurant.db.menu import MenuItemModel
 from vsm_restaurant.db.orders import Order, OrderItem, OrderStatus
 from vsm_restaurant.dependencies import SessionDep
 from vsm_restaurant.schemas.orders import OrderItemOut
 from vsm_restaurant.schemas.passenger import (
+    BatchOrderStatusRequest,
+    BatchOrderStatusResponse,
     OrderStatusResponse,
     PassengerOrderHistory,
     PassengerOrderStatus,
 )
-from vsm_restaurant.services.availability import check_menu_item_availability
+from vsm_restaurant.services.availability import check_menu_items_availability
 from vsm_restaurant.services.estimation import estimate_completion_time
 
 router = APIRouter()
@@ -27,70 +29,87 @@ async def passenger_page(request: Request):
     return templates.TemplateResponse("passenger.html", {"request": request})
 
 
+def _load_order_statuses(session, order_ids: list[int]) -> dict[int, PassengerOrderStatus]:
+    """
+    Статусы заказов пассажира за два запроса при любом числе заказов: заказы
+    и их позиции (названия и цены - из снимка в позиции). ETA берется из in-memory модели.
+    """
+    if not order_ids:
+        return {}
+
+    orders = session.exec(select(Order).where(Order.id.in_(order_ids))).all()
+    items = session.exec(
+        select(OrderItem)
+        .where(OrderItem.order_id.in_(order_ids))
+        .order_by(OrderItem.order_id, OrderItem.id)
+    ).all()
+
+    items_by_order: dict[int, list[OrderItemOut]] = {}
+    for item in items:
+        items_by_order.setdefault(item.order_id, []).append(OrderItemOut.from_snapshot(item))
+
+    statuses = {}
+    for order in orders:
+        estimated_minutes = estimate_completion_time(order.id)
+        statuses[order.id] = PassengerOrderStatus(
+            order_id=order.id,
+            place_id=order.place_id,
+            status=order.status,
+            total_price=order.total_price,
+            created_at=order.created_at,
+            estimated_time=f"~{math.ceil(estimated_minutes)} min" if estimated_minutes is not None else None,
+            estimated_minutes=estimated_minutes,
+            items=items_by_order.get(order.id, []),
+        )
+    return statuses
+
+
 @router.get("/passenger/order/{order_id}", response_model=OrderStatusResponse)
 def get_order_status(order_id: int, session: SessionDep):
-    order = session.get(Order, order_id)
-    if not order:
+    order_status = _load_order_statuses(session, [order_id]).get(order_id)
+    if not order_status:
         return OrderStatusResponse(
             success=False,
             message="Order not found",
         )
 
-    items_with_details = []
-    for item in order.items:
-        menu_item = session.get(MenuItemModel, item.menu_item_id)
-        items_with_details.append(
-            OrderItemOut(
-                id=item.id,
-                menu_item_id=item.menu_item_id,
-                quantity=item.quantity,
-                menu_item=menu_item,
-            )
-        )
-
-    estimated_time = estimate_completion_time(session, order_id)
-
-    order_status = PassengerOrderStatus(
-        order_id=order.id,
-        place_id=order.place_id,
-        status=order.status,
-        total_price=order.total_price,
-        created_at=order.created_at,
-        estimated_time=estimated_time,
-        items=items_with_details,
-    )
-
     return OrderStatusResponse(
         success=True,
         order=order_status,
-        message=f"Order {order_id} status: {order.status.value}",
+        message=f"Order {order_id} status: {order_status.status.value}",
+    )
+
+
+@router.post("/passenger/orders/status", response_model=BatchOrderStatusResponse)
+def get_order_statuses(payload: BatchOrderStatusRequest, session: SessionDep):
+    """Статусы нескольких отслеживаемых заказов одним запросом (число обращений к БД не зависит от числа заказов)"""
+    order_ids = list(dict.fromkeys(payload.order_ids))
+    statuses = _load_order_statuses(session, order_ids)
+    return BatchOrderStatusResponse(
+        orders=[statuses[order_id] for order_id in order_ids if order_id in statuses],
+        not_found=[order_id for order_id in order_ids if order_id not in statuses],
     )
 
 
 @router.get("/passenger/orders/{place_id}", response_model=List[PassengerOrderHistory])
 def get_order_history(place_id: str, session: SessionDep, limit: int = 10):
-    orders = session.exec(
-        select(Order)
+    rows = session.exec(
+        select(Order.id, Order.status, Order.total_price, Order.created_at, Order.item_count)
         .where(Order.place_id == place_id)
         .order_by(Order.created_at.desc())
         .limit(limit)
     ).all()
 
-    history = []
-    for order in orders:
-        item_count = session.exec(
-            select(func.count(OrderItem.id)).where(OrderItem.order_id == order.id)
-        ).first()
-
-        history.append(
-            PassengerOrderHistory(
-                order_id=order.id,
-                status=order.status,
-                total_price=order.total_price,
-                created_at=order.created_at,
-                item_count=item_count or 0,
-            )
+    history = [
+        PassengerOrderHistory(
+            order_id=row.id,
+            status=row.status,
+            total_price=row.total_price,
+            created_at=row.created_at,
+            item_count=row.item_count or 0,
         )
+        for row in rows
+    ]
 
     return history
 
@@ -109,13 +128,8 @@ def cancel_order(order_id: int, session: SessionDep):
             detail=f"Cannot cancel order in status: {order.status.value}",
         )
 
-    cooking_tasks = session.exec(
-        select(CookingTask)
-        .where(CookingTask.order_id == order_id)
-        .where(CookingTask.status != CookingStatus.QUEUED)
-    ).first()
-
-    if cooking_tasks:
+    # Хотя бы одна задача уже ушла из очереди кухни
+    if order.tasks_queued < order.tasks_total:
         raise HTTPException(
             status_code=400,
             detail="Cannot cancel order - cooking already started",
@@ -138,10 +152,11 @@ def cancel_order(order_id: int, session: SessionDep):
 @router.get("/passenger/menu/available")
 def get_available_menu(session: SessionDep):
     all_menu_items = session.exec(select(MenuItemModel)).all()
+    availability = check_menu_items_availability(session, all_menu_items)
 
     available_items = []
     for item in all_menu_items:
-        if check_menu_item_availability(session, item.id):
+        if availability[item.id]:
             available_items.append(
                 {
                     "id": item.id,
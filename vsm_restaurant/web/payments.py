@@ -14,12 +14,10 @@ from typing import Optional
 import httpx
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from sqlmodel import select
 
-from vsm_restaurant.dependencies import SessionDep
-from vsm_restaurant.db.cooking_task import CookingStatus, CookingTask
-from vsm_restaurant.db.orders import Order, OrderItem, OrderStatus, PaymentMethod
-from vsm_restaurant.services.availability import reserve_ingredients
+from vsm_restaurant.dependencies import IdempotencyDep, SessionDep
+from vsm_restaurant.db.orders import Order, OrderStatus, PaymentMethod
+from vsm_restaurant.services.cooking import create_cooking_tasks
 from vsm_restaurant.services.payment_timeout import check_payment_timeout, set_payment_timeout
 from vsm_restaurant.settings import Settings
 
@@ -76,9 +74,13 @@ async def get_payment_status(order_id: int, session: SessionDep):
 async def switch_payment_method(
     order_id: int, 
     switch_data: PaymentMethodSwitch,
-    session: SessionDep
+    session: SessionDep,
+    idempotency: IdempotencyDep
 ):
     """Смена способа оплаты для заказа"""
+    if idempotency.replay:
+        return idempotency.replay
+
     order = session.get(Order, order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
@@ -107,33 +109,19 @@ async def switch_payment_method(
         order.status = OrderStatus.PAID
         order.payment_timeout_at = None  # Сбрасываем таймаут
         
-        # Создаем задачи на готовку
-        order_items = session.exec(
-            select(OrderItem).where(OrderItem.order_id == order_id)
-        ).all()
-        
-        for item in order_items:
-            # Резервируем ингредиенты
-            reserve_ingredients(session, item.menu_item_id)
-            
-            # Создаем задачу на готовку
-            task = CookingTask(
-                order_id=order.id,
-                menu_item_id=item.menu_item_id,
-                status=CookingStatus.QUEUED
-            )
-            session.add(task)
+        # Резервируем ингредиенты и создаем задачи на готовку
+        create_cooking_tasks(session, order_id)
     
     session.commit()
     
-    return {
+    return idempotency.remember({
         "success": True,
         "order_id": order_id,
         "old_payment_method": old_method,
         "new_payment_method": switch_data.new_payment_method,
         "status": order.status,
         "message": "Payment method switched successfully"
-    }
+    })
 
 @router.post("/orders/{order_id}/extend-timeout")
 async def extend_payment_timeout(order_id: int, session: SessionDep):
@@ -216,24 +204,9 @@ async def payment_webhook(webhook_data: dict, session: SessionDep):
         order.payment_timeout_at = None  # Сбрасываем таймаут
         order.updated_at = datetime.now()
         
-        # Создаем задачи на готовку
-        order_items = session.exec(
-            select(OrderItem).where(OrderItem.order_id == order_id)
-        ).all()
-        
-        logger.info(f"Found {len(order_items)} items for order {order_id}")
-        
-        for item in order_items:
-            # Резервируем ингредиенты
-            reserve_ingredients(session, item.menu_item_id)
-            
-            # Создаем задачу на готовку
-            task = CookingTask(
-                order_id=order.id,
-                menu_item_id=item.menu_item_id,
-                status=CookingStatus.QUEUED
-            )
-            session.add(task)
+        # Резервируем ингредиенты и создаем задачи на готовку
+        tasks_created = create_cooking_tasks(session, order_id)
+        logger.info(f"Queued {tasks_created} cooking tasks for order {order_id}")
         
         session.commit()
         session.refresh(order)
@@ -0,0 +1,122 @@
+import hmac
+import random
+import sys
+import time
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from vsm_restaurant.dependencies import SettingsDep
+from vsm_restaurant.schemas.profiling import FunctionSamples, RequestProfileOut
+from vsm_restaurant.services.profiling import ProfileStore, StackSampler
+
+
+def _token_matches(value: Optional[str], token: str) -> bool:
+    return bool(token) and value is not None and hmac.compare_digest(value, token)
+
+
+class ProfilingMiddleware:
+    """
+    Профилирование отдельных запросов по требованию.
+
+    Запрос профилируется, если в нем есть заголовок X-Profile с токеном profiling_token
+    или он попал в долю sample_rate. Одновременно профилируется не больше одного запроса,
+    остальные в это время идут без профиля. Номер профиля возвращается в X-Profile-Id.
+    При выключенном профилировании middleware не устанавливается вовсе.
+    """
+    def __init__(self, app: ASGIApp, store: ProfileStore, token: str, sample_rate: float, interval_ms: float):
+        self.app = app
+        self.store = store
+        self.token = token
+        self.sample_rate = sample_rate
+        self.interval_ms = interval_ms
+
+    def _trigger(self, scope: Scope) -> Optional[str]:
+        header = next((value for name, value in scope["headers"] if name == b"x-profile"), None)
+        if header is not None and _token_matches(header.decode("latin-1"), self.token):
+            return "header"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        trigger = self._trigger(scope) if scope["type"] == "http" and not self.store.busy else None
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        self.store.busy = True
+        profile = self.store.new_profile(scope["method"], scope["path"], trigger)
+        profile.interval_ms = self.interval_ms
+        sampler = StackSampler(profile, self.interval_ms / 1000, sys._getframe(), scope)
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", str(profile.id).encode())]
+            await send(message)
+
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+            route = scope.get("route")
+            profile.route = route.path if route is not None else None
+            profile.status_code = status_code
+            profile.duration_ms = round((time.perf_counter() - started) * 1000, 1)
+            self.store.add(profile)
+            self.store.busy = False
+
+
+def get_profile_store(request: Request) -> ProfileStore:
+    return request.app.state.profile_store
+
+
+def check_profiling_token(settings: SettingsDep, authorization: Optional[str] = Header(default=None)):
+    if not _token_matches(authorization, f"Bearer {settings.profiling_token}" if settings.profiling_token else ""):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+
+router = APIRouter(dependencies=[Depends(check_profiling_token)])
+
+
+@router.get("/admin/profiles", response_model=list[RequestProfileOut])
+def list_profiles(store: ProfileStore = Depends(get_profile_store)):
+    """Последние профили этого воркера, новые первыми"""
+    return [
+        RequestProfileOut(
+            id=profile.id,
+            method=profile.method,
+            path=profile.path,
+            route=profile.route,
+            trigger=profile.trigger,
+            started_at=profile.started_at,
+            status_code=profile.status_code,
+            duration_ms=profile.duration_ms,
+            interval_ms=profile.interval_ms,
+            samples=profile.samples,
+            top_functions=[
+                FunctionSamples(function=function, samples=samples)
+                for function, samples in profile.top_functions()
+            ],
+        )
+        for profile in store.list()
+    ]
+
+
+@router.get("/admin/profiles/{profile_id}", response_class=PlainTextResponse)
+def download_profile(profile_id: int, store: ProfileStore = Depends(get_profile_store)):
+    """Стеки профиля в формате collapsed stacks (flamegraph.pl, speedscope)"""
+    profile = store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(
+        profile.collapsed(),
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.txt"'},
+    )
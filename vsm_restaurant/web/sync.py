@@ -0,0 +1,48 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+
+from vsm_restaurant.dependencies import SessionDep
+from vsm_restaurant.schemas.sync import ChangeOut, ChangesResponse
+from vsm_restaurant.services.sync import INITIAL_CURSOR, SYNC_TABLES, collect_changes, parse_cursor
+
+router = APIRouter()
+
+
+@router.get("/sync/changes", response_model=ChangesResponse)
+async def get_changes(
+    session: SessionDep,
+    since: str = Query(INITIAL_CURSOR, description="cursor из предыдущего ответа, по умолчанию с начала"),
+    tables: Optional[str] = Query(None, description="Таблицы через запятую, по умолчанию все"),
+    limit: int = Query(500, ge=1, le=5000),
+):
+    """Строки, измененные или удаленные после курсора since, для офлайн-клиентов"""
+    try:
+        since_position = parse_cursor(since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {since}")
+
+    requested = [table.strip() for table in tables.split(",") if table.strip()] if tables else list(SYNC_TABLES)
+    unknown = [table for table in requested if table not in SYNC_TABLES]
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown tables: {', '.join(unknown)}. Available: {', '.join(SYNC_TABLES)}",
+        )
+
+    change_set = collect_changes(session, since_position, requested, limit)
+    return ChangesResponse(
+        changes=[
+            ChangeOut(
+                table=change.table,
+                version=change.version,
+                row_id=change.row_id,
+                deleted=change.deleted,
+                row=jsonable_encoder(change.row) if change.row is not None else None,
+            )
+            for change in change_set.changes
+        ],
+        cursor=change_set.cursor,
+        has_more=change_set.has_more,
+    )
@@ -1,5 +1,6 @@
 import logging
-from typing import List
+from datetime import datetime, timedelta
+from typing import List, Optional
 
 from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import HTMLResponse
@@ -9,9 +10,27 @@ from sqlmodel import func, select
 from vsm_restaurant.db.cooking_task import CookingStatus, CookingTask
 from vsm_restaurant.db.menu import MenuItemModel
 from vsm_restaurant.db.orders import Order, OrderItem, OrderStatus, PaymentMethod
-from vsm_restaurant.dependencies import SessionDep
+from vsm_restaurant.dependencies import IdempotencyDep, SessionDep, SettingsDep
 from vsm_restaurant.schemas.orders import OrderItemOut, OrderOut
-from vsm_restaurant.schemas.waiter import DeliveryUpdate, PaymentReceived, WaiterOrderSummary
+from vsm_restaurant.schemas.waiter import (
+    BulkOrderResponse,
+    BulkOrderResult,
+    BulkPaymentConfirmation,
+    BulkStatusUpdate,
+    DeliveryRunOut,
+    DeliveryStopOut,
+    DeliveryUpdate,
+    PaymentReceived,
+    StatusAggregate,
+    WaiterDashboardSummary,
+    WaiterOrderSummary,
+)
+from vsm_restaurant.services.cooking import (
+    create_cooking_tasks,
+    create_cooking_tasks_for_orders,
+    set_task_statuses,
+)
+from vsm_restaurant.services.delivery import DeliveryStop, parse_place, plan_delivery_runs
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +43,23 @@ async def waiter_page(request: Request):
     return templates.TemplateResponse("waiter.html", {"request": request})
 
 
+WAITER_VISIBLE_STATUSES = [
+    OrderStatus.WAITING_PAYMENT,
+    OrderStatus.PAID,
+    OrderStatus.COOKING,
+    OrderStatus.PARTIALLY_DELIVERED,
+    OrderStatus.COMPLETED,
+]
+
+# Статусы, в которых деньги за заказ получены
+REVENUE_STATUSES = [
+    OrderStatus.PAID,
+    OrderStatus.COOKING,
+    OrderStatus.PARTIALLY_DELIVERED,
+    OrderStatus.COMPLETED,
+]
+
+
 @router.get("/waiter/orders", response_model=List[WaiterOrderSummary])
 def list_orders_for_waiter(
     session: SessionDep,
@@ -31,17 +67,19 @@ def list_orders_for_waiter(
     place_id: str = None,
 ):
     try:
-        query = select(Order)
+        # Одна выборка нужных колонок: количество позиций хранится на строке заказа
+        query = select(
+            Order.id,
+            Order.place_id,
+            Order.status,
+            Order.total_price,
+            Order.payment_method,
+            Order.created_at,
+            Order.item_count,
+        )
 
         if status is None or status == "":
-            allowed_statuses = [
-                OrderStatus.WAITING_PAYMENT,
-                OrderStatus.PAID,
-                OrderStatus.COOKING,
-                OrderStatus.PARTIALLY_DELIVERED,
-                OrderStatus.COMPLETED,
-            ]
-            query = query.where(Order.status.in_(allowed_statuses))
+            query = query.where(Order.status.in_(WAITER_VISIBLE_STATUSES))
         else:
             try:
                 order_status = OrderStatus(status)
@@ -54,27 +92,18 @@ def list_orders_for_waiter(
 
         query = query.order_by(Order.created_at.desc())
 
-        orders = session.exec(query).all()
-
-        result = []
-        for order in orders:
-            item_count = session.exec(
-                select(func.count(OrderItem.id)).where(OrderItem.order_id == order.id)
-            ).first()
-
-            total_price = float(order.total_price) if order.total_price is not None else 0.0
-
-            result.append(
-                WaiterOrderSummary(
-                    id=order.id,
-                    place_id=order.place_id,
-                    status=order.status,
-                    total_price=total_price,
-                    payment_method=order.payment_method,
-                    created_at=order.created_at,
-                    item_count=item_count or 0,
-                )
+        result = [
+            WaiterOrderSummary(
+                id=row.id,
+                place_id=row.place_id,
+                status=row.status,
+                total_price=float(row.total_price) if row.total_price is not None else 0.0,
+                payment_method=row.payment_method,
+                created_at=row.created_at,
+                item_count=row.item_count or 0,
             )
+            for row in session.exec(query).all()
+        ]
 
         return result
     except Exception as e:
@@ -82,6 +111,96 @@ def list_orders_for_waiter(
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+@router.get("/waiter/summary", response_model=WaiterDashboardSummary)
+def get_waiter_summary(session: SessionDep, hours: Optional[int] = None):
+    """
+    Сводка для официанта: количество заказов, их сумма и выручка по статусам и способам оплаты.
+    Считается одной агрегацией по (статус, способ оплаты); hours - только заказы за последние N часов.
+    """
+    query = select(
+        Order.status,
+        Order.payment_method,
+        func.count(Order.id),
+        func.coalesce(func.sum(Order.total_price), 0),
+    ).group_by(Order.status, Order.payment_method)
+    if hours:
+        query = query.where(Order.created_at >= datetime.now() - timedelta(hours=hours))
+
+    by_status: dict[OrderStatus, StatusAggregate] = {}
+    by_payment_method: dict[PaymentMethod, StatusAggregate] = {}
+    total_orders = 0
+    revenue = 0.0
+    for order_status, payment_method, count, amount in session.exec(query).all():
+        amount = float(amount)
+        paid_amount = amount if order_status in REVENUE_STATUSES else 0.0
+        for groups, key in ((by_status, order_status), (by_payment_method, payment_method)):
+            aggregate = groups.setdefault(key, StatusAggregate())
+            aggregate.count += count
+            aggregate.amount += amount
+            aggregate.revenue += paid_amount
+        total_orders += count
+        revenue += paid_amount
+
+    return WaiterDashboardSummary(
+        total_orders=total_orders,
+        revenue=round(revenue, 2),
+        by_status=by_status,
+        by_payment_method=by_payment_method,
+    )
+
+
+@router.get("/waiter/runs", response_model=List[DeliveryRunOut])
+def list_delivery_runs(session: SessionDep, settings: SettingsDep, capacity: Optional[int] = None):
+    """
+    Готовые к выдаче заказы, сгруппированные в проходы по поезду.
+    Заказ попадает в план, если у него есть готовые порции (READY); несет официант именно их.
+    """
+    rows = session.exec(
+        select(Order.id, Order.place_id, Order.tasks_ready, func.min(CookingTask.ready_at))
+        .join(
+            CookingTask,
+            (CookingTask.order_id == Order.id) & (CookingTask.status == CookingStatus.READY),
+        )
+        .where(Order.tasks_ready > 0)
+        .where(Order.status.in_([OrderStatus.PAID, OrderStatus.COOKING, OrderStatus.PARTIALLY_DELIVERED]))
+        .group_by(Order.id, Order.place_id, Order.tasks_ready)
+    ).all()
+
+    stops = [
+        DeliveryStop(
+            order_id=order_id,
+            place_id=place_id,
+            place=parse_place(place_id),
+            portions=portions,
+            ready_since=ready_since,
+        )
+        for order_id, place_id, portions, ready_since in rows
+    ]
+    runs = plan_delivery_runs(stops, settings.kitchen_car_number, capacity or settings.delivery_run_capacity)
+
+    return [
+        DeliveryRunOut(
+            run=number,
+            direction=run.direction,
+            cars=run.cars,
+            portions=run.portions,
+            oldest_ready_since=run.oldest_ready_since,
+            stops=[
+                DeliveryStopOut(
+                    order_id=stop.order_id,
+                    place_id=stop.place_id,
+                    car=stop.place.car,
+                    seat=stop.place.seat,
+                    portions=stop.portions,
+                    ready_since=stop.ready_since,
+                )
+                for stop in run.stops
+            ],
+        )
+        for number, run in enumerate(runs, start=1)
+    ]
+
+
 @router.get("/waiter/orders/{order_id}", response_model=OrderOut)
 def get_order_details(order_id: int, session: SessionDep):
     try:
@@ -93,30 +212,7 @@ def get_order_details(order_id: int, session: SessionDep):
             select(OrderItem).where(OrderItem.order_id == order_id)
         ).all()
 
-        items_with_details = []
-        for item in order_items:
-            menu_item = session.get(MenuItemModel, item.menu_item_id)
-            if menu_item:
-                from vsm_restaurant.schemas.menu import MenuItemOut
-
-                menu_item_price = float(menu_item.price) if menu_item.price is not None else 0.0
-                menu_item_out = MenuItemOut(
-                    id=menu_item.id,
-                    name=menu_item.name,
-                    price=menu_item_price,
-                    composition=menu_item.composition,
-                )
-            else:
-                menu_item_out = None
-
-            items_with_details.append(
-                OrderItemOut(
-                    id=item.id,
-                    menu_item_id=item.menu_item_id,
-                    quantity=item.quantity,
-                    menu_item=menu_item_out,
-                )
-            )
+        items_with_details = [OrderItemOut.from_snapshot(item) for item in order_items]
 
         total_price = float(order.total_price) if order.total_price is not None else 0.0
 
@@ -137,50 +233,23 @@ def get_order_details(order_id: int, session: SessionDep):
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
-@router.patch("/waiter/orders/{order_id}/status")
-def update_order_status(order_id: int, update: DeliveryUpdate, session: SessionDep):
-    order = session.get(Order, order_id)
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
+VALID_ORDER_TRANSITIONS = {
+    OrderStatus.PAID: [OrderStatus.COOKING, OrderStatus.PARTIALLY_DELIVERED],
+    OrderStatus.COOKING: [OrderStatus.PARTIALLY_DELIVERED],
+    OrderStatus.PARTIALLY_DELIVERED: [OrderStatus.COMPLETED],
+}
 
-    valid_transitions = {
-        OrderStatus.PAID: [OrderStatus.COOKING, OrderStatus.PARTIALLY_DELIVERED],
-        OrderStatus.COOKING: [OrderStatus.PARTIALLY_DELIVERED],
-        OrderStatus.PARTIALLY_DELIVERED: [OrderStatus.COMPLETED],
-    }
 
+def _check_status_transition(order: Order, new_status: OrderStatus):
     current_status = order.status
-    new_status = update.status
-
-    if current_status in valid_transitions and new_status not in valid_transitions[current_status]:
+    if current_status in VALID_ORDER_TRANSITIONS and new_status not in VALID_ORDER_TRANSITIONS[current_status]:
         raise HTTPException(
             status_code=400,
             detail=f"Cannot transition from {current_status} to {new_status}",
         )
 
-    order.status = new_status
-
-    if new_status == OrderStatus.COMPLETED:
-        tasks = session.exec(
-            select(CookingTask).where(CookingTask.order_id == order_id)
-        ).all()
-        for task in tasks:
-            if task.status != CookingStatus.DELIVERED:
-                task.status = CookingStatus.DELIVERED
-                session.add(task)
-
-    session.commit()
-    session.refresh(order)
-
-    return {"status": "updated", "order_id": order_id, "new_status": new_status}
-
-
-@router.post("/waiter/orders/{order_id}/payment")
-def confirm_payment_received(order_id: int, payment_data: PaymentReceived, session: SessionDep):
-    order = session.get(Order, order_id)
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
 
+def _check_payment_confirmation(order: Order):
     if order.payment_method not in [PaymentMethod.CARD_TERMINAL, PaymentMethod.CASH]:
         raise HTTPException(
             status_code=400,
@@ -196,60 +265,205 @@ def confirm_payment_received(order_id: int, payment_data: PaymentReceived, sessi
             ),
         )
 
-    order.status = OrderStatus.PAID
 
-    order_items = session.exec(
-        select(OrderItem).where(OrderItem.order_id == order_id)
-    ).all()
+def _lock_orders(session, order_ids: list[int]) -> dict[int, Order]:
+    """Блокирует заказы в порядке id, чтобы параллельные пачки не взаимоблокировались"""
+    if len(set(order_ids)) != len(order_ids):
+        raise HTTPException(status_code=400, detail="Duplicate order ids in request")
+    return {
+        order.id: order
+        for order in session.exec(
+            select(Order).where(Order.id.in_(order_ids)).order_by(Order.id).with_for_update()
+        ).all()
+    }
 
-    for item in order_items:
-        from vsm_restaurant.services.availability import reserve_ingredients
 
-        reserve_ingredients(session, item.menu_item_id)
+def _bulk_response(results: list[BulkOrderResult]) -> BulkOrderResponse:
+    succeeded = sum(result.success for result in results)
+    return BulkOrderResponse(succeeded=succeeded, failed=len(results) - succeeded, results=results)
+
+
+# Пачечные маршруты объявлены раньше /waiter/orders/{order_id}/...: иначе "bulk" разбирается как order_id
+@router.patch("/waiter/orders/bulk/status", response_model=BulkOrderResponse)
+def bulk_update_order_status(payload: BulkStatusUpdate, session: SessionDep):
+    """
+    Смена статусов многих заказов в одной транзакции.
+    Каждый заказ применяется в своем savepoint: ошибка одного не откатывает остальные.
+    """
+    orders = _lock_orders(session, [update.order_id for update in payload.updates])
+
+    # Невыданные задачи всех закрываемых заказов - одним запросом
+    completing = [
+        update.order_id
+        for update in payload.updates
+        if update.status == OrderStatus.COMPLETED
+        and update.order_id in orders
+        and orders[update.order_id].tasks_delivered < orders[update.order_id].tasks_total
+    ]
+    pending_tasks: dict[int, list[CookingTask]] = {}
+    if completing:
+        for task in session.exec(
+            select(CookingTask)
+            .where(CookingTask.order_id.in_(completing))
+            .where(CookingTask.status != CookingStatus.DELIVERED)
+        ).all():
+            pending_tasks.setdefault(task.order_id, []).append(task)
+
+    delivered_at = datetime.now()
+    results = []
+    for update in payload.updates:
+        order = orders.get(update.order_id)
+        if order is None:
+            results.append(BulkOrderResult(order_id=update.order_id, success=False, error="Order not found"))
+            continue
+        try:
+            with session.begin_nested():
+                _check_status_transition(order, update.status)
+                order.status = update.status
+                if update.status == OrderStatus.COMPLETED:
+                    set_task_statuses(
+                        session,
+                        [(task, CookingStatus.DELIVERED) for task in pending_tasks.get(order.id, [])],
+                        delivered_at,
+                    )
+        except HTTPException as e:
+            results.append(BulkOrderResult(order_id=order.id, success=False, error=e.detail))
+            continue
+        results.append(BulkOrderResult(order_id=order.id, success=True, new_status=update.status))
 
-        task = CookingTask(
-            order_id=order.id,
-            menu_item_id=item.menu_item_id,
-            status=CookingStatus.QUEUED,
-        )
-        session.add(task)
+    session.commit()
+    return _bulk_response(results)
+
+
+@router.post("/waiter/orders/bulk/payment", response_model=BulkOrderResponse)
+def bulk_confirm_payment_received(
+    payload: BulkPaymentConfirmation,
+    session: SessionDep,
+    idempotency: IdempotencyDep,
+):
+    """
+    Подтверждение оплаты наличными/терминалом сразу по многим заказам (официант прошел вагон).
+
+    Проверки идут по заказу в своем savepoint, затем для всех подтвержденных заказов
+    ингредиенты резервируются и задачи кухни создаются одной пачкой. Все - одна транзакция.
+    """
+    if idempotency.replay:
+        return idempotency.replay
+
+    orders = _lock_orders(session, [confirmation.order_id for confirmation in payload.confirmations])
+
+    results = []
+    confirmed = []
+    for confirmation in payload.confirmations:
+        order = orders.get(confirmation.order_id)
+        if order is None:
+            results.append(BulkOrderResult(order_id=confirmation.order_id, success=False, error="Order not found"))
+            continue
+        try:
+            with session.begin_nested():
+                _check_payment_confirmation(order)
+                order.status = OrderStatus.PAID
+        except HTTPException as e:
+            results.append(BulkOrderResult(order_id=order.id, success=False, error=e.detail))
+            continue
+        confirmed.append(order.id)
+        results.append(BulkOrderResult(order_id=order.id, success=True, new_status=OrderStatus.PAID))
+
+    create_cooking_tasks_for_orders(session, confirmed)
+    logger.info(f"Payment confirmed for orders {confirmed}")
+
+    session.commit()
+    return idempotency.remember(_bulk_response(results))
+
+
+@router.patch("/waiter/orders/{order_id}/status")
+def update_order_status(order_id: int, update: DeliveryUpdate, session: SessionDep):
+    order = session.get(Order, order_id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+
+    new_status = update.status
+    _check_status_transition(order, new_status)
+
+    order.status = new_status
+
+    # Счетчики на строке заказа позволяют не читать задачи, если все уже выданы
+    if new_status == OrderStatus.COMPLETED and order.tasks_delivered < order.tasks_total:
+        tasks = session.exec(
+            select(CookingTask)
+            .where(CookingTask.order_id == order_id)
+            .where(CookingTask.status != CookingStatus.DELIVERED)
+        ).all()
+        set_task_statuses(session, [(task, CookingStatus.DELIVERED) for task in tasks])
+
+    session.commit()
+    session.refresh(order)
+
+    return {"status": "updated", "order_id": order_id, "new_status": new_status}
+
+
+@router.post("/waiter/orders/{order_id}/payment")
+def confirm_payment_received(
+    order_id: int,
+    payment_data: PaymentReceived,
+    session: SessionDep,
+    idempotency: IdempotencyDep,
+):
+    if idempotency.replay:
+        return idempotency.replay
+
+    order = session.get(Order, order_id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+
+    _check_payment_confirmation(order)
+
+    order.status = OrderStatus.PAID
+
+    create_cooking_tasks(session, order_id)
 
     logger.info(f"Payment confirmed for order {order_id}: {payment_data.payment_method}")
 
     session.commit()
     session.refresh(order)
 
-    return {
+    return idempotency.remember({
         "status": "payment_confirmed",
         "order_id": order_id,
         "new_status": order.status.value,
         "payment_method": payment_data.payment_method,
-    }
+    })
 
 
 @router.get("/waiter/tasks")
 def list_cooking_tasks(session: SessionDep, status: CookingStatus = None):
-    query = select(CookingTask)
+    # Место и название блюда подтягиваются джойнами, а не отдельным запросом на каждую задачу
+    query = (
+        select(
+            CookingTask.id,
+            CookingTask.order_id,
+            CookingTask.status,
+            CookingTask.created_at,
+            Order.place_id,
+            MenuItemModel.name,
+        )
+        .outerjoin(Order, Order.id == CookingTask.order_id)
+        .outerjoin(MenuItemModel, MenuItemModel.id == CookingTask.menu_item_id)
+    )
 
     if status:
         query = query.where(CookingTask.status == status)
 
-    tasks = session.exec(query.order_by(CookingTask.created_at.asc())).all()
-
-    result = []
-    for task in tasks:
-        order = session.get(Order, task.order_id)
-        menu_item = session.get(MenuItemModel, task.menu_item_id)
-
-        result.append(
-            {
-                "task_id": task.id,
-                "order_id": task.order_id,
-                "place_id": order.place_id if order else "Unknown",
-                "menu_item_name": menu_item.name if menu_item else "Unknown",
-                "status": task.status,
-                "created_at": task.created_at,
-            }
-        )
-
-    return result
+    rows = session.exec(query.order_by(CookingTask.created_at.asc())).all()
+
+    return [
+        {
+            "task_id": task_id,
+            "order_id": order_id,
+            "place_id": place_id or "Unknown",
+            "menu_item_name": menu_item_name or "Unknown",
+            "status": task_status,
+            "created_at": created_at,
+        }
+        for task_id, order_id, task_status, created_at, place_id, menu_item_name in rows
+    ]